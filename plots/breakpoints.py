@@ -149,8 +149,13 @@ def plot_breakpoints(x_data, y_data, x_breakpoints, y_breakpoints, x_label, y_la
 
 
 def read_data_from_csv(csv_file, x_value_label, y_value_label):
-    # read data from cvs file and separate in x and y values
-    raw_data = pd.read_csv(csv_file, sep=";")
+    # read only the x and y columns from cvs file, skipping empty columns and notes
+    raw_data = pd.read_csv(
+        csv_file,
+        sep=";",
+        usecols=[x_value_label, y_value_label],
+        dtype=np.float64,
+    ).dropna()
 
     x = np.array(raw_data.loc[:, x_value_label])
     y = np.array(raw_data.loc[:, y_value_label])
@@ -9,69 +9,30 @@ sys.path.append(plotstyle_path)
 
 from plotstyles import Plotstyles
 
+src_path = os.path.realpath(os.path.join(os.getcwd(), "src"))
+sys.path.append(src_path)
+
+from energy_system.results_catalog import index_results_folder
+from energy_system.results_comparison import comparison_table, relative_deviation
+
 style_inst = Plotstyles()
 style_inst.set_pub()
 
-# initialize result DataFrame
-
 
+# active scenarios of the most recent run of every export directory of a storage
+# type, as recorded in the results catalog (see energy_system.results_catalog)
 def create_result_df(storage_type):
-    res_data = pd.DataFrame()
-
     folder_path = os.path.realpath(os.path.join(os.getcwd(), "src", "results"))
 
-    # collect all data
-
-    folders = [f for f in os.listdir(folder_path) if storage_type in f]
-    print(folders)
-
-    for f in folders:
-        data_path = os.path.join(folder_path, f)
-
-        # collect all result files
-        csv_files = [
-            os.path.join(data_path, f)
-            for f in os.listdir(data_path)
-            if os.path.isfile(os.path.join(data_path, f))
-        ]
-
-        # collect results file of most recent run
-        file = max(csv_files, key=os.path.getmtime)
-
-        data = pd.read_csv(file, sep=";")
-        data = data[data["active"] > 0]
-
-        for i in data.index:
-            # detect method
-            if "sos2" in f:
-                data.loc[i, "method"] = "SOS2"
-            elif "bigm" in f or "big_m" in f:
-                data.loc[i, "method"] = "BigM"
-            elif "linear" in f:
-                data.loc[i, "method"] = "linear"
+    # add the runs of all export directories, which are not in the catalog yet
+    catalog = index_results_folder(folder_path)
 
-            # detect method detail
-            if "_se" in data.loc[i, "name"]:
-                detail = data.loc[i, "name"][data.loc[i, "name"].find("_se") - 4 :]
-                detail = "".join([c for c in detail if c.isdigit()]) + " segments"
+    res_data = comparison_table(catalog, storage_type=storage_type)
+    res_data["season"] = res_data["season"].replace({"summer": "sommer"})
 
-                data.loc[i, "method detail"] = detail
-
-            elif "eff" in data.loc[i, "name"]:
-                detail = data.loc[i, "name"][data.loc[i, "name"].find("_eff") - 4 :]
-                detail = detail.replace("_eff", "").replace("_", "")
-
-                data.loc[i, "method detail"] = detail
-
-            # detect season
-            if "sommer" in data.loc[i, "name"]:
-                data.loc[i, "season"] = "sommer"
-            elif "winter" in data.loc[i, "name"]:
-                data.loc[i, "season"] = "winter"
-
-        res_data = pd.concat([res_data, data])
-
-    return res_data
+    return res_data.rename(
+        columns={"efficiency": "method", "method_detail": "method detail"}
+    )
 
 
 def plot_optimization_methods_comparison(storage_type):
@@ -98,28 +59,11 @@ def plot_optimization_methods_comparison(storage_type):
     ax[0, 0].grid(axis="y")
     ax[0, 0].set_xlabel(" ")
 
-    splt3 = pd.DataFrame()
-
-    for i in splt1.index:
-        splt3.loc[i, "BigM"] = (
-            splt1.loc[i, "BigM"] - splt1.loc["10 segments", "SOS2"]
-        ) / splt1.loc["10 segments", "SOS2"]
-
-        splt3.loc[i, "SOS2"] = (
-            splt1.loc[i, "SOS2"] - splt1.loc["10 segments", "SOS2"]
-        ) / splt1.loc["10 segments", "SOS2"]
-
-        splt3.loc[i, "max"] = (
-            splt1.loc[i, "max"] - splt1.loc["10 segments", "SOS2"]
-        ) / splt1.loc["10 segments", "SOS2"]
-
-        splt3.loc[i, "mean"] = (
-            splt1.loc[i, "mean"] - splt1.loc["10 segments", "SOS2"]
-        ) / splt1.loc["10 segments", "SOS2"]
-
-        splt3.loc[i, "reg"] = (
-            splt1.loc[i, "reg"] - splt1.loc["10 segments", "SOS2"]
-        ) / splt1.loc["10 segments", "SOS2"]
+    # deviation of all methods from SOS2 - 10 segments
+    splt3 = relative_deviation(
+        splt1.loc[:, ["BigM", "SOS2", "max", "mean", "reg"]],
+        splt1.loc["10 segments", "SOS2"],
+    )
 
     splt3.plot.bar(ax=ax[1, 0])
     ax[1, 0].set_ylabel("relative deviation to SOS2 - 10 segments [-]")
@@ -146,28 +90,11 @@ def plot_optimization_methods_comparison(storage_type):
     ax[0, 1].grid(axis="y")
     ax[0, 1].set_xlabel(" ")
 
-    splt4 = pd.DataFrame()
-
-    for i in splt2.index:
-        splt4.loc[i, "BigM"] = (
-            splt2.loc[i, "BigM"] - splt2.loc["10 segments", "SOS2"]
-        ) / splt2.loc["10 segments", "SOS2"]
-
-        splt4.loc[i, "SOS2"] = (
-            splt2.loc[i, "SOS2"] - splt2.loc["10 segments", "SOS2"]
-        ) / splt2.loc["10 segments", "SOS2"]
-
-        splt4.loc[i, "max"] = (
-            splt2.loc[i, "max"] - splt2.loc["10 segments", "SOS2"]
-        ) / splt2.loc["10 segments", "SOS2"]
-
-        splt4.loc[i, "mean"] = (
-            splt2.loc[i, "mean"] - splt2.loc["10 segments", "SOS2"]
-        ) / splt2.loc["10 segments", "SOS2"]
-
-        splt4.loc[i, "reg"] = (
-            splt2.loc[i, "reg"] - splt2.loc["10 segments", "SOS2"]
-        ) / splt2.loc["10 segments", "SOS2"]
+    # deviation of all methods from SOS2 - 10 segments
+    splt4 = relative_deviation(
+        splt2.loc[:, ["BigM", "SOS2", "max", "mean", "reg"]],
+        splt2.loc["10 segments", "SOS2"],
+    )
 
     splt4.plot.bar(ax=ax[1, 1])
     ax[1, 1].set_ylabel("relative deviation to SOS2 - 10 segments [-]")
@@ -230,20 +157,10 @@ def plot_optimization_methods_comparison_different(storage_type):
     ax[0, 1].grid(axis="y")
     ax[0, 1].set_xlabel(" ")
 
-    splt3 = pd.DataFrame()
-
-    for i in temp1.index:
-        splt3.loc[i, "BigM"] = (
-            100
-            * (splt1.loc[i, "BigM"] - splt1.loc["10 segments", "SOS2"])
-            / splt1.loc["10 segments", "SOS2"]
-        )
-
-        splt3.loc[i, "SOS2"] = (
-            100
-            * (splt1.loc[i, "SOS2"] - splt1.loc["10 segments", "SOS2"])
-            / splt1.loc["10 segments", "SOS2"]
-        )
+    # deviation of all methods from SOS2 - 10 segments
+    splt3 = 100 * relative_deviation(
+        splt1.loc[temp1.index, ["BigM", "SOS2"]], splt1.loc["10 segments", "SOS2"]
+    )
 
     splt3.plot.bar(ax=ax[1, 0])
     ax[1, 0].set_ylabel("relative deviation to SOS2 - 10 segments [%]")
@@ -252,26 +169,10 @@ def plot_optimization_methods_comparison_different(storage_type):
     ax[1, 0].set_yscale("log")
     # ax[1, 0].set_ylim(-0.025, 0.09)
 
-    temp3 = pd.DataFrame()
-
-    for i in temp2.index:
-        temp3.loc[i, "max"] = (
-            100
-            * (splt1.loc[i, "max"] - splt1.loc["10 segments", "SOS2"])
-            / splt1.loc["10 segments", "SOS2"]
-        )
-
-        temp3.loc[i, "mean"] = (
-            100
-            * (splt1.loc[i, "mean"] - splt1.loc["10 segments", "SOS2"])
-            / splt1.loc["10 segments", "SOS2"]
-        )
-
-        temp3.loc[i, "reg"] = (
-            100
-            * (splt1.loc[i, "reg"] - splt1.loc["10 segments", "SOS2"])
-            / splt1.loc["10 segments", "SOS2"]
-        )
+    # deviation of all methods from SOS2 - 10 segments
+    temp3 = 100 * relative_deviation(
+        splt1.loc[temp2.index, ["max", "mean", "reg"]], splt1.loc["10 segments", "SOS2"]
+    )
 
     temp3.plot.bar(ax=ax[1, 1], width=0.27, color=["#005B7F", "#008598", "#39C1CD"])
     ax[1, 1].set_ylabel("relative deviation to SOS2 - 10 segments [%]")
@@ -304,20 +205,10 @@ def plot_optimization_methods_comparison_different(storage_type):
     ax[0, 3].grid(axis="y")
     ax[0, 3].set_xlabel(" ")
 
-    splt4 = pd.DataFrame()
-
-    for i in temp1.index:
-        splt4.loc[i, "BigM"] = (
-            100
-            * (splt2.loc[i, "BigM"] - splt2.loc["10 segments", "SOS2"])
-            / splt2.loc["10 segments", "SOS2"]
-        )
-
-        splt4.loc[i, "SOS2"] = (
-            100
-            * (splt2.loc[i, "SOS2"] - splt2.loc["10 segments", "SOS2"])
-            / splt2.loc["10 segments", "SOS2"]
-        )
+    # deviation of all methods from SOS2 - 10 segments
+    splt4 = 100 * relative_deviation(
+        splt2.loc[temp1.index, ["BigM", "SOS2"]], splt2.loc["10 segments", "SOS2"]
+    )
 
     splt4.plot.bar(ax=ax[1, 2])
     ax[1, 2].set_ylabel("relative deviation to SOS2 - 10 segments [%]")
@@ -326,26 +217,10 @@ def plot_optimization_methods_comparison_different(storage_type):
     ax[1, 2].set_yscale("log")
     # ax[1, 2].set_ylim(-0.025, 0.09)
 
-    temp3 = pd.DataFrame()
-
-    for i in temp2.index:
-        temp3.loc[i, "max"] = (
-            100
-            * (splt2.loc[i, "max"] - splt2.loc["10 segments", "SOS2"])
-            / splt2.loc["10 segments", "SOS2"]
-        )
-
-        temp3.loc[i, "mean"] = (
-            100
-            * (splt2.loc[i, "mean"] - splt2.loc["10 segments", "SOS2"])
-            / splt2.loc["10 segments", "SOS2"]
-        )
-
-        temp3.loc[i, "reg"] = (
-            100
-            * (splt2.loc[i, "reg"] - splt2.loc["10 segments", "SOS2"])
-            / splt2.loc["10 segments", "SOS2"]
-        )
+    # deviation of all methods from SOS2 - 10 segments
+    temp3 = 100 * relative_deviation(
+        splt2.loc[temp2.index, ["max", "mean", "reg"]], splt2.loc["10 segments", "SOS2"]
+    )
 
     temp3.plot.bar(ax=ax[1, 3], width=0.27, color=["#005B7F", "#008598", "#39C1CD"])
     ax[1, 3].set_ylabel("relative deviation to SOS2 - 10 segments [%]")
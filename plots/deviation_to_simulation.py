@@ -1,4 +1,8 @@
 import os
+import hashlib
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import matplotlib.pyplot as plt
 
@@ -23,6 +27,12 @@ data_path = os.path.realpath(
     os.path.join(os.getcwd(), "schedule_simulation_results", "PHS")
 )
 
+# folder of the KPI tables read from the workbooks, see read_kpi_table
+cache_path = os.path.realpath(os.path.join(os.getcwd(), "plots", "cache"))
+
+# columns of the KPI sheet of a workbook
+KPI_COLUMNS = ["kpi", "simulation", "optimization", "deviation"]
+
 
 def map_kpi_name_ger_en(kpi):
     if kpi == "Average charging efficiency":
@@ -47,33 +57,102 @@ def map_kpi_name_ger_en(kpi):
     return kpi_ger
 
 
-def create_result_df(kpi, season):
-    datafiles = [
-        f for f in os.listdir(data_path) if os.path.isfile(os.path.join(data_path, f))
+def read_workbook(file_path):
+    # KPIs of the sheet "Kennzahlen" of a workbook
+    data = (
+        pd.read_excel(
+            file_path,
+            sheet_name="Kennzahlen",
+            header=0,
+        )
+    ).iloc[1:11, 1:5]
+
+    data.columns = KPI_COLUMNS
+    data["kpi"] = data["kpi"].astype(str)
+    for column in KPI_COLUMNS[1:]:
+        data[column] = pd.to_numeric(data[column], errors="coerce")
+
+    data.insert(0, "workbook", os.path.basename(file_path).replace(".xlsx", ""))
+    data.insert(1, "mtime", os.path.getmtime(file_path))
+
+    return data.reset_index(drop=True)
+
+
+# KPIs of all workbooks in data_path as a single table, which is saved as pickle
+# file in cache_dir (one file per data_path), only workbooks added or modified
+# since the table was saved are read again, in parallel if more than one, the
+# table is not saved if cache_dir is None
+def read_kpi_table(data_path=data_path, cache_dir=cache_path, number_of_workers=None):
+    workbooks = {
+        f: os.path.getmtime(os.path.join(data_path, f))
+        for f in sorted(os.listdir(data_path))
+        if f.endswith(".xlsx") and os.path.isfile(os.path.join(data_path, f))
+    }
+
+    empty_table = pd.DataFrame(columns=["workbook", "mtime"] + KPI_COLUMNS)
+
+    # keep KPIs of unchanged workbooks
+    table_file = None
+    kpi_table = empty_table
+    if cache_dir is not None:
+        table_file = os.path.join(
+            cache_dir,
+            "kpi_table_{0}.pkl".format(
+                hashlib.sha256(os.path.realpath(data_path).encode()).hexdigest()[:16]
+            ),
+        )
+        if os.path.exists(table_file):
+            kpi_table = pd.read_pickle(table_file)
+    saved_mtimes = kpi_table.groupby("workbook")["mtime"].first().to_dict()
+
+    outdated = [
+        f
+        for f, mtime in workbooks.items()
+        if saved_mtimes.get(f.replace(".xlsx", "")) != mtime
     ]
+    current = [f.replace(".xlsx", "") for f in workbooks]
+    if not outdated and set(saved_mtimes) == set(current):
+        return kpi_table
+
+    file_paths = [os.path.join(data_path, f) for f in outdated]
+    if len(file_paths) > 1:
+        with ProcessPoolExecutor(max_workers=number_of_workers) as executor:
+            new_data = list(executor.map(read_workbook, file_paths))
+    else:
+        new_data = [read_workbook(file_path) for file_path in file_paths]
 
-    result_df = pd.DataFrame(
-        index=[s.replace(".xlsx", "") for s in datafiles],
-        columns=["kpi", "simulation", "optimization", "deviation"],
+    unchanged = kpi_table[
+        kpi_table["workbook"].isin(current)
+        & ~kpi_table["workbook"].isin([f.replace(".xlsx", "") for f in outdated])
+    ]
+    pieces = [piece for piece in [unchanged] + new_data if not piece.empty]
+    kpi_table = pd.concat(pieces or [empty_table], ignore_index=True)
+    kpi_table = kpi_table.sort_values("workbook", kind="stable", ignore_index=True)
+
+    if table_file is not None:
+        # write to a temporary file first, so that the table is never incomplete
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        handle, temporary_file = tempfile.mkstemp(suffix=".pkl", dir=cache_dir)
+        os.close(handle)
+        kpi_table.to_pickle(temporary_file)
+        os.replace(temporary_file, table_file)
+
+    return kpi_table
+
+
+def create_result_df(kpi, season, kpi_table=None):
+    if kpi_table is None:
+        kpi_table = read_kpi_table()
+
+    # KPI of every workbook
+    result_df = (
+        kpi_table[kpi_table["kpi"] == kpi]
+        .drop_duplicates("workbook")
+        .set_index("workbook")
+        .loc[:, KPI_COLUMNS]
     )
 
-    for f in datafiles:
-        if f.endswith(".xlsx"):
-            data = (
-                pd.read_excel(
-                    os.path.join(data_path, f),
-                    sheet_name="Kennzahlen",
-                    header=0,
-                )
-            ).iloc[1:11, 1:5]
-
-            data.columns = ["kpi", "simulation", "optimization", "deviation"]
-
-            temp_df = data[data["kpi"] == kpi]
-            temp_df.index = [f.replace(".xlsx", "")]
-
-            result_df.loc[f.replace(".xlsx", "")] = temp_df.loc[f.replace(".xlsx", "")]
-
     df_kpi_season = pd.DataFrame(
         index=["2 segments", "6 segments", "10 segments", "linear"],
         columns=["SOS2", "BigM", "linear reg"],
@@ -87,7 +166,7 @@ def create_result_df(kpi, season):
                 result_df["deviation"][
                     result_df.index.str.contains(season)
                     & result_df.index.str.contains("Reg")
-                ][0]
+                ].iloc[0]
                 * 100
             )
 
@@ -97,7 +176,7 @@ def create_result_df(kpi, season):
                     result_df.index.str.contains(season)
                     & result_df.index.str.contains("SOS2")
                     & result_df.index.str.contains(s)
-                ][0]
+                ].iloc[0]
                 * 100
             )
 
@@ -107,7 +186,7 @@ def create_result_df(kpi, season):
                     result_df.index.str.contains(season)
                     & result_df.index.str.contains("Big_M")
                     & result_df.index.str.contains(s)
-                ][0]
+                ].iloc[0]
                 * 100
             )
 
@@ -123,17 +202,20 @@ def create_result_df(kpi, season):
 # plotting
 
 
-def plot_kpi(kpi):
+def plot_kpi(kpi, cache_dir=cache_path):
     kpi_ger = map_kpi_name_ger_en(kpi)
 
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(10, 5), sharey=True, sharex=True)
 
-    res_def_sommer = create_result_df(kpi_ger, "Sommer")
+    # KPIs of all workbooks, read once for both seasons
+    kpi_table = read_kpi_table(cache_dir=cache_dir)
+
+    res_def_sommer = create_result_df(kpi_ger, "Sommer", kpi_table)
     res_def_sommer.plot.barh(ax=ax1)
 
     ax1.set_title("summer")
 
-    res_def_winter = create_result_df(kpi_ger, "Winter")
+    res_def_winter = create_result_df(kpi_ger, "Winter", kpi_table)
     res_def_winter.plot.barh(ax=ax2)
     ax2.set_title("winter")
 
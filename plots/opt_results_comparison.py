@@ -1,7 +1,6 @@
 # more generic approach to plot comparison of model variants
 
 import os
-import pandas as pd
 import matplotlib.pyplot as plt
 
 import sys
@@ -11,111 +10,34 @@ sys.path.append(plotstyle_path)
 
 from plotstyles import Plotstyles
 
+src_path = os.path.realpath(os.path.join(os.getcwd(), "src"))
+sys.path.append(src_path)
+
+from energy_system.results_catalog import index_results_folder
+from energy_system.results_comparison import comparison_table, deviation_in_percent
+
 style_inst = Plotstyles()
 style_inst.set_pub()
 
 
+# active scenarios of the most recent run of every export directory of a storage
+# type, as recorded in the results catalog (see energy_system.results_catalog)
 def create_result_df(storage_type):
-    # initialize results DataFrame
-    res_data = pd.DataFrame()
-
     # path to optimization results
     folder_path = os.path.realpath(os.path.join(os.getcwd(), "src", "results"))
 
-    # collect all data of selected storage type
-    folders = [f for f in os.listdir(folder_path) if storage_type in f]
-
-    for f in folders:
-        data_path = os.path.join(folder_path, f)
-
-        # collect all result files
-        csv_files = [
-            os.path.join(data_path, f)
-            for f in os.listdir(data_path)
-            if os.path.isfile(os.path.join(data_path, f))
-        ]
-
-        # collect results file of most recent run
-        file = max(csv_files, key=os.path.getmtime)
-
-        # read data from csv file
-        data = pd.read_csv(file, sep=";")
-        # filter active scenarios
-        data = data[data["active"] > 0]
-
-        # automatically read method
-
-        for i in data.index:
-            # detect weather storage losses are considered from folder name
-            if "with_" in f:
-                if "constant" in f:
-                    data.loc[i, "storage losses"] = "constant"
-                elif "soc_dep" in f:
-                    data.loc[i, "storage losses"] = "soc dependant"
-            elif "without" in f:
-                data.loc[i, "storage losses"] = "without"
-            else:
-                data.loc[i, "storage losses"] = "unknown"
-                print(
-                    "It can not be inferred from the folder name if storage losses are considered!"
-                )
-
-            # detect method of storage losses from scenario name
-            if data.loc[i, "storage losses"] == "constant":
-                method = "".join(data.loc[i, "name"].split("_")[-1])
-                data.loc[i, "storage losses method"] = method
-            elif data.loc[i, "storage losses"] == "soc dependant":
-                method = " ".join(data.loc[i, "name"].split("_")[-2:])
-                data.loc[i, "storage losses method"] = method
-            elif data.loc[i, "storage losses"] == "without":
-                data.loc[i, "storage losses method"] = None
-            else:
-                print(
-                    "method of storage loss implementation can not be inferred from scenario name!"
-                )
-                data.loc[i, "storage losses method"] = None
-
-            # detect optimization method from folder name
-            if "sos2" in f:
-                data.loc[i, "efficiency"] = "SOS2"
-            elif "bigm" in f or "big_m" in f:
-                data.loc[i, "efficiency"] = "BigM"
-            elif "linear" in f:
-                data.loc[i, "efficiency"] = "linear"
-            else:
-                print(
-                    "method of efficiency implementation can not be inferred from folder name!"
-                )
-                data.loc[i, "efficiency method"] = "unknown"
-
-            # detect method of efficiency from scenario name
-            if data.loc[i, "efficiency"] == "SOS2":
-                method = " ".join(data.loc[i, "name"].split("_")[2:4])
-                data.loc[i, "efficiency method"] = method
-            elif data.loc[i, "efficiency"] == "BigM":
-                method = " ".join(data.loc[i, "name"].split("_")[2:4])
-                data.loc[i, "efficiency method"] = method
-            elif data.loc[i, "efficiency"] == "linear":
-                method = "".join(data.loc[i, "name"].split("_")[-2:-1])
-                data.loc[i, "efficiency method"] = method
-            else:
-                print(
-                    "method of efficiency implementation can not be inferred from scenario name!"
-                )
-                data.loc[i, "efficiency method"] = None
-
-            # detect season
-            if "sommer" in data.loc[i, "name"]:
-                data.loc[i, "season"] = "summer"
-            elif "winter" in data.loc[i, "name"]:
-                data.loc[i, "season"] = "winter"
-            else:
-                print("season can not be inferred from scenario name!")
-                data.loc[i, "season"] = None
-
-        res_data = pd.concat([res_data, data])
-
-    return res_data
+    # add the runs of all export directories, which are not in the catalog yet
+    catalog = index_results_folder(folder_path)
+
+    res_data = comparison_table(catalog, storage_type=storage_type)
+
+    return res_data.rename(
+        columns={
+            "storage_losses": "storage losses",
+            "storage_losses_method": "storage losses method",
+            "efficiency_method": "efficiency method",
+        }
+    )
 
 
 def process_subplot_data(
@@ -133,19 +55,8 @@ def process_subplot_data(
 
 
 def calculate_deviation_in_percent(processed_subplot_data, run_df, run):
-    # initialize return DataFrame
-    data_subplot = pd.DataFrame()
-
-    # calculate deviation from specified run
-    for i in processed_subplot_data.index:
-        for j in processed_subplot_data.columns:
-            data_subplot.loc[i, j] = abs(
-                100
-                * (processed_subplot_data.loc[i, j] - run_df.loc[*run])
-                / run_df.loc[*run]
-            )
-
-    return data_subplot
+    # calculate deviation from specified run for all values at once
+    return deviation_in_percent(processed_subplot_data, run_df.loc[*run])
 
 
 def plot_comparison_optimization_results_soltime_phs(values):
@@ -397,7 +308,6 @@ def plot_comparison_optimization_results_phs(type, comparison_method, comparison
         plot_comparison_optimization_results_soltime_phs("solution_time")
 
 
-
 def process_subplot_data_caes(
     df, season, loss_type, df_columns, subplot_index, subplot_column, values
 ):
@@ -0,0 +1,574 @@
+import io
+import os
+import sys
+import datetime
+import gc
+import inspect
+import itertools
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+import numpy as np
+import pandas as pd
+
+from pyomo.environ import Binary, Constraint, SOSConstraint, Var
+
+# make sure the package energy_system can be imported
+src_path = os.path.realpath(os.path.join(__file__, "..", ".."))
+if src_path not in sys.path:
+    sys.path.append(src_path)
+
+from energy_system.scenario_runner import MODEL_TYPES, load_model_module
+
+# scenario files (relative to src) and scenarios providing the parameters of
+# each model type, the breakpoints and the horizon are changed by the benchmark
+BASE_SCENARIOS = {
+    "linear": ("data/linear_model_calculations.csv", "param_example_1"),
+    "linear_with_storage_losses": (
+        "data/linear_model_calculations.csv",
+        "param_example_1",
+    ),
+    "sos2": ("data/sos2_model_calculations.csv", "param_example_1"),
+    "sos2_with_constant_storage_efficiency": (
+        "data/sos2_model_calculations.csv",
+        "param_example_1",
+    ),
+    "sos2_with_soc_dependent_efficiency": (
+        "data/sos2_model_calculations.csv",
+        "param_example_1",
+    ),
+    "big_m": ("data/big_m_model_calculations.csv", "param_example_1"),
+}
+
+# breakpoints of the efficiency curves, the first list of each pair contains
+# the arguments, the second list the function values
+BREAKPOINT_PAIRS = [
+    ("p_in_breakpoints", "p_in_stor_breakpoints"),
+    ("p_out_breakpoints", "p_out_stor_breakpoints"),
+    ("soc_breakpoints", "soc_loss_breakpoints"),
+]
+
+# default values of the sweep, each dimension is varied while the others are
+# kept at their first value
+HORIZON_LENGTHS = [336, 2016, 8760, 35040]
+BREAKPOINT_COUNTS = [3, 2, 4, 6, 10]
+STORAGE_COUNTS = [1, 2, 4]
+
+# columns of the benchmark results, which are compared between commits
+BENCHMARK_METRICS = ["build_time", "storage_block_time", "peak_memory"]
+
+
+def git_commit(repository_path):
+    """
+    Returns the commit the benchmark is run on.
+
+    Parameters
+    ----------
+    repository_path : String
+        path inside the git repository
+
+    Returns
+    -------
+    commit : String
+        hash of the checked out commit followed by "-dirty" if there are
+        uncommitted changes, "unknown" if git is not available
+
+    """
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=repository_path,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        changes = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=repository_path,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+    if changes:
+        commit += "-dirty"
+
+    return commit
+
+
+def resample_breakpoints(x, y, number_of_breakpoints):
+    """
+    Resamples a piecewise linear function to a given number of breakpoints.
+    The first breakpoint (usually zero, i.e. the storage is off) is kept, the
+    remaining breakpoints are distributed evenly between the second and the
+    last breakpoint of the original function.
+
+    Parameters
+    ----------
+    x : list
+        ascending arguments of the breakpoints
+    y : list
+        function values at the breakpoints
+    number_of_breakpoints : int
+        number of breakpoints of the resampled function, at least 2
+
+    Returns
+    -------
+    x_resampled : list
+        arguments of the resampled breakpoints
+    y_resampled : list
+        function values at the resampled breakpoints
+
+    """
+
+    if number_of_breakpoints < 2:
+        raise ValueError("At least two breakpoints are needed.")
+
+    if number_of_breakpoints == 2:
+        x_resampled = np.array([x[0], x[-1]])
+    else:
+        x_resampled = np.concatenate(
+            [[x[0]], np.linspace(x[1], x[-1], number_of_breakpoints - 1)]
+        )
+
+    return list(x_resampled), list(np.interp(x_resampled, x, y))
+
+
+def read_base_parameters(model_type):
+    """
+    Reads the parameters of the base scenario of a model type (see
+    BASE_SCENARIOS) and its timeseries.
+
+    Parameters
+    ----------
+    model_type : String
+        model type, one of the keys of MODEL_TYPES
+
+    Returns
+    -------
+    parameters : dict
+        arguments of energy_system_model except timesteps and timeseries
+    demand : pd.Series
+        scaled demand of the base scenario
+    ee_generation : pd.Series
+        scaled renewable generation of the base scenario
+
+    """
+
+    module = load_model_module(model_type)
+    scenario_file, i_scenario = BASE_SCENARIOS[model_type]
+
+    scenario_options, _ = module.read_scenario_file(scenario_file)
+    with redirect_stdout(io.StringIO()):
+        scenario_parameters = module.read_scenario_parameters(
+            scenario_options, i_scenario
+        )
+
+    # read_scenario_parameters returns the arguments of energy_system_model
+    # after the timeseries in the same order, followed by the scaling factors
+    argument_names = list(inspect.signature(module.energy_system_model).parameters)
+    parameters = dict(zip(argument_names[3:], scenario_parameters[:-2]))
+    sf_dem, sf_res = scenario_parameters[-2:]
+
+    demand, ee_generation = module.read_timeseries(
+        scenario_options, i_scenario, sf_dem, sf_res
+    )
+
+    return parameters, demand, ee_generation
+
+
+def count_model_size(model):
+    """
+    Returns the size of a model.
+
+    Parameters
+    ----------
+    model : solph.Model
+        model built by energy_system_model
+
+    Returns
+    -------
+    model_size : dict
+        number of variables, binary variables, constraints and SOS constraints
+        of the model
+
+    """
+
+    variables = list(model.component_data_objects(Var, active=True))
+
+    return {
+        "variables": len(variables),
+        "binary_variables": sum(1 for var in variables if var.domain is Binary),
+        "constraints": sum(
+            1 for _ in model.component_data_objects(Constraint, active=True)
+        ),
+        "sos_constraints": sum(
+            1 for _ in model.component_data_objects(SOSConstraint, active=True)
+        ),
+    }
+
+
+def build_model(
+    module, parameters, demand, ee_generation, horizon_length, number_of_storages
+):
+    """
+    Builds a model of a given horizon using energy_system_model. The
+    timeseries are repeated, if they are shorter than the horizon.
+
+    Parameters
+    ----------
+    module : module
+        module implementing the energy system of the model type
+    parameters : dict
+        arguments of energy_system_model except timesteps and timeseries
+    demand : pd.Series
+        scaled demand
+    ee_generation : pd.Series
+        scaled renewable generation
+    horizon_length : int
+        number of timesteps of the model
+    number_of_storages : int
+        number of identical storages of the energy system
+
+    Returns
+    -------
+    model : solph.Model
+        model of the energy system
+
+    """
+
+    timesteps = pd.date_range(
+        demand.index[0], periods=horizon_length, freq=pd.infer_freq(demand.index)
+    )
+    demand = pd.Series(np.resize(demand.to_numpy(), horizon_length), index=timesteps)
+    ee_generation = pd.Series(
+        np.resize(ee_generation.to_numpy(), horizon_length), index=timesteps
+    )
+
+    # discard the warnings printed by pyomo while constructing the model
+    with redirect_stdout(io.StringIO()):
+        model = module.energy_system_model(
+            timesteps,
+            demand,
+            ee_generation,
+            number_of_storages=number_of_storages,
+            **parameters
+        )
+
+    return model
+
+
+def benchmark_model_construction(
+    model_type,
+    horizon_length,
+    number_of_breakpoints,
+    number_of_storages,
+    measure_memory=True,
+):
+    """
+    Measures building the model of one model type. The build time is measured
+    without tracing memory allocations, the peak memory is measured by
+    building the model a second time using tracemalloc.
+
+    Parameters
+    ----------
+    model_type : String
+        model type, one of the keys of MODEL_TYPES
+    horizon_length : int
+        number of timesteps of the model
+    number_of_breakpoints : int
+        number of breakpoints of each efficiency curve, ignored by the linear
+        model types
+    number_of_storages : int
+        number of identical storages of the energy system
+    measure_memory : bool
+        specifies if the peak memory is measured
+
+    Returns
+    -------
+    benchmark : dict
+        parameters of the benchmark, build time and time of
+        StorageBlock._create in seconds, peak memory in MiB and model size
+
+    """
+
+    module = load_model_module(model_type)
+    parameters, demand, ee_generation = read_base_parameters(model_type)
+
+    # resample the efficiency curves used by the model type
+    has_breakpoints = False
+    for x_name, y_name in BREAKPOINT_PAIRS:
+        if x_name in parameters:
+            parameters[x_name], parameters[y_name] = resample_breakpoints(
+                parameters[x_name], parameters[y_name], number_of_breakpoints
+            )
+            has_breakpoints = True
+
+    gc.collect()
+    start_time = time.perf_counter()
+    model = build_model(
+        module, parameters, demand, ee_generation, horizon_length, number_of_storages
+    )
+    build_time = time.perf_counter() - start_time
+
+    benchmark = {
+        "model_type": model_type,
+        "horizon_length": horizon_length,
+        "breakpoints": number_of_breakpoints if has_breakpoints else np.nan,
+        "storages": number_of_storages,
+        "build_time": build_time,
+        "storage_block_time": model.StorageBlock.create_time,
+        "peak_memory": np.nan,
+    }
+    benchmark.update(count_model_size(model))
+    del model
+
+    if measure_memory:
+        gc.collect()
+        tracemalloc.start()
+        model = build_model(
+            module,
+            parameters,
+            demand,
+            ee_generation,
+            horizon_length,
+            number_of_storages,
+        )
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        benchmark["peak_memory"] = peak_memory / 2**20
+        del model
+
+    return benchmark
+
+
+def define_benchmark_cases(
+    horizon_lengths, breakpoint_counts, storage_counts, full_factorial=False
+):
+    """
+    Returns the combinations of horizon length, number of breakpoints and
+    number of storages to be benchmarked.
+
+    Parameters
+    ----------
+    horizon_lengths : list
+        horizon lengths, the first value is the default of the other sweeps
+    breakpoint_counts : list
+        numbers of breakpoints, the first value is the default of the other
+        sweeps
+    storage_counts : list
+        numbers of storages, the first value is the default of the other sweeps
+    full_factorial : bool
+        specifies if all combinations are benchmarked instead of varying one
+        dimension at a time
+
+    Returns
+    -------
+    cases : list
+        tuples (horizon length, number of breakpoints, number of storages)
+
+    """
+
+    if full_factorial:
+        return list(
+            itertools.product(horizon_lengths, breakpoint_counts, storage_counts)
+        )
+
+    cases = []
+    for case in (
+        [(h, breakpoint_counts[0], storage_counts[0]) for h in horizon_lengths]
+        + [(horizon_lengths[0], b, storage_counts[0]) for b in breakpoint_counts]
+        + [(horizon_lengths[0], breakpoint_counts[0], s) for s in storage_counts]
+    ):
+        if case not in cases:
+            cases.append(case)
+
+    return cases
+
+
+def run_construction_benchmark(
+    export_root,
+    model_types=None,
+    horizon_lengths=HORIZON_LENGTHS,
+    breakpoint_counts=BREAKPOINT_COUNTS,
+    storage_counts=STORAGE_COUNTS,
+    full_factorial=False,
+    measure_memory=True,
+):
+    """
+    Benchmarks building the models of all model types for a sweep of horizon
+    lengths, numbers of breakpoints and numbers of storages. The results are
+    written to a csv-file and a json-file named after the commit, so that the
+    results of different commits can be compared (see compare_benchmarks).
+
+    Parameters
+    ----------
+    export_root : String
+        path to folder, where the benchmark results are to be saved
+    model_types : list, optional
+        model types to be benchmarked, defaults to all keys of MODEL_TYPES
+    horizon_lengths : list
+        horizon lengths, the first value is the default of the other sweeps
+    breakpoint_counts : list
+        numbers of breakpoints, the first value is the default of the other
+        sweeps
+    storage_counts : list
+        numbers of storages, the first value is the default of the other sweeps
+    full_factorial : bool
+        specifies if all combinations are benchmarked instead of varying one
+        dimension at a time
+    measure_memory : bool
+        specifies if the peak memory is measured
+
+    Returns
+    -------
+    benchmark_results : pd.DataFrame
+        one row per model type and case (see benchmark_model_construction)
+
+    """
+
+    if model_types is None:
+        model_types = list(MODEL_TYPES)
+
+    if not os.path.exists(export_root):
+        os.makedirs(export_root)
+
+    commit = git_commit(src_path)
+    cases = define_benchmark_cases(
+        horizon_lengths, breakpoint_counts, storage_counts, full_factorial
+    )
+
+    benchmarks = []
+    for model_type in model_types:
+        # the linear model types do not depend on the number of breakpoints
+        measured_cases = []
+        for case in cases:
+            if model_type in ["linear", "linear_with_storage_losses"]:
+                case = (case[0], breakpoint_counts[0], case[2])
+                if case in measured_cases:
+                    continue
+            measured_cases.append(case)
+
+            try:
+                benchmark = benchmark_model_construction(
+                    model_type, *case, measure_memory=measure_memory
+                )
+            except Exception as error:
+                # e.g. the big-M model needs at least three breakpoints
+                log_msg = "[{0:s}]\tBuilding '{1:s}' {2} failed: {3}\n".format(
+                    datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    model_type,
+                    case,
+                    error,
+                )
+                print(log_msg, end="")
+                continue
+            benchmarks.append(benchmark)
+
+            # create log message
+            log_msg = (
+                "[{0:s}]\tBuilt '{1:s}' with {2:d} timesteps, {3} breakpoints "
+                "and {4:d} storages in {5:.3f} s.\n".format(
+                    datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    model_type,
+                    benchmark["horizon_length"],
+                    benchmark["breakpoints"],
+                    benchmark["storages"],
+                    benchmark["build_time"],
+                )
+            )
+            # print log message
+            print(log_msg, end="")
+
+    benchmark_results = pd.DataFrame(benchmarks)
+    benchmark_results.insert(0, "commit", commit)
+
+    # export results as csv-file and as json-file including the environment
+    export_file = os.path.join(export_root, "model_construction_" + commit[:12])
+    benchmark_results.to_csv(export_file + ".csv", index=False, sep=";")
+    with open(export_file + ".json", "w") as file:
+        json.dump(
+            {
+                "commit": commit,
+                "date": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": json.loads(benchmark_results.to_json(orient="records")),
+            },
+            file,
+            indent=2,
+        )
+
+    return benchmark_results
+
+
+def read_benchmark(benchmark_file):
+    """
+    Reads the results of run_construction_benchmark.
+
+    Parameters
+    ----------
+    benchmark_file : String
+        path to the csv-file or json-file written by run_construction_benchmark
+
+    Returns
+    -------
+    benchmark_results : pd.DataFrame
+        one row per model type and case
+
+    """
+
+    if benchmark_file.endswith(".json"):
+        with open(benchmark_file, "r") as file:
+            return pd.DataFrame(json.load(file)["results"])
+
+    return pd.read_csv(benchmark_file, sep=";")
+
+
+def compare_benchmarks(reference_file, benchmark_file):
+    """
+    Compares the results of two runs of run_construction_benchmark, e.g. of
+    two commits. Only cases contained in both runs are compared.
+
+    Parameters
+    ----------
+    reference_file : String
+        path to the results of the reference run
+    benchmark_file : String
+        path to the results of the run to be compared
+
+    Returns
+    -------
+    comparison : pd.DataFrame
+        metrics of both runs and their ratio (run / reference) for every case,
+        ratios above 1 indicate a regression
+
+    """
+
+    keys = ["model_type", "horizon_length", "breakpoints", "storages"]
+
+    comparison = pd.merge(
+        read_benchmark(reference_file),
+        read_benchmark(benchmark_file),
+        on=keys,
+        suffixes=("_reference", ""),
+    )
+    for metric in BENCHMARK_METRICS:
+        comparison[metric + "_ratio"] = (
+            comparison[metric] / comparison[metric + "_reference"]
+        )
+
+    return comparison.set_index(keys)
+
+
+if __name__ == "__main__":
+    # run the default sweep, the results are saved in src/results/benchmarks
+    os.chdir(src_path)
+    run_construction_benchmark(os.path.join("results", "benchmarks"))
@@ -0,0 +1,160 @@
+import os
+import sys
+import datetime
+
+import pandas as pd
+
+# make sure the package energy_system can be imported
+src_path = os.path.realpath(os.path.join(__file__, "..", ".."))
+if src_path not in sys.path:
+    sys.path.append(src_path)
+
+from energy_system.scenario_runner import run_scenarios
+
+# model types, whose efficiency curves can be built in different piecewise
+# representations (see sos2_builder.PIECEWISE_REPRESENTATIONS)
+PW_REPN_MODEL_TYPES = [
+    "sos2",
+    "sos2_with_constant_storage_efficiency",
+    "sos2_with_soc_dependent_efficiency",
+]
+
+# representations compared by default, LOG and DLOG need a number of segments
+# being a power of two
+PW_REPNS = ["SOS2", "CC", "DCC", "INC", "LOG", "DLOG"]
+
+# columns of the scenario status compared between the representations
+COMPARISON_COLUMNS = [
+    "solved",
+    "objective",
+    "final_mip_gap",
+    "solution_time",
+    "solve_wall_time",
+    "time_solve",
+]
+
+
+def expand_scenarios_by_pw_repn(scenario_options, pw_repns):
+    """
+    Creates a copy of every active scenario for each piecewise representation.
+    The copies are named <scenario>_<pw_repn> and only differ in the column
+    pw_repn.
+
+    Parameters
+    ----------
+    scenario_options : pd.DataFrame
+        scenario description as read from the scenario file
+    pw_repns : list
+        piecewise representations, e.g. PW_REPNS
+
+    Returns
+    -------
+    benchmark_options : pd.DataFrame
+        scenario description of all copies
+
+    """
+
+    rows = []
+    for i_scenario in scenario_options.index:
+        if not scenario_options.at[i_scenario, "active"]:
+            continue
+        for pw_repn in pw_repns:
+            row = scenario_options.loc[i_scenario].copy()
+            row["pw_repn"] = pw_repn
+            row.name = "{0}_{1}".format(i_scenario, pw_repn)
+            rows.append(row)
+
+    benchmark_options = pd.DataFrame(rows)
+    benchmark_options.index.name = scenario_options.index.name
+
+    return benchmark_options
+
+
+def run_pw_repn_benchmark(
+    scenario_file,
+    model_type,
+    export_root,
+    pw_repns=PW_REPNS,
+    solver_name="cplex",
+    number_of_workers=1,
+):
+    """
+    Solves every active scenario of a scenario file once for each piecewise
+    representation using run_scenarios. The expanded scenario description is
+    saved in export_root, the scenario status contains the solve time and the
+    final MIP gap of every representation. Scenarios are solved one after
+    another by default, so that the solve times are not distorted by
+    concurrent solves.
+
+    Parameters
+    ----------
+    scenario_file : String
+        path to csv-file containing the scenario description, ";" should be used
+        as separator
+    model_type : String
+        model type, one of PW_REPN_MODEL_TYPES
+    export_root : String
+        path to folder, where results are to be saved
+    pw_repns : list
+        piecewise representations to be compared
+    solver_name : String
+        name of the solver, e.g. cplex, gurobi, cbc, glpk, ...
+    number_of_workers : int
+        number of worker processes
+
+    Returns
+    -------
+    comparison : pd.DataFrame
+        COMPARISON_COLUMNS of the scenario status for every scenario (rows)
+        and representation (columns)
+
+    """
+
+    if model_type not in PW_REPN_MODEL_TYPES:
+        raise ValueError(
+            "The model type '{0}' has no piecewise representation. Choose one "
+            "of: {1}".format(model_type, ", ".join(PW_REPN_MODEL_TYPES))
+        )
+
+    if not os.path.exists(export_root):
+        os.makedirs(export_root)
+
+    scenario_options = pd.read_csv(scenario_file, index_col=0, sep=";")
+    benchmark_options = expand_scenarios_by_pw_repn(scenario_options, pw_repns)
+
+    # save the expanded scenario description, it is read by run_scenarios
+    benchmark_file = os.path.join(export_root, "pw_repn_benchmark_scenarios.csv")
+    benchmark_options.to_csv(benchmark_file, sep=";")
+
+    scenario_status = run_scenarios(
+        benchmark_file,
+        model_type,
+        export_root,
+        solver_name=solver_name,
+        number_of_workers=number_of_workers,
+    )
+
+    # compare the representations of each scenario
+    scenario_status = scenario_status.loc[scenario_status["active"] == 1].copy()
+    scenario_status["pw_repn"] = benchmark_options.loc[scenario_status.index, "pw_repn"]
+    scenario_status["scenario"] = [
+        i_scenario[: -len(pw_repn) - 1]
+        for i_scenario, pw_repn in zip(
+            scenario_status.index, scenario_status["pw_repn"]
+        )
+    ]
+    columns = [
+        column for column in COMPARISON_COLUMNS if column in scenario_status.columns
+    ]
+    comparison = scenario_status.pivot(
+        index="scenario", columns="pw_repn", values=columns
+    )
+
+    # create log message
+    log_msg = "[{0:s}]\tCompared {1:d} piecewise representations.\n".format(
+        datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), len(pw_repns)
+    )
+    # print log message
+    print(log_msg, end="")
+
+    return comparison
@@ -1,10 +1,36 @@
 import os
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
 import pwlf
 import matplotlib.pyplot as plt
+from scipy.optimize import lsq_linear, minimize
 from sklearn.linear_model import LinearRegression
 
+# methods of fitting breakpoints, see find_breakpoints
+FIT_METHODS = ["pwlf", "dp"]
+
+# measures of the error of the efficiency, see efficiency_error
+ERROR_MEASURES = ["rmse", "max"]
+
+# number of rows of a design plan read at once, see read_columns
+DESIGN_PLAN_CHUNKSIZE = 100000
+
+# minimum reduction of the sum of squared residuals, for which the breakpoints
+# enclosing a jump are preferred to the ones in the middle between the segments:
+# relative to the residuals without the jump and relative to the residuals of a
+# single line through the data, see fit_breakpoints_dp
+JUMP_SSR_IMPROVEMENT = 0.1
+JUMP_MIN_SSR_REDUCTION = 0.001
+
+# minimum width of a segment relative to the range of the data, narrower
+# segments only follow the noise of the data and vanish when the breakpoints
+# are rounded, see fit_breakpoints_dp
+MIN_SEGMENT_WIDTH = 0.01
+
 
 def find_constant_efficiency(
     csv_file, x_value_label, y_value_label, eff_value_label=None
@@ -39,11 +65,13 @@ def find_constant_efficiency(
 
     """
 
-    # read data from cvs file and separate in x and y values
-    raw_data = pd.read_csv(csv_file, sep=";")
-
-    x = np.array(raw_data.loc[:, x_value_label])
-    y = np.array(raw_data.loc[:, y_value_label])
+    # read x, y and efficiency values from cvs file
+    if eff_value_label == None:
+        x, y = read_columns(csv_file, [x_value_label, y_value_label])
+    else:
+        x, y, eta = read_columns(
+            csv_file, [x_value_label, y_value_label, eff_value_label]
+        )
 
     # Perform linear regression, without a intercept
     regression_model = LinearRegression(fit_intercept=False)
@@ -55,8 +83,6 @@ def find_constant_efficiency(
     # calculate maximum efficiency
     if eff_value_label == None:
         eta = y / x
-    else:
-        eta = np.array(raw_data.loc[:, eff_value_label])
 
     efficiency_max = max(eta)
 
@@ -66,13 +92,30 @@ def find_constant_efficiency(
     return efficiency_reg, efficiency_max, efficiency_mean
 
 
-def find_breakpoints(csv_file, x_value_label, y_value_label, number_of_breakpoints):
+def find_breakpoints(
+    csv_file,
+    x_value_label,
+    y_value_label,
+    number_of_breakpoints,
+    shape=None,
+    monotone=True,
+    fit_method="pwlf",
+    number_of_bins=None,
+    res_decimals=None,
+):
     """
     Function finds optimal breakpoints for given x and y data and number of breakpoints.
     The function uses the pwlf package to do so. The documentation for pwlf can be found at
     https://jekel.me/piecewise_linear_fit_py/pwlf.html.
     pwlf needs the number of segments as an input, therefore, the lower bound for
     number_of_breakpoints is 2.
+    Alternatively, the deterministic dynamic programming segmentation of
+    find_breakpoints_dp can be used (fit_method "dp").
+    If a shape is given, the unconstrained fit of pwlf is refitted by
+    fit_shape_constrained_breakpoints, so that the breakpoints form a concave or
+    convex curve. Concave curves of P_in_stor over P_in and P_out over
+    P_out_stor can be modelled as LP by the storage models (see
+    storage_models/envelope_builder.py).
 
     Parameters
     ----------
@@ -87,6 +130,21 @@ def find_breakpoints(csv_file, x_value_label, y_value_label, number_of_breakpoin
         are to be calculated.
     number_of_breakpoints : int,
         number of breakpoints to be calculated
+    shape : String, optional
+        "concave" or "convex" to constrain the slopes of the segments, None for
+        the unconstrained fit
+    monotone : bool
+        specifies if the fitted curve has to be increasing, only used if a
+        shape is given
+    fit_method : String
+        "pwlf" for the differential evolution of pwlf, "dp" for
+        find_breakpoints_dp
+    number_of_bins : int, optional
+        maximum number of candidate positions of the breakpoints of the
+        fit_method "dp", None to consider all distinct x values
+    res_decimals : int, optional
+        number of decimals of the saved breakpoints, which have to remain
+        distinct when rounded, only used for the fit_method "dp"
 
     Returns
     -------
@@ -97,27 +155,993 @@ def find_breakpoints(csv_file, x_value_label, y_value_label, number_of_breakpoin
 
     """
 
-    # read data from cvs file and separate in x and y values
-    raw_data = pd.read_csv(csv_file, sep=";")
+    if fit_method not in FIT_METHODS:
+        raise ValueError(
+            "Unknown fit method '{0}'. Choose one of: {1}".format(
+                fit_method, ", ".join(FIT_METHODS)
+            )
+        )
+
+    if fit_method == "dp":
+        return find_breakpoints_dp(
+            csv_file,
+            x_value_label,
+            y_value_label,
+            number_of_breakpoints,
+            number_of_bins,
+            shape,
+            monotone,
+            res_decimals,
+        )[number_of_breakpoints]
+
+    x, y = read_data(csv_file, x_value_label, y_value_label)
+
+    return fit_breakpoints(x, y, number_of_breakpoints, shape, monotone)
+
+
+def read_data(
+    csv_file,
+    x_value_label,
+    y_value_label,
+    summary_bins=None,
+    chunksize=DESIGN_PLAN_CHUNKSIZE,
+):
+    """
+    Function reads the x and y data, for which breakpoints are to be calculated.
+    If a number of summary bins is given, the data is reduced to the mean x and y
+    values of equally wide bins of x (see read_binned_columns), so that the memory
+    needed for fitting does not grow with the number of rows of the design plan.
+
+    Parameters
+    ----------
+    csv_file : String
+        path to csv-file containing x and y data, ";" should be used as separator
+    x_value_label : String
+        name of the column containing the x values of the data
+    y_value_label : String
+        name of the column containing the y values of the data
+    summary_bins : int, optional
+        number of bins of x, None to read all data points
+    chunksize : int
+        number of rows read at once
+
+    Returns
+    -------
+    x : np.array
+        x values of the data
+    y : np.array
+        y values of the data
+
+    """
+
+    if summary_bins is None:
+        return read_columns(csv_file, [x_value_label, y_value_label], chunksize)
+
+    return read_binned_columns(
+        csv_file, x_value_label, [y_value_label], summary_bins, chunksize
+    )
+
+
+def read_column_chunks(csv_file, column_labels, chunksize=DESIGN_PLAN_CHUNKSIZE):
+    """
+    Function reads the given columns of a design plan chunk by chunk. All other
+    columns, e.g. empty columns or notes like P_max_abs next to the data, are
+    skipped while parsing, the values are read as floats and rows with missing
+    values are dropped.
+
+    Parameters
+    ----------
+    csv_file : String
+        path to csv-file, ";" should be used as separator
+    column_labels : list
+        names of the columns to be read
+    chunksize : int
+        number of rows read at once
+
+    Returns
+    -------
+    chunks : generator
+        pd.DataFrame with the given columns for each chunk
+
+    """
+
+    # unique labels, a column may be requested twice (e.g. x and eta)
+    usecols = list(dict.fromkeys(column_labels))
+
+    with pd.read_csv(
+        csv_file,
+        sep=";",
+        usecols=usecols,
+        dtype={label: np.float64 for label in usecols},
+        chunksize=chunksize,
+    ) as reader:
+        for chunk in reader:
+            yield chunk.dropna()
+
+
+def read_columns(csv_file, column_labels, chunksize=DESIGN_PLAN_CHUNKSIZE):
+    """
+    Function reads the given columns of a design plan, see read_column_chunks.
 
-    x = np.array(raw_data.loc[:, x_value_label])
-    y = np.array(raw_data.loc[:, y_value_label])
+    Parameters
+    ----------
+    csv_file : String
+        path to csv-file, ";" should be used as separator
+    column_labels : list
+        names of the columns to be read
+    chunksize : int
+        number of rows read at once
+
+    Returns
+    -------
+    columns : list
+        values of each column (np.arrays)
+
+    """
+
+    chunks = [
+        chunk.to_numpy()
+        for chunk in read_column_chunks(csv_file, column_labels, chunksize)
+    ]
+    usecols = list(dict.fromkeys(column_labels))
+    data = np.concatenate(chunks) if chunks else np.empty((0, len(usecols)))
+
+    return [data[:, usecols.index(label)] for label in column_labels]
+
+
+def read_binned_columns(
+    csv_file,
+    x_value_label,
+    column_labels,
+    number_of_bins,
+    chunksize=DESIGN_PLAN_CHUNKSIZE,
+):
+    """
+    Function reads the mean values of the given columns in equally wide bins of x,
+    streaming the design plan twice: once to find the range of x, once to sum up the
+    values of each bin. Only the sums and counts of the bins are kept in memory.
+    Empty bins are dropped. Note that a fit of the bin means weights every bin
+    equally, regardless of the number of data points in it.
+
+    Parameters
+    ----------
+    csv_file : String
+        path to csv-file, ";" should be used as separator
+    x_value_label : String
+        name of the column containing the x values of the data
+    column_labels : list
+        names of the columns, whose mean values are to be calculated
+    number_of_bins : int
+        number of bins of x
+    chunksize : int
+        number of rows read at once
+
+    Returns
+    -------
+    x : np.array
+        mean x values of the non-empty bins
+    *columns : np.array
+        mean values of each column in the non-empty bins
+
+    """
+
+    # range of x
+    x_min = np.inf
+    x_max = -np.inf
+    for chunk in read_column_chunks(csv_file, [x_value_label], chunksize):
+        if len(chunk) > 0:
+            x_min = min(x_min, chunk[x_value_label].min())
+            x_max = max(x_max, chunk[x_value_label].max())
+    width = (x_max - x_min) / number_of_bins if x_max > x_min else 1
+
+    # sums and counts of each bin
+    labels = [x_value_label] + list(column_labels)
+    sums = np.zeros((len(labels), number_of_bins))
+    counts = np.zeros(number_of_bins)
+    for chunk in read_column_chunks(csv_file, labels, chunksize):
+        bins = np.minimum(
+            ((chunk[x_value_label].to_numpy() - x_min) / width).astype(int),
+            number_of_bins - 1,
+        )
+        counts += np.bincount(bins, minlength=number_of_bins)
+        for i, label in enumerate(labels):
+            sums[i] += np.bincount(
+                bins, weights=chunk[label].to_numpy(), minlength=number_of_bins
+            )
+
+    filled = counts > 0
+    means = sums[:, filled] / counts[filled]
+
+    return [means[i] for i in range(len(labels))]
+
+
+def fit_breakpoints(x, y, number_of_breakpoints, shape=None, monotone=True, seed=None):
+    """
+    Function fits breakpoints to given x and y data using pwlf, see find_breakpoints.
+
+    Parameters
+    ----------
+    x : np.array
+        x values of the data
+    y : np.array
+        y values of the data
+    number_of_breakpoints : int,
+        number of breakpoints to be calculated
+    shape : String, optional
+        "concave" or "convex" to constrain the slopes of the segments, None for
+        the unconstrained fit
+    monotone : bool
+        specifies if the fitted curve has to be increasing, only used if a
+        shape is given
+    seed : int, optional
+        seed of the differential evolution of pwlf, e.g. to restart the fit with
+        different seeds
+
+    Returns
+    -------
+    x_breakpoints : np.array of length L
+        x values of all breakpoints
+    y_breakpoints : np.array of length L
+        y values of all breakpoints
+
+    """
 
     # Normalize x
     lbd_x, ubd_x = np.min(x), np.max(x)
     x_norm = (x - lbd_x) / (ubd_x - lbd_x)
 
     # Obtain breakpoints
-    model_x = pwlf.PiecewiseLinFit(x_norm, y)
+    model_x = pwlf.PiecewiseLinFit(x_norm, y, seed=seed)
     x_breakpoints = model_x.fit(number_of_breakpoints - 1)
     y_breakpoints = model_x.predict(x_breakpoints)
 
     # Rescale x
     x_breakpoints = x_breakpoints * (ubd_x - lbd_x) + lbd_x
 
+    if shape is not None:
+        x_breakpoints, y_breakpoints = fit_shape_constrained_breakpoints(
+            x, y, x_breakpoints, shape, monotone
+        )
+
     return x_breakpoints, np.array(y_breakpoints)
 
 
+def segment_cost_table(x, y, boundaries):
+    """
+    Function calculates the sum of squared errors of a least squares line through
+    the data between each pair of candidate boundaries, vectorised by cumulative sums
+    of the data.
+
+    Parameters
+    ----------
+    x : np.array of length N
+        ascending x values of the data
+    y : np.array of length N
+        y values of the data
+    boundaries : np.array of length M
+        ascending indices of the data, at which a segment may start or end, incl.
+        0 and N
+
+    Returns
+    -------
+    cost : np.array of shape (M, M)
+        sum of squared errors of the segment from boundary i (first data point) to
+        boundary j (excluded), infinite if the segment contains less than two
+        data points
+
+    """
+
+    # centre the data to reduce cancellation in the sums
+    x = x - np.mean(x)
+    y = y - np.mean(y)
+
+    def _segment_sums(values):
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))[boundaries]
+        return cumulative[None, :] - cumulative[:, None]
+
+    n = _segment_sums(np.ones_like(x))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sum_x = _segment_sums(x)
+        c_xx = _segment_sums(x * x) - sum_x**2 / n
+        sum_y = _segment_sums(y)
+        c_xy = _segment_sums(x * y) - sum_x * sum_y / n
+        del sum_x
+        c_yy = _segment_sums(y * y) - sum_y**2 / n
+        del sum_y
+
+        # segments with a single distinct x value are fitted by their mean
+        cost = np.where(c_xx > 1e-12, c_yy - c_xy**2 / c_xx, c_yy)
+
+    cost = np.maximum(cost, 0)
+    cost[n < 2] = np.inf
+
+    return cost
+
+
+def find_breakpoints_dp(
+    csv_file,
+    x_value_label,
+    y_value_label,
+    maximum_number_of_breakpoints,
+    number_of_bins=None,
+    shape=None,
+    monotone=True,
+    res_decimals=None,
+):
+    """
+    Function finds breakpoints for given x and y data for all numbers of breakpoints
+    from 2 up to maximum_number_of_breakpoints in one pass. The data is split into
+    segments at candidate positions between distinct x values by dynamic programming,
+    minimising the sum of squared errors of a least squares line in each segment.
+    The segmentation is deterministic and, for the given candidates, optimal for lines
+    fitted independently in each segment. The boundaries of the segments are used as
+    inner breakpoints, either once or, to follow jumps of the data, twice enclosing the
+    gap between the segments. Starting from these guesses, the continuous fit is
+    refined locally by pwlf (fit_guess) and, if a shape is given, by
+    fit_shape_constrained_breakpoints.
+
+    Parameters
+    ----------
+    csv_file : String
+        path to csv-file containing x and y data for which the breakpoints are to be
+        calculated, ";" should be used as separator
+    x_value_label : String
+        name of the column containing the x values of the data for which the breakpoints
+        are to be calculated.
+    y_value_label : String
+        name of the column containing the y values of the data for which the breakpoints
+        are to be calculated.
+    maximum_number_of_breakpoints : int
+        upper bound of number of breakpoints to be calculated
+    number_of_bins : int, optional
+        maximum number of candidate positions, chosen at quantiles of the data, to
+        limit the size of the cost table (number_of_bins ** 2) for large data sets,
+        None to consider all distinct x values
+    shape : String, optional
+        "concave" or "convex" to constrain the slopes of the segments, None for
+        the unconstrained fit
+    monotone : bool
+        specifies if the fitted curve has to be increasing, only used if a
+        shape is given
+    res_decimals : int, optional
+        number of decimals of the saved breakpoints, every segment has to be at
+        least 10 ** -res_decimals wide and remain when rounded, None to only
+        exclude empty segments
+
+    Returns
+    -------
+    breakpoints : dict
+        x and y values of the breakpoints (np.arrays) for each number of breakpoints
+
+    """
+
+    x, y = read_data(csv_file, x_value_label, y_value_label)
+
+    return fit_breakpoints_dp(
+        x,
+        y,
+        maximum_number_of_breakpoints,
+        number_of_bins,
+        shape,
+        monotone,
+        res_decimals,
+    )
+
+
+def fit_breakpoints_dp(
+    x,
+    y,
+    maximum_number_of_breakpoints,
+    number_of_bins=None,
+    shape=None,
+    monotone=True,
+    res_decimals=None,
+):
+    """
+    Function fits breakpoints to given x and y data for all numbers of breakpoints
+    from 2 up to maximum_number_of_breakpoints by dynamic programming, see
+    find_breakpoints_dp.
+
+    Parameters
+    ----------
+    x : np.array
+        x values of the data
+    y : np.array
+        y values of the data
+    maximum_number_of_breakpoints : int
+        upper bound of number of breakpoints to be calculated
+    number_of_bins : int, optional
+        maximum number of candidate positions, None to consider all distinct x
+        values
+    shape : String, optional
+        "concave" or "convex" to constrain the slopes of the segments, None for
+        the unconstrained fit
+    monotone : bool
+        specifies if the fitted curve has to be increasing, only used if a
+        shape is given
+    res_decimals : int, optional
+        number of decimals of the saved breakpoints, every segment has to be at
+        least 10 ** -res_decimals wide and remain when rounded, None to only
+        exclude empty segments
+
+    Returns
+    -------
+    breakpoints : dict
+        x and y values of the breakpoints (np.arrays) for each number of breakpoints
+
+    """
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # sort data by x
+    order = np.argsort(x, kind="stable")
+    x = x[order]
+    y = y[order]
+
+    # segments may only start between distinct x values
+    boundaries = np.concatenate(([0], np.flatnonzero(np.diff(x) > 0) + 1, [len(x)]))
+    if number_of_bins is not None and len(boundaries) > number_of_bins + 1:
+        positions = np.linspace(0, len(boundaries) - 1, number_of_bins + 1)
+        boundaries = boundaries[np.unique(np.round(positions).astype(int))]
+
+    cost = segment_cost_table(x, y, boundaries)
+
+    # segments of the saved breakpoints must not vanish when they are rounded,
+    # not even the short segment of a jump
+    if res_decimals is None:
+        resolution = 0.0
+    else:
+        resolution = 10.0**-res_decimals
+
+    # exclude segments narrower than MIN_SEGMENT_WIDTH
+    min_width = max(MIN_SEGMENT_WIDTH * (x[-1] - x[0]), resolution)
+    first_x = x[np.minimum(boundaries, len(x) - 1)]
+    last_x = x[np.maximum(boundaries - 1, 0)]
+    cost[last_x[None, :] - first_x[:, None] < min_width] = np.inf
+
+    # minimal cost of splitting the data up to each boundary into k segments and
+    # the boundary, at which the last of these segments starts
+    best_cost = cost[0, :]
+    segment_starts = {}
+    for number_of_segments in range(2, maximum_number_of_breakpoints):
+        total_cost = best_cost[:, None] + cost
+        segment_starts[number_of_segments] = np.argmin(total_cost, axis=0)
+        best_cost = total_cost[
+            segment_starts[number_of_segments], np.arange(len(boundaries))
+        ]
+
+    def _segment_boundaries(number_of_segments):
+        # trace back the boundaries between the segments
+        knots = [len(boundaries) - 1]
+        for k in range(number_of_segments, 1, -1):
+            knots.append(segment_starts[k][knots[-1]])
+        return boundaries[knots[-1:0:-1]]
+
+    breakpoints = {}
+    model = pwlf.PiecewiseLinFit(x, y)
+    for number_of_breakpoints in range(2, maximum_number_of_breakpoints + 1):
+        number_of_inner = number_of_breakpoints - 2
+
+        # inner breakpoints in the middle between the data points of adjacent
+        # segments, or two breakpoints enclosing the gap between the segments,
+        # so that the continuous fit can follow a jump of the data (only used if
+        # it reduces the error clearly, see JUMP_SSR_IMPROVEMENT)
+        guesses = [
+            (x[b - 1] + x[b]) / 2 for b in _segment_boundaries(number_of_inner + 1)
+        ]
+        guesses = [np.array(guesses)]
+        if number_of_inner >= 2:
+            jumps = _segment_boundaries(number_of_inner // 2 + 1)
+            guess = [x_value for b in jumps for x_value in (x[b - 1], x[b])]
+            if number_of_inner % 2:
+                guess += [
+                    (x[b - 1] + x[b]) / 2
+                    for b in _segment_boundaries(number_of_inner // 2 + 2)
+                    if b not in jumps
+                ][:1]
+            if len(guess) == number_of_inner:
+                guesses.append(np.sort(guess))
+
+        # continuous least squares fit for each guess, refined by the local
+        # (deterministic) optimisation of pwlf
+        best_ssr = np.inf
+        for i_guess, guess in enumerate(guesses):
+            # the jump guess adds a short and steep segment, which is only kept
+            # if the data actually jumps, i.e. if it reduces the error clearly
+            if i_guess == 0:
+                required_ssr = np.inf
+            else:
+                required_ssr = (
+                    best_ssr
+                    - JUMP_SSR_IMPROVEMENT * best_ssr
+                    - JUMP_MIN_SSR_REDUCTION * cost[0, -1]
+                )
+
+            x_guess = np.concatenate(([x[0]], guess, [x[-1]]))
+            candidates = [x_guess]
+            if number_of_inner > 0:
+                candidates.append(model.fit_guess(guess))
+            for x_candidate in candidates:
+                # the refinement must not create segments narrower than the ones
+                # of the guess, only the jump guess may contain a narrow segment,
+                # which has to remain when the breakpoints are rounded
+                widths = np.diff(x_candidate)
+                if np.any(widths <= 0) or np.any(widths < resolution):
+                    continue
+                if res_decimals is not None and np.any(
+                    np.diff(np.round(x_candidate, res_decimals)) <= 0
+                ):
+                    continue
+                if i_guess == 0 and x_candidate is not x_guess:
+                    if np.any(widths < min_width):
+                        continue
+                ssr = model.fit_with_breaks(x_candidate)
+                if ssr < best_ssr and ssr < required_ssr:
+                    best_ssr = ssr
+                    x_breakpoints = np.array(x_candidate)
+                    y_breakpoints = model.predict(x_breakpoints)
+
+        if shape is not None:
+            x_breakpoints, y_breakpoints = fit_shape_constrained_breakpoints(
+                x, y, x_breakpoints, shape, monotone
+            )
+
+        breakpoints[number_of_breakpoints] = (x_breakpoints, np.array(y_breakpoints))
+
+    return breakpoints
+
+
+def fit_shape_constrained_breakpoints(x, y, x_breakpoints, shape, monotone=True):
+    """
+    Function fits a piecewise linear curve with concave or convex (and optionally
+    increasing) slopes to given x and y data by least squares. Starting from the
+    given x breakpoints, e.g. of an unconstrained fit, the inner x breakpoints are
+    shifted to minimise the error, the outer ones are kept.
+    The slopes are written as cumulative sums of non-negative slope changes, so that
+    the y breakpoints for fixed x breakpoints are found by bounded least squares
+    (scipy.optimize.lsq_linear).
+
+    Parameters
+    ----------
+    x : np.array
+        x values of the data
+    y : np.array
+        y values of the data
+    x_breakpoints : np.array of length L
+        ascending x values of the initial breakpoints
+    shape : String
+        "concave" for decreasing slopes, "convex" for increasing slopes
+    monotone : bool
+        specifies if the fitted curve has to be increasing
+
+    Returns
+    -------
+    x_breakpoints : np.array of length L
+        x values of all breakpoints
+    y_breakpoints : np.array of length L
+        y values of all breakpoints
+
+    """
+
+    if shape not in ["concave", "convex"]:
+        raise ValueError("Unknown shape '{0}'. Choose concave or convex.".format(shape))
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    x_breakpoints = np.asarray(x_breakpoints, dtype=float)
+    number_of_segments = len(x_breakpoints) - 1
+
+    # slopes as cumulative sums of the slope changes, concave: the slope of
+    # segment s is the sum of the changes of s and all following segments,
+    # convex: of s and all preceding segments
+    if shape == "concave":
+        cumulation = np.triu(np.ones((number_of_segments, number_of_segments)))
+        unbounded_change = number_of_segments - 1
+    else:
+        cumulation = np.tril(np.ones((number_of_segments, number_of_segments)))
+        unbounded_change = 0
+
+    # first parameter: y value of the first breakpoint, then the slope changes,
+    # the change of the flattest segment is its slope itself, which may only be
+    # negative if the curve need not be monotone
+    lower_bounds = np.zeros(number_of_segments + 1)
+    lower_bounds[0] = -np.inf
+    if not monotone:
+        lower_bounds[unbounded_change + 1] = -np.inf
+    upper_bounds = np.full(number_of_segments + 1, np.inf)
+
+    def _fit(x_bp):
+        # length of each segment covered up to each x value
+        covered = np.clip(x[:, None] - x_bp[None, :-1], 0, np.diff(x_bp)[None, :])
+        design = np.column_stack([np.ones(len(x)), covered @ cumulation])
+        result = lsq_linear(design, y, bounds=(lower_bounds, upper_bounds))
+        return result.x, 2 * result.cost
+
+    def _sum_of_squares(inner_breakpoints):
+        x_bp = np.concatenate(
+            ([x_breakpoints[0]], np.sort(inner_breakpoints), [x_breakpoints[-1]])
+        )
+        return _fit(x_bp)[1]
+
+    # shift the inner breakpoints
+    if number_of_segments > 1:
+        result = minimize(
+            _sum_of_squares,
+            x_breakpoints[1:-1],
+            method="Powell",
+            bounds=[(x_breakpoints[0], x_breakpoints[-1])] * (number_of_segments - 1),
+        )
+        if result.fun < _sum_of_squares(x_breakpoints[1:-1]):
+            x_breakpoints = np.concatenate(
+                ([x_breakpoints[0]], np.sort(result.x), [x_breakpoints[-1]])
+            )
+
+    parameters, _ = _fit(x_breakpoints)
+    slopes = cumulation @ parameters[1:]
+    y_breakpoints = parameters[0] + np.concatenate(
+        ([0], np.cumsum(slopes * np.diff(x_breakpoints)))
+    )
+
+    return x_breakpoints, y_breakpoints
+
+
+def fit_error(csv_file, x_value_label, y_value_label, x_breakpoints, y_breakpoints):
+    """
+    Function calculates the root mean squared error of the piecewise linear curve
+    through the given breakpoints compared to given x and y data, e.g. to compare
+    shape-constrained breakpoints with unconstrained ones.
+
+    Parameters
+    ----------
+    csv_file : String
+        path to csv-file containing x and y data, ";" should be used as separator
+    x_value_label : String
+        name of the column containing the x values of the data
+    y_value_label : String
+        name of the column containing the y values of the data
+    x_breakpoints : np.array of length L
+        ascending x values of the breakpoints
+    y_breakpoints : np.array of length L
+        y values of the breakpoints
+
+    Returns
+    -------
+    rmse : scalar
+        root mean squared error
+
+    """
+
+    x, y = read_data(csv_file, x_value_label, y_value_label)
+
+    return root_mean_squared_error(x, y, x_breakpoints, y_breakpoints)
+
+
+def root_mean_squared_error(x, y, x_breakpoints, y_breakpoints):
+    """
+    Function calculates the root mean squared error of the piecewise linear curve
+    through the given breakpoints compared to given x and y data.
+
+    Parameters
+    ----------
+    x : np.array
+        x values of the data
+    y : np.array
+        y values of the data
+    x_breakpoints : np.array of length L
+        ascending x values of the breakpoints
+    y_breakpoints : np.array of length L
+        y values of the breakpoints
+
+    Returns
+    -------
+    rmse : scalar
+        root mean squared error
+
+    """
+
+    y_fit = np.interp(x, x_breakpoints, y_breakpoints)
+
+    return np.sqrt(np.mean((y - y_fit) ** 2))
+
+
+def efficiency_error(x, y, x_breakpoints, y_breakpoints, eta=None, measure="rmse"):
+    """
+    Function calculates the error of the piecewise linear curve through the given
+    breakpoints compared to given data. If efficiencies are given, the curve is a
+    power y over a power x and the error of the efficiency y / x is calculated,
+    otherwise y is the efficiency itself.
+
+    Parameters
+    ----------
+    x : np.array
+        x values of the data
+    y : np.array
+        y values of the data
+    x_breakpoints : np.array of length L
+        ascending x values of the breakpoints
+    y_breakpoints : np.array of length L
+        y values of the breakpoints
+    eta : np.array, optional
+        efficiencies of the data, if y is not the efficiency itself
+    measure : String
+        "rmse" for the root mean squared error, "max" for the maximum absolute
+        error
+
+    Returns
+    -------
+    error : scalar
+        error of the efficiency
+
+    """
+
+    if measure not in ERROR_MEASURES:
+        raise ValueError(
+            "Unknown error measure '{0}'. Choose one of: {1}".format(
+                measure, ", ".join(ERROR_MEASURES)
+            )
+        )
+
+    y_fit = np.interp(x, x_breakpoints, y_breakpoints)
+    if eta is None:
+        deviation = y - y_fit
+    else:
+        deviation = eta - y_fit / x
+
+    if measure == "max":
+        return np.max(np.abs(deviation))
+
+    return np.sqrt(np.mean(deviation**2))
+
+
+def breakpoint_cache_key(
+    data_hash, x_value_label, y_value_label, number_of_breakpoints, x_min, x_max, **fit
+):
+    """
+    Function returns the key of a fit in the breakpoint cache, which changes with the
+    content of the data file, the column labels, the number of breakpoints, the bounds
+    x_min and x_max and the settings of the fit.
+
+    Parameters
+    ----------
+    data_hash : String
+        sha256 hash of the content of the data file
+    x_value_label : String
+        name of the column containing the x values of the data
+    y_value_label : String
+        name of the column containing the y values of the data
+    number_of_breakpoints : int,
+        number of breakpoints
+    x_min : scalar
+        minimal value of x, different from 0
+    x_max : scalar
+        maximal value of x
+    **fit
+        settings of the fit, e.g. shape, fit_method
+
+    Returns
+    -------
+    key : String
+        hexadecimal sha256 hash
+
+    """
+
+    key_data = {
+        "data_hash": data_hash,
+        "x_value_label": x_value_label,
+        "y_value_label": y_value_label,
+        "number_of_breakpoints": int(number_of_breakpoints),
+        "x_min": float(x_min),
+        "x_max": float(x_max),
+        **fit,
+    }
+
+    return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode()).hexdigest()
+
+
+def fit_breakpoint_counts(
+    x,
+    y,
+    numbers_of_breakpoints,
+    shape=None,
+    monotone=True,
+    fit_method="pwlf",
+    number_of_bins=None,
+    number_of_restarts=1,
+    number_of_workers=1,
+    res_decimals=None,
+):
+    """
+    Function fits breakpoints to given x and y data for several numbers of
+    breakpoints. With the fit_method "pwlf", every number of breakpoints is fitted
+    number_of_restarts times with different seeds, keeping the fit with the lowest
+    error. These fits are spread over number_of_workers processes. The fit_method
+    "dp" fits all numbers of breakpoints in one pass.
+
+    Parameters
+    ----------
+    x : np.array
+        x values of the data
+    y : np.array
+        y values of the data
+    numbers_of_breakpoints : list
+        numbers of breakpoints to be calculated
+    shape : String, optional
+        "concave" or "convex" to constrain the slopes of the segments, None for
+        the unconstrained fit
+    monotone : bool
+        specifies if the fitted curve has to be increasing, only used if a
+        shape is given
+    fit_method : String
+        "pwlf" or "dp", see find_breakpoints
+    number_of_bins : int, optional
+        maximum number of candidate positions of the breakpoints of the
+        fit_method "dp", None to consider all distinct x values
+    number_of_restarts : int
+        number of fits with different seeds for each number of breakpoints, only
+        used for the fit_method "pwlf"
+    number_of_workers : int
+        number of worker processes, 1 to fit in the calling process
+    res_decimals : int, optional
+        number of decimals of the saved breakpoints, which have to remain
+        distinct when rounded, only used for the fit_method "dp"
+
+    Returns
+    -------
+    breakpoints : dict
+        x and y values of the breakpoints (np.arrays) for each number of breakpoints
+
+    """
+
+    if len(numbers_of_breakpoints) == 0:
+        return {}
+
+    if fit_method == "dp":
+        breakpoints = fit_breakpoints_dp(
+            x,
+            y,
+            max(numbers_of_breakpoints),
+            number_of_bins,
+            shape,
+            monotone,
+            res_decimals,
+        )
+        return {n: breakpoints[n] for n in numbers_of_breakpoints}
+
+    tasks = [
+        (n, seed) for n in numbers_of_breakpoints for seed in range(number_of_restarts)
+    ]
+    if number_of_workers > 1:
+        with ProcessPoolExecutor(max_workers=number_of_workers) as executor:
+            futures = [
+                executor.submit(fit_breakpoints, x, y, n, shape, monotone, seed)
+                for n, seed in tasks
+            ]
+            fits = [future.result() for future in futures]
+    else:
+        fits = [fit_breakpoints(x, y, n, shape, monotone, seed) for n, seed in tasks]
+
+    # keep the fit with the lowest error of all restarts
+    breakpoints = {}
+    best_rmse = {}
+    for (n, _), (x_breakpoints, y_breakpoints) in zip(tasks, fits):
+        rmse = root_mean_squared_error(x, y, x_breakpoints, y_breakpoints)
+        if rmse < best_rmse.get(n, np.inf):
+            best_rmse[n] = rmse
+            breakpoints[n] = (x_breakpoints, y_breakpoints)
+
+    return breakpoints
+
+
+def cached_breakpoint_fits(
+    data_file,
+    x,
+    y,
+    x_value_label,
+    y_value_label,
+    numbers_of_breakpoints,
+    x_min,
+    x_max,
+    cache_dir=None,
+    summary_bins=None,
+    **fit
+):
+    """
+    Function returns the breakpoints of fit_breakpoint_counts for several numbers of
+    breakpoints. Fits are read from and written to a cache directory, one json-file
+    per fit named by breakpoint_cache_key, so that only missing fits are calculated.
+
+    Parameters
+    ----------
+    data_file : String
+        path to csv-file containing the x and y data, its content is hashed
+    x : np.array
+        x values of the data
+    y : np.array
+        y values of the data
+    x_value_label : String
+        name of the column containing the x values of the data
+    y_value_label : String
+        name of the column containing the y values of the data
+    numbers_of_breakpoints : list
+        numbers of breakpoints to be calculated
+    x_min : scalar
+        minimal value of x, different from 0
+    x_max : scalar
+        maximal value of x
+    cache_dir : String, optional
+        path to the cache directory, None to calculate all fits without cache
+    summary_bins : int, optional
+        number of bins, if x and y are bin means (see read_data), None if they are
+        all data points of the data file
+    **fit
+        keyword arguments of fit_breakpoint_counts
+
+    Returns
+    -------
+    breakpoints : dict
+        x and y values of the breakpoints (np.arrays) for each number of breakpoints
+
+    """
+
+    if cache_dir is None:
+        return fit_breakpoint_counts(x, y, numbers_of_breakpoints, **fit)
+
+    # hash the data file block by block to keep the memory flat
+    file_hash = hashlib.sha256()
+    with open(data_file, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            file_hash.update(block)
+    data_hash = file_hash.hexdigest()
+
+    # settings changing the result of a fit, the number of workers does not
+    key_settings = {
+        setting: value
+        for setting, value in fit.items()
+        if setting != "number_of_workers"
+    }
+    if summary_bins is not None:
+        key_settings["summary_bins"] = summary_bins
+    cache_files = {
+        n: os.path.join(
+            cache_dir,
+            breakpoint_cache_key(
+                data_hash, x_value_label, y_value_label, n, x_min, x_max, **key_settings
+            )
+            + ".json",
+        )
+        for n in numbers_of_breakpoints
+    }
+
+    breakpoints = {}
+    for n, cache_file in cache_files.items():
+        if os.path.exists(cache_file):
+            with open(cache_file) as file:
+                cached = json.load(file)
+            breakpoints[n] = (
+                np.array(cached["x_breakpoints"]),
+                np.array(cached["y_breakpoints"]),
+            )
+
+    missing = [n for n in numbers_of_breakpoints if n not in breakpoints]
+    fitted = fit_breakpoint_counts(x, y, missing, **fit)
+
+    if fitted and not os.path.exists(cache_dir):
+        os.makedirs(cache_dir)
+    for n, (x_breakpoints, y_breakpoints) in fitted.items():
+        with open(cache_files[n], "w") as file:
+            json.dump(
+                {
+                    "x_breakpoints": list(map(float, x_breakpoints)),
+                    "y_breakpoints": list(map(float, y_breakpoints)),
+                },
+                file,
+            )
+        breakpoints[n] = (x_breakpoints, y_breakpoints)
+
+    return breakpoints
+
+
 def process_breakpoints(x_breakpoints, y_breakpoints, x_min, x_max):
     """
     Process a given set of breakpoints to explicitly contain the points (0,0),
@@ -255,10 +1279,25 @@ def loop_breakpoint_calculation(
     x_max,
     res_decimals,
     log_msg: bool = True,
+    shape=None,
+    monotone=True,
+    fit_method="pwlf",
+    number_of_bins=None,
+    number_of_restarts=1,
+    number_of_workers=1,
+    cache_dir=None,
+    summary_bins=None,
 ):
     """
     loops over a range of number of breakpoints, each time calculating, processing and
     saving the calculated breakpoints to csv files
+    If a shape is given, the breakpoints are fitted with concave or convex slopes and
+    the root mean squared error is compared with the one of the unconstrained fit.
+    With the fit_method "dp", the breakpoints for all numbers of breakpoints are found
+    in one pass by find_breakpoints_dp.
+    The data file is read once. The fits of all numbers of breakpoints are calculated
+    before the loop, in parallel and with restarts (see fit_breakpoint_counts), and
+    are cached in cache_dir (see cached_breakpoint_fits).
 
     Parameters
     ----------
@@ -283,6 +1322,29 @@ def loop_breakpoint_calculation(
         maximal value of x
     log_msg: bool
         specifies if logging message should be displayed while calculating
+    shape : String, optional
+        "concave" or "convex" to constrain the slopes of the segments, None for
+        the unconstrained fit
+    monotone : bool
+        specifies if the fitted curve has to be increasing, only used if a
+        shape is given
+    fit_method : String
+        "pwlf" for the differential evolution of pwlf, "dp" for
+        find_breakpoints_dp
+    number_of_bins : int, optional
+        maximum number of candidate positions of the breakpoints of the
+        fit_method "dp", None to consider all distinct x values
+    number_of_restarts : int
+        number of fits with different seeds for each number of breakpoints, the fit
+        with the lowest error is kept, only used for the fit_method "pwlf"
+    number_of_workers : int
+        number of worker processes fitting the breakpoints
+    cache_dir : String, optional
+        path to folder, where finished fits are cached, None to disable the cache
+    summary_bins : int, optional
+        number of bins of x, whose mean values are fitted instead of all data points
+        to keep the memory flat for large design plans (see read_data), None to fit
+        all data points
 
     Returns
     -------
@@ -290,7 +1352,9 @@ def loop_breakpoint_calculation(
         dictionary containing the calculated x and y breakpoints as well as the
         processed x and y processed. The keys are in the form: x_{n}_breakpoints,
         y_{n}_breakpoints and x_{n}_breakpoints_processed, y_{n}_breakpoints_processed
-        respectively
+        respectively. If a shape is given, the root mean squared errors of the
+        constrained and the unconstrained fit and their difference are added as
+        rmse_{n}, rmse_{n}_unconstrained and extra_rmse_{n}
 
     """
 
@@ -302,15 +1366,60 @@ def loop_breakpoint_calculation(
     # initialize result dict
     res_dict = {}
 
+    # read data once
+    x, y = read_data(data_file, x_value_label, y_value_label, summary_bins)
+
+    # fit all numbers of breakpoints, the unconstrained fit is needed to
+    # compare the error of a shape-constrained fit
+    numbers_of_breakpoints = list(
+        range(minimal_number_of_breakpoints, maximum_number_of_breakpoints + 1)
+    )
+    fits = {}
+    for fit_shape in [shape] if shape is None else [shape, None]:
+        fits[fit_shape] = cached_breakpoint_fits(
+            data_file,
+            x,
+            y,
+            x_value_label,
+            y_value_label,
+            numbers_of_breakpoints,
+            x_min,
+            x_max,
+            cache_dir,
+            summary_bins,
+            shape=fit_shape,
+            monotone=monotone,
+            fit_method=fit_method,
+            number_of_bins=number_of_bins,
+            number_of_restarts=number_of_restarts,
+            number_of_workers=number_of_workers,
+            res_decimals=res_decimals,
+        )
+
     for n in range(minimal_number_of_breakpoints, maximum_number_of_breakpoints + 1):
         # log message
         if log_msg:
             print("\nCalculating breakpoints for {0} breakpoints:".format(n))
 
-        # calculate breakpoints
-        x_breakpoints, y_breakpoints = find_breakpoints(
-            data_file, x_value_label, y_value_label, n
-        )
+        # breakpoints calculated before the loop
+        x_breakpoints, y_breakpoints = fits[shape][n]
+
+        # compare the approximation error with the one of the unconstrained fit
+        if shape is not None:
+            rmse = root_mean_squared_error(x, y, x_breakpoints, y_breakpoints)
+            rmse_unconstrained = root_mean_squared_error(x, y, *fits[None][n])
+            res_dict["rmse_" + str(n)] = rmse
+            res_dict["rmse_" + str(n) + "_unconstrained"] = rmse_unconstrained
+            res_dict["extra_rmse_" + str(n)] = rmse - rmse_unconstrained
+
+            # log message
+            if log_msg:
+                print(
+                    "\nThe {0} fit has a root mean squared error of {1:.6f}, "
+                    "the unconstrained fit of {2:.6f} (difference: {3:.6f}).".format(
+                        shape, rmse, rmse_unconstrained, rmse - rmse_unconstrained
+                    )
+                )
         # log message
         if log_msg:
             print(
@@ -368,6 +1477,181 @@ def loop_breakpoint_calculation(
     return df_breakpoints
 
 
+def find_number_of_breakpoints(
+    data_file,
+    res_file_path,
+    x_value_label,
+    y_value_label,
+    tolerance,
+    x_min,
+    x_max,
+    res_decimals,
+    measure="rmse",
+    eta_value_label=None,
+    minimal_number_of_breakpoints=2,
+    maximum_number_of_breakpoints=10,
+    log_msg: bool = True,
+    shape=None,
+    monotone=True,
+    fit_method="pwlf",
+    number_of_bins=None,
+    number_of_restarts=1,
+    number_of_workers=1,
+    cache_dir=None,
+    summary_bins=None,
+):
+    """
+    finds the smallest number of breakpoints, for which the error of the efficiency
+    (see efficiency_error) does not exceed a tolerance, by bisection between
+    minimal_number_of_breakpoints and maximum_number_of_breakpoints. Fewer breakpoints
+    result in fewer SOS2 weights or binary variables per timestep of the storage
+    models. The bisection assumes the error to decrease with the number of
+    breakpoints, restarts (number_of_restarts) make this more likely for the
+    stochastic fit_method "pwlf". The breakpoints found are processed and saved like
+    in loop_breakpoint_calculation.
+
+    Parameters
+    ----------
+    data_file : String
+        path to csv-file containing x and y data for which the breakpoints are to be
+        calculated, ";" should be used as separator
+    res_file_path : string
+        path to folder, where files are to be saved
+    x_value_label : String
+        name of the column containing the x values of the data for which the breakpoints
+        are to be calculated.
+    y_value_label : String
+        name of the column containing the y values of the data for which the breakpoints
+        are to be calculated.
+    tolerance : scalar
+        maximum error of the efficiency
+    x_min : scalar
+        minimal value of x, different from 0
+    x_max : scalar
+        maximal value of x
+    res_decimals : int
+        number of decimals of the saved breakpoints
+    measure : String
+        "rmse" for the root mean squared error, "max" for the maximum absolute
+        error
+    eta_value_label : String, optional
+        name of the column containing the efficiency, if y is a power, None if y is
+        the efficiency itself (e.g. eta_in)
+    minimal_number_of_breakpoints : int
+        lower bound of number of breakpoints
+    maximum_number_of_breakpoints : int
+        upper bound of number of breakpoints
+    log_msg: bool
+        specifies if logging message should be displayed while calculating
+    shape, monotone, fit_method, number_of_bins, number_of_restarts,
+    number_of_workers, cache_dir, summary_bins
+        settings of the fit, see loop_breakpoint_calculation
+
+    Returns
+    -------
+    number_of_breakpoints : int
+        smallest number of breakpoints meeting the tolerance, or
+        maximum_number_of_breakpoints if the tolerance is not met
+    x_bp_processed : np.array
+        x values of processed breakpoints incl. 0, x_min and x_max
+    y_bp_processed : np.array
+        y values of processed breakpoints incl. 0, y_mpl and y_max
+    errors : pd.Series
+        error of the efficiency for each number of breakpoints evaluated
+
+    """
+
+    # the efficiency is binned like y, so that the error refers to the same points
+    if eta_value_label is None:
+        x, y = read_data(data_file, x_value_label, y_value_label, summary_bins)
+        eta = None
+    elif summary_bins is None:
+        x, y, eta = read_columns(
+            data_file, [x_value_label, y_value_label, eta_value_label]
+        )
+    else:
+        x, y, eta = read_binned_columns(
+            data_file, x_value_label, [y_value_label, eta_value_label], summary_bins
+        )
+
+    fits = {}
+    errors = {}
+
+    def _meets_tolerance(n):
+        fits.update(
+            cached_breakpoint_fits(
+                data_file,
+                x,
+                y,
+                x_value_label,
+                y_value_label,
+                [n],
+                x_min,
+                x_max,
+                cache_dir,
+                summary_bins,
+                shape=shape,
+                monotone=monotone,
+                fit_method=fit_method,
+                number_of_bins=number_of_bins,
+                number_of_restarts=number_of_restarts,
+                number_of_workers=number_of_workers,
+                res_decimals=res_decimals,
+            )
+        )
+        errors[n] = efficiency_error(x, y, *fits[n], eta, measure)
+
+        # log message
+        if log_msg:
+            print(
+                "\n{0} breakpoints: {1} error of the efficiency {2:.6f}".format(
+                    n, measure, errors[n]
+                )
+            )
+
+        return errors[n] <= tolerance
+
+    # bisection, the upper bound always meets the tolerance unless no number of
+    # breakpoints does
+    lower = minimal_number_of_breakpoints
+    upper = maximum_number_of_breakpoints
+    if not _meets_tolerance(upper):
+        # log message
+        if log_msg:
+            print(
+                "\nThe tolerance {0} is not met with {1} breakpoints.".format(
+                    tolerance, upper
+                )
+            )
+    else:
+        while lower < upper:
+            middle = (lower + upper) // 2
+            if _meets_tolerance(middle):
+                upper = middle
+            else:
+                lower = middle + 1
+
+    number_of_breakpoints = upper
+
+    # process breakpoints to include 0, x_min and x_max and save them
+    x_bp_processed, y_bp_processed = process_breakpoints(
+        *fits[number_of_breakpoints], x_min, x_max
+    )
+    save_breakpoints_to_csv(x_bp_processed, y_bp_processed, res_decimals, res_file_path)
+
+    # log message
+    if log_msg:
+        print(
+            "\nSelected {0} breakpoints, saved to {1}".format(
+                number_of_breakpoints, res_file_path
+            )
+        )
+
+    errors = pd.Series(errors, name=measure).sort_index()
+
+    return number_of_breakpoints, x_bp_processed, y_bp_processed, errors
+
+
 def __main__():
     # define path to data file
     data_file = os.path.realpath(
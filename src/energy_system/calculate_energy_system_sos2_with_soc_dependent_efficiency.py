@@ -18,6 +18,14 @@ model_path = os.path.realpath(os.path.join(__file__, "..", "..", "storage_models
 sys.path.append(model_path)
 
 from sos2_storage_with_soc_dependent_efficiency import Storage as Stor
+from energy_system.timeseries_cache import read_scaled_timeseries
+from energy_system.phase_timing import measure_phase, add_phase_time
+from energy_system.result_extraction import check_result_extraction, extract_results
+from energy_system.result_store import check_result_format, export_results
+from energy_system.results_catalog import catalog_file, record_run
+
+# model type implemented by this module, see scenario_runner.MODEL_TYPES
+MODEL_TYPE = "sos2_with_soc_dependent_efficiency"
 
 
 def read_scenario_file(scenario_file):
@@ -99,6 +107,14 @@ def read_scenario_parameters(scenario_options, i_scenario):
         for x in scenario_options.at[i_scenario, "p_out_breakpoints_[-]"].split(", ")
     ]
 
+    # representation of the piecewise linear efficiency curves, optional
+    # column of the scenario description defaulting to SOS2
+    pw_repn = "SOS2"
+    if "pw_repn" in scenario_options.columns and not pd.isna(
+        scenario_options.at[i_scenario, "pw_repn"]
+    ):
+        pw_repn = scenario_options.at[i_scenario, "pw_repn"]
+
     sf_dem = scenario_options.at[i_scenario, "sf_dem_[-]"]
     sf_res = scenario_options.at[i_scenario, "sf_res_[-]"]
 
@@ -116,31 +132,23 @@ def read_scenario_parameters(scenario_options, i_scenario):
         p_in_stor_breakpoints,
         p_out_breakpoints,
         p_out_stor_breakpoints,
+        pw_repn,
         sf_dem,
         sf_res,
     )
 
 
 def read_timeseries(scenario_options, i_scenario, sf_dem, sf_res):
-    # set path to timeseries data file
-    data_path = os.path.realpath(
-        os.path.join("data", scenario_options.at[i_scenario, "input_data"])
-    )
-
-    # import timeseries data as Series
-    demand = (
-        sf_dem
-        * pd.read_csv(data_path, index_col=0, parse_dates=[0], sep=";").loc[
-            :, "demand_[MW]"
-        ]
-    )
+    with measure_phase("csv_loading"):
+        # set path to timeseries data file
+        data_path = os.path.realpath(
+            os.path.join("data", scenario_options.at[i_scenario, "input_data"])
+        )
 
-    ee_generation = (
-        sf_res
-        * pd.read_csv(data_path, index_col=0, parse_dates=[0], sep=";").loc[
-            :, "ee_generation_[MW]"
-        ]
-    )
+        # import timeseries data as Series, the data file is parsed only once and
+        # shared by all scenarios using it
+        demand = read_scaled_timeseries(data_path, "demand_[MW]", sf_dem)
+        ee_generation = read_scaled_timeseries(data_path, "ee_generation_[MW]", sf_res)
 
     return demand, ee_generation
 
@@ -162,6 +170,8 @@ def energy_system_model(
     p_in_stor_breakpoints,
     p_out_breakpoints,
     p_out_stor_breakpoints,
+    pw_repn="SOS2",
+    number_of_storages=1,
 ):
     # create energy system
     energy_system = solph.EnergySystem(timeindex=timesteps, infer_last_interval=True)
@@ -213,25 +223,29 @@ def energy_system_model(
     # add storage
     ####################################################
 
-    storage = Stor(
-        label="storage",
-        el_inputs={bus_gen: solph.Flow()},
-        el_outputs={bus_dem: solph.Flow()},
-        P_MAX_IN=P_MAX_IN,
-        P_MAX_OUT=P_MAX_OUT,
-        P_MIN_IN=P_MIN_IN,
-        P_MIN_OUT=P_MIN_OUT,
-        SOC_MIN=SOC_MIN,
-        SOC_MAX=SOC_MAX,
-        SOC_INI=SOC_INI,
-        soc_breakpoints=soc_breakpoints,
-        soc_loss_breakpoints=soc_loss_breakpoints,
-        p_in_breakpoints=p_in_breakpoints,
-        p_in_stor_breakpoints=p_in_stor_breakpoints,
-        p_out_stor_breakpoints=p_out_stor_breakpoints,
-        p_out_breakpoints=p_out_breakpoints,
-    )
-    energy_system.add(storage)
+    # further storages with the same parameters are only used to benchmark
+    # the model construction (see benchmarks.model_construction)
+    for i_storage in range(number_of_storages):
+        storage = Stor(
+            label="storage" if i_storage == 0 else "storage_{0:d}".format(i_storage),
+            el_inputs={bus_gen: solph.Flow()},
+            el_outputs={bus_dem: solph.Flow()},
+            P_MAX_IN=P_MAX_IN,
+            P_MAX_OUT=P_MAX_OUT,
+            P_MIN_IN=P_MIN_IN,
+            P_MIN_OUT=P_MIN_OUT,
+            SOC_MIN=SOC_MIN,
+            SOC_MAX=SOC_MAX,
+            SOC_INI=SOC_INI,
+            soc_breakpoints=soc_breakpoints,
+            soc_loss_breakpoints=soc_loss_breakpoints,
+            p_in_breakpoints=p_in_breakpoints,
+            p_in_stor_breakpoints=p_in_stor_breakpoints,
+            p_out_stor_breakpoints=p_out_stor_breakpoints,
+            p_out_breakpoints=p_out_breakpoints,
+            pw_repn=pw_repn,
+        )
+        energy_system.add(storage)
 
     # create a pyomo optimization problem
     optimisation_model = solph.Model(energy_system)
@@ -258,6 +272,7 @@ def set_up_energy_system_model(scenario_options, i_scenario):
         p_in_stor_breakpoints,
         p_out_breakpoints,
         p_out_stor_breakpoints,
+        pw_repn,
         sf_dem,
         sf_res,
     ) = read_scenario_parameters(scenario_options, i_scenario)
@@ -268,31 +283,43 @@ def set_up_energy_system_model(scenario_options, i_scenario):
     )
 
     # create optimization model
-    model = energy_system_model(
-        timesteps,
-        demand,
-        ee_generation,
-        P_MAX_IN,
-        P_MAX_OUT,
-        P_MIN_IN,
-        P_MIN_OUT,
-        SOC_MIN,
-        SOC_MAX,
-        SOC_INI,
-        soc_breakpoints,
-        soc_loss_breakpoints,
-        p_in_breakpoints,
-        p_in_stor_breakpoints,
-        p_out_breakpoints,
-        p_out_stor_breakpoints,
-    )
+    with measure_phase("energy_system"):
+        model = energy_system_model(
+            timesteps,
+            demand,
+            ee_generation,
+            P_MAX_IN,
+            P_MAX_OUT,
+            P_MIN_IN,
+            P_MIN_OUT,
+            SOC_MIN,
+            SOC_MAX,
+            SOC_INI,
+            soc_breakpoints,
+            soc_loss_breakpoints,
+            p_in_breakpoints,
+            p_in_stor_breakpoints,
+            p_out_breakpoints,
+            p_out_stor_breakpoints,
+            pw_repn,
+        )
+        add_phase_time("storage_block", model.StorageBlock.create_time)
 
     return model
 
 
 def process_solver_results(
-    solver_results, model, scenario_status, i_scenario, export_root
+    solver_results,
+    model,
+    scenario_status,
+    i_scenario,
+    export_root,
+    result_extraction="oemof",
+    result_format="csv",
 ):
+    check_result_extraction(result_extraction)
+    check_result_format(result_format)
+
     # test success of solve
     if (solver_results.solver.status == SolverStatus.ok) or (
         solver_results.solver.termination_condition
@@ -302,86 +329,66 @@ def process_solver_results(
         meta_results = processing.meta_results(model)
         objective = meta_results["objective"]
         problem = meta_results["problem"]
-        final_mip_gap = abs(problem["Lower bound"] - objective) / objective
+        # the relative gap is not defined for a zero objective, e.g. of a window
+        # of a rolling horizon without any costs
+        if objective != 0:
+            final_mip_gap = abs(problem["Lower bound"] - objective) / objective
+        else:
+            final_mip_gap = abs(problem["Lower bound"] - objective)
         solver_metadata = {}
         solver_metadata = meta_results["solver"]
 
-        # get result dict
-        results = processing.results(model)
-        result_storage = pd.DataFrame(views.node(results, "storage")["sequences"])
-
-        # round to zero to account for numerical imprecision
-        result_storage[result_storage < 0.0000001] = 0
-
-        # calculate efficiency for every timestep
-        result_storage["eta_in"] = (
-            result_storage[(("storage", "None"), "P_in_stor")]
-            / result_storage[(("storage", "None"), "P_in")]
-        )
-        result_storage["eta_out"] = (
-            result_storage[(("storage", "None"), "P_out")]
-            / result_storage[(("storage", "None"), "P_out_stor")]
-        )
-
-        # make names easier human readable
-        result_storage.rename(
-            columns={
-                (("storage", "None"), "P_in_stor"): "P_in_stor",
-                (("storage", "None"), "P_in"): "P_in",
-                (("storage", "None"), "P_out"): "P_out",
-                (("storage", "None"), "P_out_stor"): "P_out_stor",
-                (("storage", "None"), "soc"): "soc",
-            },
-            inplace=True,
-        )
-
-        # get results for individual buses
-        result_bus_gen = pd.DataFrame(views.node(results, "bus_gen")["sequences"])
-
-        result_bus_dem = pd.DataFrame(views.node(results, "bus_dem")["sequences"])
-
-        # define results directory
-        # set path to directory
-        export_dir = os.path.realpath(os.path.join(export_root, i_scenario))
-        # create export directory if necessary
-        if not os.path.exists(export_dir):
-            os.makedirs(export_dir)
-
-        # export data of storage operation
-        export_file = os.path.realpath(os.path.join(export_dir, "storage.csv"))
-
-        result_storage.to_csv(
-            export_file,
-            header=True,
-            index=True,
-            index_label="datetime",
-            sep=";",
-            date_format="%Y-%m-%d %H:%M:%S",
-        )
-
-        # export data of generation bus
-        export_file = os.path.realpath(os.path.join(export_dir, "bus_gen.csv"))
-
-        result_bus_gen.to_csv(
-            export_file,
-            header=True,
-            index=True,
-            index_label="datetime",
-            sep=";",
-            date_format="%Y-%m-%d %H:%M:%S",
-        )
-
-        # export data of demand bus
-        export_file = os.path.realpath(os.path.join(export_dir, "bus_dem.csv"))
-
-        result_bus_dem.to_csv(
-            export_file,
-            header=True,
-            index=True,
-            index_label="datetime",
-            sep=";",
-            date_format="%Y-%m-%d %H:%M:%S",
-        )
+        # read the results from the pyomo variables directly, which is faster
+        # than processing the results of all variables by oemof
+        if result_extraction == "numpy":
+            result_storage, result_bus_gen, result_bus_dem = extract_results(model)
+        else:
+            # get result dict
+            results = processing.results(model)
+            result_storage = pd.DataFrame(views.node(results, "storage")["sequences"])
+
+            # round to zero to account for numerical imprecision
+            result_storage[result_storage < 0.0000001] = 0
+
+            # calculate efficiency for every timestep
+            result_storage["eta_in"] = (
+                result_storage[(("storage", "None"), "P_in_stor")]
+                / result_storage[(("storage", "None"), "P_in")]
+            )
+            result_storage["eta_out"] = (
+                result_storage[(("storage", "None"), "P_out")]
+                / result_storage[(("storage", "None"), "P_out_stor")]
+            )
+
+            # make names easier human readable
+            result_storage.rename(
+                columns={
+                    (("storage", "None"), "P_in_stor"): "P_in_stor",
+                    (("storage", "None"), "P_in"): "P_in",
+                    (("storage", "None"), "P_out"): "P_out",
+                    (("storage", "None"), "P_out_stor"): "P_out_stor",
+                    (("storage", "None"), "soc"): "soc",
+                },
+                inplace=True,
+            )
+
+            # get results for individual buses
+            result_bus_gen = pd.DataFrame(views.node(results, "bus_gen")["sequences"])
+
+            result_bus_dem = pd.DataFrame(views.node(results, "bus_dem")["sequences"])
+
+        with measure_phase("csv_export"):
+            export_results(
+                export_root,
+                i_scenario,
+                {
+                    "storage": result_storage,
+                    "bus_gen": result_bus_gen,
+                    "bus_dem": result_bus_dem,
+                },
+                result_format,
+                MODEL_TYPE,
+            )
 
         # set scenario status for current scenario
         scenario_status.at[i_scenario, "objective"] = objective
@@ -409,7 +416,7 @@ def process_solver_results(
     print(log_msg, end="")
 
 
-def export_scenario_description(export_root, scenario_status):
+def export_scenario_description(export_root, scenario_status, catalog=None):
     version_date = datetime.datetime.now().strftime("%d_%m_%Y__%H_%M")
 
     # export scenario status
@@ -419,6 +426,11 @@ def export_scenario_description(export_root, scenario_status):
 
     scenario_status.to_csv(export_file, index_label="name", sep=";")
 
+    # add the run to the results catalog, in the export directory by default
+    if catalog is None:
+        catalog = catalog_file(export_root)
+    record_run(catalog, export_file, scenario_status, MODEL_TYPE)
+
     # create log message
     log_msg = "[{0:s}]\tCalculated all scenarios.\n".format(
         datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
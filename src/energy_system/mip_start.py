@@ -0,0 +1,549 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+from pyomo.environ import value
+
+# model types, for which start values for all binary and SOS2 variables of
+# the StorageBlock can be derived from a schedule
+MIP_START_MODEL_TYPES = [
+    "sos2",
+    "sos2_with_constant_storage_efficiency",
+    "sos2_with_soc_dependent_efficiency",
+    "big_m",
+]
+
+# columns of a schedule, as written to storage.csv by process_solver_results
+SCHEDULE_COLUMNS = ["P_in", "P_out", "soc"]
+
+# solver log lines reporting a new incumbent and the elapsed time in seconds
+INCUMBENT_LOG_PATTERNS = {
+    # Cbc0012I Integer solution of 100908.43 found by DiveCoefficient after
+    # 0 iterations and 0 nodes (0.05 seconds)
+    "cbc": re.compile(
+        r"Integer solution of (?P<objective>[-+\deE.]+) found .*"
+        r"\((?P<time>[\d.]+) seconds\)"
+    ),
+    # H    0     0                    100908.43273  0.00000   100%     -    0s
+    "gurobi": re.compile(
+        r"^[H*]\s*\d+\s+\d+\s+.*?(?P<objective>[-+\deE.]+)\s+[-+\deE.]+\s+"
+        r"[\d.]+%\s+\S+\s+(?P<time>\d+)s"
+    ),
+    # MIP start 'm1' defined initial solution with objective 100908.4327.
+    # Found incumbent of value 100908.432700 after 0.05 sec. (1.23 ticks)
+    # incumbents, which are only reported in the node log, are not timed
+    "cplex": re.compile(
+        r"(?:MIP start .* defined initial solution with objective|"
+        r"Found incumbent of value) (?P<objective>[-+\deE.]*\d)\.?"
+        r"(?: after (?P<time>[\d.]+) sec\.)?"
+    ),
+    # H       0       0         0   0.00%   -inf            100908.43273  ...  0.1s
+    "highs": re.compile(
+        r"^\s*[A-Za-z]\s+\d+\s+\d+\s+\d+\s+[\d.]+%\s+\S+\s+"
+        r"(?P<objective>[-+\deE.]+)\s+.*\s(?P<time>[\d.]+)s\s*$"
+    ),
+}
+
+
+def read_schedule(export_dir):
+    """
+    Reads the storage schedule of a solved scenario, e.g. of the linear
+    storage model for the same week.
+
+    Parameters
+    ----------
+    export_dir : String
+        result directory of the scenario containing storage.csv
+
+    Returns
+    -------
+    schedule : pd.DataFrame
+        charging power P_in, discharging power P_out and state of charge soc
+        for every timestep
+
+    """
+
+    schedule = pd.read_csv(
+        os.path.join(export_dir, "storage.csv"), index_col=0, sep=";"
+    )
+
+    return schedule.loc[:, SCHEDULE_COLUMNS]
+
+
+def schedule_from_model(model):
+    """
+    Returns the storage schedule of the current solution of a model, e.g. to
+    start the next scenario of a sweep from it.
+
+    Parameters
+    ----------
+    model : solph.Model
+        solved model
+
+    Returns
+    -------
+    schedule : pd.DataFrame
+        charging power P_in, discharging power P_out and state of charge soc
+        for every timestep
+
+    """
+
+    block = model.StorageBlock
+    n = model.es.groups["storage"]
+
+    return pd.DataFrame(
+        {
+            column: [getattr(block, column)[n, t].value for t in model.TIMESTEPS]
+            for column in SCHEDULE_COLUMNS
+        }
+    )
+
+
+def find_segment(breakpoints, x):
+    """
+    Returns the index of the segment of a piecewise linear function containing
+    x, values outside of the breakpoints are assigned to the first or last
+    segment.
+
+    Parameters
+    ----------
+    breakpoints : list
+        ascending breakpoints of the piecewise linear function
+    x : scalar
+        value of the argument
+
+    Returns
+    -------
+    segment : int
+        index of the segment, between 0 and len(breakpoints) - 2
+
+    """
+
+    segment = int(np.searchsorted(breakpoints, x, side="right")) - 1
+
+    return max(0, min(segment, len(breakpoints) - 2))
+
+
+def sos2_weights(breakpoints, x):
+    """
+    Returns the weights of the SOS2 representation of x, i.e. at most two
+    adjacent non-zero weights summing up to 1.
+
+    Parameters
+    ----------
+    breakpoints : list
+        ascending breakpoints of the piecewise linear function
+    x : scalar
+        value of the argument
+
+    Returns
+    -------
+    weights : list
+        weight of each breakpoint
+
+    """
+
+    weights = [0.0] * len(breakpoints)
+
+    segment = find_segment(breakpoints, x)
+    x_left = breakpoints[segment]
+    x_right = breakpoints[segment + 1]
+    share_right = min(1.0, max(0.0, (x - x_left) / (x_right - x_left)))
+
+    weights[segment] = 1 - share_right
+    weights[segment + 1] = share_right
+
+    return weights
+
+
+def set_disjunctive_start(relation, n, t):
+    """
+    Sets the start values of the segment variables of a piecewise linear
+    relation built by disjunctive_builder.add_disjunctive_relation, derived
+    from the value of its argument x.
+
+    Parameters
+    ----------
+    relation : dict
+        relation as kept in StorageBlock.disjunctive_relations
+    n : Storage
+        storage node of the energy system
+    t : int
+        timestep
+
+    Returns
+    -------
+    -
+
+    """
+
+    breakpoints = relation["x_breakpoints"][n]
+    x = relation["x"][n, t].value
+
+    segment = find_segment(breakpoints, x)
+    x_left = breakpoints[segment]
+    x_right = breakpoints[segment + 1]
+    share_right = min(1.0, max(0.0, (x - x_left) / (x_right - x_left)))
+
+    for s in range(len(breakpoints) - 1):
+        if relation["formulation"] == "incremental":
+            # all segments left of the active one are completely filled
+            if s < segment:
+                relation["fill"][n, s, t].value = 1.0
+            elif s == segment:
+                relation["fill"][n, s, t].value = share_right
+            else:
+                relation["fill"][n, s, t].value = 0.0
+            if s < len(breakpoints) - 2:
+                relation["z"][n, s, t].value = 1 if s < segment else 0
+        else:
+            relation["z"][n, s, t].value = 1 if s == segment else 0
+            if relation["formulation"] == "multiple_choice":
+                relation["x_segment"][n, s, t].value = x if s == segment else 0.0
+            else:
+                active = 1.0 if s == segment else 0.0
+                relation["weights"][n, 2 * s, t].value = active * (1 - share_right)
+                relation["weights"][n, 2 * s + 1, t].value = active * share_right
+
+
+def storage_losses(storage, soc):
+    """
+    Returns the energy lost between two timesteps at a given state of charge,
+    depending on the storage model.
+
+    Parameters
+    ----------
+    storage : Storage
+        storage node of the energy system
+    soc : scalar
+        state of charge at the beginning of the timestep
+
+    Returns
+    -------
+    soc_loss : scalar
+        storage losses
+
+    """
+
+    if hasattr(storage, "soc_loss_breakpoints"):
+        return float(
+            np.interp(soc, storage.soc_breakpoints, storage.soc_loss_breakpoints)
+        )
+    if hasattr(storage, "ETA_SOC"):
+        return soc * (1 - storage.ETA_SOC)
+
+    return 0.0
+
+
+def required_state_of_charge(model, storage, soc_terminal):
+    """
+    Returns the minimum state of charge at the end of every timestep, from
+    which the terminal state of charge can still be reached by charging at
+    maximum power in all remaining timesteps.
+
+    Parameters
+    ----------
+    model : solph.Model
+        model of the scenario to be started
+    storage : Storage
+        storage node of the energy system
+    soc_terminal : scalar
+        minimum state of charge at the last timestep
+
+    Returns
+    -------
+    soc_required : np.ndarray
+        minimum state of charge for every timestep
+
+    """
+
+    p_in_stor_max = np.interp(
+        storage.P_MAX_IN, storage.p_in_breakpoints, storage.p_in_stor_breakpoints
+    )
+
+    # the state of charge remaining after the losses of a timestep is
+    # piecewise linear between these states of charge
+    soc_grid = sorted(
+        set(
+            [storage.SOC_MIN, storage.SOC_MAX]
+            + [
+                soc
+                for soc in getattr(storage, "soc_breakpoints", [])
+                if storage.SOC_MIN < soc < storage.SOC_MAX
+            ]
+        )
+    )
+    soc_retained = [soc - storage_losses(storage, soc) for soc in soc_grid]
+
+    timesteps = list(model.TIMESTEPS)
+    soc_required = np.full(len(timesteps), float(storage.SOC_MIN))
+    soc_required[-1] = max(soc_terminal, storage.SOC_MIN)
+    for i in range(len(timesteps) - 1, 0, -1):
+        soc_required[i - 1] = np.interp(
+            soc_required[i] - p_in_stor_max * model.timeincrement[timesteps[i]],
+            soc_retained,
+            soc_grid,
+        )
+
+    return soc_required
+
+
+def make_schedule_feasible(model, schedule):
+    """
+    Turns a schedule, e.g. of the linear storage model, into a schedule
+    respecting the operating limits and the efficiency curves of the storage
+    of the model. Charging and discharging power are clipped to the operating
+    range, the state of charge is recalculated from the initial state of charge
+    and power is reduced, if the state of charge would leave its limits.
+    Towards the end, discharging is reduced or the storage is charged, so that
+    the terminal state of charge (constraint soc_end) is reached.
+
+    Parameters
+    ----------
+    model : solph.Model
+        model of the scenario to be started
+    schedule : pd.DataFrame
+        charging power P_in and discharging power P_out for every timestep
+
+    Returns
+    -------
+    schedule : pd.DataFrame
+        P_in, P_in_stor, P_out, P_out_stor, soc and soc_loss for every timestep
+
+    """
+
+    n = model.es.groups["storage"]
+    demand_flow = (model.es.groups["bus_dem"], model.es.groups["dem"])
+
+    p_in_schedule = schedule["P_in"].to_numpy()
+    p_out_schedule = schedule["P_out"].to_numpy()
+
+    # the storage has to end at least at SOC_INI, unless the constraint soc_end
+    # is replaced (see model_template.set_terminal_state_of_charge)
+    if model.StorageBlock.soc_end.active:
+        soc_terminal = n.SOC_INI
+    elif model.component("terminal_soc") is not None:
+        soc_terminal = value(model.terminal_soc.lower)
+    else:
+        soc_terminal = n.SOC_MIN
+    soc_required = required_state_of_charge(model, n, soc_terminal)
+    p_in_stor_min, p_in_stor_max = np.interp(
+        [n.P_MIN_IN, n.P_MAX_IN], n.p_in_breakpoints, n.p_in_stor_breakpoints
+    )
+
+    rows = []
+    soc = n.SOC_INI
+    for t in model.TIMESTEPS:
+        dt = model.timeincrement[t]
+        p_in = p_in_schedule[t]
+        p_out = p_out_schedule[t]
+
+        # storage either charges or discharges
+        if p_in >= p_out:
+            p_out = 0.0
+        else:
+            p_in = 0.0
+
+        # discharging power cannot exceed the demand
+        p_out = min(p_out, model.flow[demand_flow + (t,)].value)
+
+        # operating range, below half of the minimal power the storage is off
+        p_in = (
+            0.0 if p_in < 0.5 * n.P_MIN_IN else min(max(p_in, n.P_MIN_IN), n.P_MAX_IN)
+        )
+        p_out = (
+            0.0
+            if p_out < 0.5 * n.P_MIN_OUT
+            else min(max(p_out, n.P_MIN_OUT), n.P_MAX_OUT)
+        )
+
+        soc_loss = storage_losses(n, soc)
+        soc_start = soc - soc_loss
+
+        p_in_stor = np.interp(p_in, n.p_in_breakpoints, n.p_in_stor_breakpoints)
+        p_out_stor = np.interp(p_out, n.p_out_breakpoints, n.p_out_stor_breakpoints)
+
+        # reduce charging power, if the storage would be overcharged
+        if soc_start + p_in_stor * dt > n.SOC_MAX:
+            p_in_stor = max(0.0, (n.SOC_MAX - soc_start) / dt)
+            p_in = np.interp(p_in_stor, n.p_in_stor_breakpoints, n.p_in_breakpoints)
+            if p_in < n.P_MIN_IN:
+                p_in, p_in_stor = 0.0, 0.0
+
+        # reduce discharging power, if the storage would be overdischarged
+        if soc_start - p_out_stor * dt < n.SOC_MIN:
+            p_out_stor = max(0.0, (soc_start - n.SOC_MIN) / dt)
+            p_out = np.interp(p_out_stor, n.p_out_stor_breakpoints, n.p_out_breakpoints)
+            if p_out < n.P_MIN_OUT:
+                p_out, p_out_stor = 0.0, 0.0
+
+        # keep the state of charge needed to reach the terminal state of
+        # charge, first by reducing discharging power and then by charging
+        if soc_start + (p_in_stor - p_out_stor) * dt < soc_required[t]:
+            p_stor = (soc_required[t] - soc_start) / dt
+            if p_stor <= 0:
+                p_out_stor = -p_stor
+                p_out = np.interp(
+                    p_out_stor, n.p_out_stor_breakpoints, n.p_out_breakpoints
+                )
+                if p_out < n.P_MIN_OUT:
+                    p_out, p_out_stor = 0.0, 0.0
+            else:
+                p_out, p_out_stor = 0.0, 0.0
+                p_in_stor = min(
+                    max(p_stor, p_in_stor_min),
+                    p_in_stor_max,
+                    max(0.0, (n.SOC_MAX - soc_start) / dt),
+                )
+                p_in = np.interp(p_in_stor, n.p_in_stor_breakpoints, n.p_in_breakpoints)
+
+        # avoid negative values due to numerical imprecision
+        soc = max(0.0, soc_start + (p_in_stor - p_out_stor) * dt)
+
+        rows.append(
+            {
+                "P_in": p_in,
+                "P_in_stor": p_in_stor,
+                "P_out": p_out,
+                "P_out_stor": p_out_stor,
+                "soc": soc,
+                "soc_loss": storage_losses(n, soc),
+            }
+        )
+
+    return pd.DataFrame(rows)
+
+
+def set_mip_start(model, schedule):
+    """
+    Sets consistent start values for all variables of a model derived from a
+    storage schedule: the storage powers, the state of charge, the binary
+    variables Y_p_in and Y_p_out, the segment variables delta and delta_out of
+    the big-M model or of its alternative formulations, the SOS2 weights of
+    the piecewise linear relations and the flows of the energy system. Solvers
+    accepting warm starts use these values as first incumbent, if solve is
+    called with warmstart=True.
+
+    Parameters
+    ----------
+    model : solph.Model
+        model of the scenario to be started, the fixed flows have to be set
+    schedule : pd.DataFrame
+        charging power P_in and discharging power P_out for at least every
+        timestep of the model, e.g. as returned by read_schedule or
+        schedule_from_model
+
+    Returns
+    -------
+    -
+
+    """
+
+    # exported schedules contain the additional last interval of the results
+    if len(schedule) < len(model.TIMESTEPS):
+        raise ValueError(
+            "The schedule has {0:d} timesteps, but the model {1:d}.".format(
+                len(schedule), len(model.TIMESTEPS)
+            )
+        )
+    schedule = schedule.iloc[: len(model.TIMESTEPS)]
+
+    block = model.StorageBlock
+    nodes = model.es.groups
+    n = nodes["storage"]
+
+    schedule = make_schedule_feasible(model, schedule)
+
+    # breakpoints of the segments of the big-M formulation, relations built
+    # as linear inequalities have no segment variables (see envelope_builder)
+    if hasattr(block, "s"):
+        breakpoints_in = [block.x_in_data[n, k] for k in range(len(n.BS) + 1)]
+        breakpoints_out = [block.x_out_data[n, k] for k in range(len(n.BS_out) + 1)]
+
+    for t in model.TIMESTEPS:
+        row = schedule.loc[t]
+
+        for column in ["P_in", "P_in_stor", "P_out", "P_out_stor", "soc", "soc_loss"]:
+            if hasattr(block, column):
+                getattr(block, column)[n, t].value = row[column]
+
+        block.Y_p_in[n, t].value = 1 if row["P_in"] > 0 else 0
+        block.Y_p_out[n, t].value = 1 if row["P_out"] > 0 else 0
+
+        # active segments of the big-M formulation
+        if hasattr(block, "delta"):
+            segment_in = find_segment(breakpoints_in, row["P_in"])
+            for s in block.s:
+                block.delta[n, s, t].value = 1 if s == segment_in else 0
+        if hasattr(block, "delta_out"):
+            segment_out = find_segment(breakpoints_out, row["P_out_stor"])
+            for s in block.s:
+                block.delta_out[n, s, t].value = 1 if s == segment_out else 0
+
+        # flows of the energy system balancing the buses
+        ee_generation = model.flow[nodes["ee_gen"], nodes["bus_gen"], t].value
+        demand = model.flow[nodes["bus_dem"], nodes["dem"], t].value
+        connect = max(0.0, demand - row["P_out"])
+        model.flow[nodes["bus_gen"], n, t].value = row["P_in"]
+        model.flow[n, nodes["bus_dem"], t].value = row["P_out"]
+        model.flow[nodes["bus_gen"], nodes["connect"], t].value = connect
+        model.flow[nodes["connect"], nodes["bus_dem"], t].value = connect
+        model.flow[nodes["fossil_gen"], nodes["bus_gen"], t].value = max(
+            0.0, connect + row["P_in"] - ee_generation
+        )
+        model.flow[nodes["bus_gen"], nodes["cut_off"], t].value = max(
+            0.0, ee_generation - connect - row["P_in"]
+        )
+
+    # SOS2 weights of all piecewise linear relations (see sos2_builder),
+    # derived from the value of the argument of each relation
+    for relation in getattr(block, "sos2_relations", {}).values():
+        for t in model.TIMESTEPS:
+            weights = sos2_weights(
+                relation["x_breakpoints"][n], relation["x"][n, t].value
+            )
+            for k, weight in enumerate(weights):
+                relation["weights"][n, k, t].value = weight
+
+    # segment variables of the alternative formulations of the big-M model
+    # (see disjunctive_builder)
+    for relation in getattr(block, "disjunctive_relations", {}).values():
+        for t in model.TIMESTEPS:
+            set_disjunctive_start(relation, n, t)
+
+
+def parse_first_incumbent(log_file, solver_name):
+    """
+    Reads the time and objective of the first incumbent from a solver log.
+
+    Parameters
+    ----------
+    log_file : String
+        path to the log file of the solver
+    solver_name : String
+        name of the solver, only the logs of the solvers in
+        INCUMBENT_LOG_PATTERNS can be read
+
+    Returns
+    -------
+    time_to_first_incumbent : float
+        seconds until the first incumbent was found, 0 for a MIP start
+        accepted by the solver and NaN if unknown
+    first_incumbent_objective : float
+        objective of the first incumbent, NaN if unknown
+
+    """
+
+    if solver_name not in INCUMBENT_LOG_PATTERNS or not os.path.exists(log_file):
+        return np.nan, np.nan
+
+    with open(log_file, "r", errors="replace") as file:
+        for line in file:
+            match = INCUMBENT_LOG_PATTERNS[solver_name].search(line)
+            if match:
+                # a MIP start is reported before the search without a time
+                time_to_first_incumbent = float(match.group("time") or 0.0)
+                return time_to_first_incumbent, float(match.group("objective"))
+
+    return np.nan, np.nan
@@ -0,0 +1,222 @@
+import datetime
+
+from pyomo.environ import Constraint, value
+
+# columns of the scenario description, which are parameters of a model
+# template, i.e. they can be changed without rebuilding the model
+TEMPLATE_PARAMETERS = ["sf_dem_[-]", "sf_res_[-]", "SOC_INI_[-]"]
+
+# columns of the scenario description, which only affect the solver
+SOLVER_PARAMETERS = ["active", "solve_timeout", "mip_gap"]
+
+
+def model_template_key(scenario_options, i_scenario):
+    """
+    Returns a key identifying the structure of the model of a scenario.
+    Scenarios with the same key only differ in the parameters listed in
+    TEMPLATE_PARAMETERS and SOLVER_PARAMETERS and can share one model template.
+
+    Parameters
+    ----------
+    scenario_options : pd.DataFrame
+        scenario description as read by read_scenario_file
+    i_scenario : String
+        name of the scenario
+
+    Returns
+    -------
+    key : tuple
+        values of all structural columns of the scenario
+
+    """
+
+    return tuple(
+        str(scenario_options.at[i_scenario, column])
+        for column in scenario_options.columns
+        if column not in TEMPLATE_PARAMETERS + SOLVER_PARAMETERS
+    )
+
+
+def group_scenarios_by_template(scenario_options, scenarios):
+    """
+    Groups scenarios sharing the same model template (see model_template_key).
+    The order of the scenarios is kept within each group.
+
+    Parameters
+    ----------
+    scenario_options : pd.DataFrame
+        scenario description as read by read_scenario_file
+    scenarios : list
+        names of the scenarios to be grouped
+
+    Returns
+    -------
+    scenario_groups : list
+        list of lists containing the names of the scenarios of each group
+
+    """
+
+    scenario_groups = {}
+    for i_scenario in scenarios:
+        key = model_template_key(scenario_options, i_scenario)
+        scenario_groups.setdefault(key, []).append(i_scenario)
+
+    return list(scenario_groups.values())
+
+
+def update_model_template(model, module, scenario_options, i_scenario):
+    """
+    Updates a model built by set_up_energy_system_model to the parameters of
+    another scenario with the same model template. The fixed flows of the
+    renewable generation and the demand are set to the scaled timeseries and
+    the initial state of charge of the storage is changed in the mutable
+    parameters of the StorageBlock.
+
+    Parameters
+    ----------
+    model : solph.Model
+        model of a scenario with the same model_template_key, is changed in place
+    module : module
+        module implementing the energy system of the model type
+    scenario_options : pd.DataFrame
+        scenario description as read by read_scenario_file
+    i_scenario : String
+        name of the scenario
+
+    Returns
+    -------
+    -
+
+    """
+
+    # create log message
+    log_msg = "[{0:s}]\tCalculating scenario: '{1:s}' (model template)\n".format(
+        datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), i_scenario
+    )
+    # print log message
+    print(log_msg, end="")
+
+    sf_dem = scenario_options.at[i_scenario, "sf_dem_[-]"]
+    sf_res = scenario_options.at[i_scenario, "sf_res_[-]"]
+    SOC_INI = scenario_options.at[i_scenario, "SOC_INI_[-]"]
+
+    # read timeseries data
+    demand, ee_generation = module.read_timeseries(
+        scenario_options, i_scenario, sf_dem, sf_res
+    )
+
+    set_fixed_flows(model, demand, ee_generation)
+    set_initial_state_of_charge(model, SOC_INI)
+
+
+def set_fixed_flows(model, demand, ee_generation):
+    """
+    Sets the fixed flows of the renewable generation and the demand of a model.
+    The values are assigned by position, i.e. the first value of each Series
+    is used for the first timestep of the model.
+
+    Parameters
+    ----------
+    model : solph.Model
+        model built by set_up_energy_system_model, is changed in place
+    demand : pd.Series
+        scaled demand, at least one value for each timestep of the model
+    ee_generation : pd.Series
+        scaled renewable generation, at least one value for each timestep of
+        the model
+
+    Returns
+    -------
+    -
+
+    """
+
+    nodes = model.es.groups
+
+    for (source, target), timeseries in [
+        ((nodes["ee_gen"], nodes["bus_gen"]), ee_generation),
+        ((nodes["bus_dem"], nodes["dem"]), demand),
+    ]:
+        nominal_value = model.flows[source, target].nominal_value
+        for t in model.TIMESTEPS:
+            model.flow[source, target, t].fix(timeseries.iloc[t] * nominal_value)
+
+
+def set_initial_state_of_charge(model, SOC_INI):
+    """
+    Sets the initial state of charge of the storage of a model in the storage
+    node and in the mutable parameters of the StorageBlock.
+
+    Parameters
+    ----------
+    model : solph.Model
+        model built by set_up_energy_system_model, is changed in place
+    SOC_INI : scalar
+        initial state of charge as given in the scenario description
+
+    Returns
+    -------
+    -
+
+    """
+
+    storage = model.es.groups["storage"]
+    storage.set_initial_state_of_charge(SOC_INI)
+    model.StorageBlock.SOC_INI[storage] = storage.SOC_INI
+    if hasattr(storage, "SOC_LOSS_INI"):
+        model.StorageBlock.SOC_LOSS_INI[storage] = storage.SOC_LOSS_INI
+
+
+def set_terminal_state_of_charge(model, soc_end=None):
+    """
+    Replaces the constraint soc_end of the StorageBlock, which requires the
+    state of charge at the last timestep to be at least SOC_INI, by a given
+    minimum state of charge. Without a minimum, the storage may end at any
+    state of charge, e.g. in all but the last window of a rolling horizon,
+    whose SOC_INI is the state of charge handed over by the previous window.
+
+    Parameters
+    ----------
+    model : solph.Model
+        model built by set_up_energy_system_model, is changed in place
+    soc_end : float, optional
+        absolute minimum state of charge at the last timestep, None to leave
+        the state of charge at the last timestep free
+
+    Returns
+    -------
+    -
+
+    """
+
+    storage = model.es.groups["storage"]
+    model.StorageBlock.soc_end.deactivate()
+
+    if model.component("terminal_soc") is not None:
+        model.del_component("terminal_soc")
+    if soc_end is not None:
+        model.terminal_soc = Constraint(
+            expr=model.StorageBlock.soc[storage, model.TIMESTEPS.last()] >= soc_end
+        )
+
+
+def initial_state_of_charge(model):
+    """
+    Returns the absolute initial state of charge of the storage of a model,
+    as set by set_initial_state_of_charge.
+
+    Parameters
+    ----------
+    model : solph.Model
+        model built by set_up_energy_system_model
+
+    Returns
+    -------
+    SOC_INI : float
+        initial state of charge in MWh
+
+    """
+
+    storage = model.es.groups["storage"]
+
+    return value(model.StorageBlock.SOC_INI[storage])
@@ -0,0 +1,196 @@
+import datetime
+import time
+
+from pyomo.contrib.appsi.base import (
+    legacy_solver_status_map,
+    legacy_termination_condition_map,
+)
+from pyomo.contrib.appsi.solvers import Highs
+from pyomo.opt import SolverResults
+
+# persistent solvers keeping the model in memory between solves
+PERSISTENT_SOLVERS = {"highs": Highs}
+
+# model types, which can be solved by the persistent solvers, the SOS2 models
+# are excluded because HiGHS does not support SOS constraints
+PERSISTENT_SOLVER_MODEL_TYPES = ["linear", "linear_with_storage_losses", "big_m"]
+
+# persistent solver instances of this process, the key is the solver name
+_persistent_solvers = {}
+
+
+def get_persistent_solver(solver_name):
+    """
+    Returns the persistent solver instance of this process. The instance is
+    created on the first call and reused by all following calls, so that a
+    model solved again is only updated in the solver instead of rewritten.
+
+    Parameters
+    ----------
+    solver_name : String
+        name of the persistent solver, one of the keys of PERSISTENT_SOLVERS
+
+    Returns
+    -------
+    solver : pyomo.contrib.appsi.base.PersistentSolver
+        persistent solver instance
+
+    """
+
+    if solver_name not in PERSISTENT_SOLVERS:
+        raise ValueError(
+            "Unknown persistent solver '{0}'. Choose one of: {1}".format(
+                solver_name, ", ".join(PERSISTENT_SOLVERS)
+            )
+        )
+
+    if solver_name not in _persistent_solvers:
+        solver = PERSISTENT_SOLVERS[solver_name]()
+        if not solver.available():
+            raise RuntimeError(
+                "The persistent solver '{0}' is not available.".format(solver_name)
+            )
+        _persistent_solvers[solver_name] = solver
+
+    return _persistent_solvers[solver_name]
+
+
+def solve_persistent(model, solver_name, cmdline_options):
+    """
+    Solves a model in memory using a persistent solver. The results are
+    converted to the format returned by model.solve and stored in the model,
+    so that they can be processed by process_solver_results.
+
+    Parameters
+    ----------
+    model : solph.Model
+        model to be solved
+    solver_name : String
+        name of the persistent solver, one of the keys of PERSISTENT_SOLVERS
+    cmdline_options : dict
+        solver options as returned by get_solver_options, i.e. "timelimit",
+        "mipgap" and optionally "threads"
+
+    Returns
+    -------
+    solver_results : pyomo.opt.SolverResults
+        results of the solver
+
+    """
+
+    solver = get_persistent_solver(solver_name)
+
+    solver.config.time_limit = float(cmdline_options["timelimit"])
+    solver.config.mip_gap = float(cmdline_options["mipgap"])
+    if "threads" in cmdline_options:
+        solver.highs_options["threads"] = int(cmdline_options["threads"])
+    solver.config.load_solution = False
+
+    start_time = time.perf_counter()
+    results = solver.solve(model)
+    if results.best_feasible_objective is not None:
+        results.solution_loader.load_vars()
+    solution_time = time.perf_counter() - start_time
+
+    # convert results to the format of the file based solver interfaces
+    solver_results = SolverResults()
+    solver_results.solver.status = legacy_solver_status_map[
+        results.termination_condition
+    ]
+    solver_results.solver.termination_condition = legacy_termination_condition_map[
+        results.termination_condition
+    ]
+    solver_results.solver.user_time = solution_time
+    solver_results.problem.lower_bound = results.best_objective_bound
+    solver_results.problem.upper_bound = results.best_feasible_objective
+
+    # store results in the model as done by model.solve
+    model.es.results = solver_results
+    model.solver_results = solver_results
+
+    return solver_results
+
+
+def compare_solver_interfaces(
+    model, cmdline_options, solver_name, persistent_solver_name, repetitions=3
+):
+    """
+    Measures the wall time of solving a model repeatedly using the file based
+    interface of model.solve and using a persistent solver. The first solve
+    using the persistent solver includes loading the model into the solver,
+    all following solves reuse the solver instance.
+
+    Parameters
+    ----------
+    model : solph.Model
+        model to be solved
+    cmdline_options : dict
+        solver options as returned by get_solver_options
+    solver_name : String
+        name of the file based solver, e.g. cplex, gurobi, cbc, glpk, ...
+    persistent_solver_name : String
+        name of the persistent solver, one of the keys of PERSISTENT_SOLVERS
+    repetitions : int
+        number of solves using each interface
+
+    Returns
+    -------
+    comparison : dict
+        mean wall time per solve of the file based interface, wall time of the
+        first and mean wall time of the following persistent solves, time saved
+        per solve and the objective of both interfaces
+
+    """
+
+    file_based_times = []
+    for _ in range(repetitions):
+        start_time = time.perf_counter()
+        model.solve(
+            solver=solver_name,
+            solve_kwargs={"tee": False},
+            cmdline_options=cmdline_options,
+        )
+        file_based_times.append(time.perf_counter() - start_time)
+    file_based_objective = model.objective()
+
+    persistent_times = []
+    for _ in range(repetitions):
+        start_time = time.perf_counter()
+        solve_persistent(model, persistent_solver_name, cmdline_options)
+        persistent_times.append(time.perf_counter() - start_time)
+    persistent_objective = model.objective()
+
+    file_based_time = sum(file_based_times) / len(file_based_times)
+    if len(persistent_times) > 1:
+        persistent_resolve_time = sum(persistent_times[1:]) / (
+            len(persistent_times) - 1
+        )
+    else:
+        persistent_resolve_time = persistent_times[0]
+
+    comparison = {
+        "file_based_time": file_based_time,
+        "persistent_first_time": persistent_times[0],
+        "persistent_resolve_time": persistent_resolve_time,
+        "time_saved": file_based_time - persistent_resolve_time,
+        "file_based_objective": file_based_objective,
+        "persistent_objective": persistent_objective,
+    }
+
+    # create log message
+    log_msg = (
+        "[{0:s}]\tSolve time '{1:s}': {2:.3f} s, '{3:s}' (persistent): "
+        "{4:.3f} s first, {5:.3f} s re-solve, {6:.3f} s saved per solve\n".format(
+            datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            solver_name,
+            file_based_time,
+            persistent_solver_name,
+            persistent_times[0],
+            persistent_resolve_time,
+            comparison["time_saved"],
+        )
+    )
+    # print log message
+    print(log_msg, end="")
+
+    return comparison
@@ -0,0 +1,146 @@
+import re
+import time
+from contextlib import contextmanager
+
+# phases of solving a scenario and the columns of the scenario status, to
+# which their wall time in seconds is written
+PHASE_COLUMNS = {
+    # reading the timeseries data (read_timeseries)
+    "csv_loading": "time_csv_loading",
+    # setting up the EnergySystem and the solph.Model without the StorageBlock
+    "energy_system": "time_energy_system",
+    # StorageBlock._create, i.e. the variables and constraints of the storage
+    "storage_block": "time_storage_block",
+    # writing the model to the problem file of the solver
+    "model_write": "time_model_write",
+    # the solver itself
+    "solve": "time_solve",
+    # reading the solution and process_solver_results without the export
+    "results_processing": "time_results_processing",
+    # writing the result files
+    "csv_export": "time_csv_export",
+}
+
+# lines printed by pyomo for solve(report_timing=True) and the phase, to which
+# the reported time belongs, presolve mainly consists of writing the model,
+# the times are reported with a resolution of 0.01 s
+SOLVER_TIMING_PATTERNS = [
+    (re.compile(r"([\d.]+) seconds required for presolve"), "model_write"),
+    (re.compile(r"([\d.]+) seconds required for solver"), "solve"),
+    (re.compile(r"([\d.]+) seconds required for postsolve"), "results_processing"),
+]
+
+# wall time of each phase measured in this process since the last reset
+_phase_times = {}
+
+# phases currently measured, each with the time spent in nested phases
+_open_phases = []
+
+
+def add_phase_time(phase, seconds):
+    """
+    Adds a wall time measured elsewhere to a phase. If called while another
+    phase is measured (see measure_phase), the time is not counted twice, i.e.
+    it is subtracted from the enclosing phase.
+
+    Parameters
+    ----------
+    phase : String
+        name of the phase, one of the keys of PHASE_COLUMNS
+    seconds : float
+        wall time in seconds
+
+    Returns
+    -------
+    -
+
+    """
+
+    _phase_times[phase] = _phase_times.get(phase, 0.0) + seconds
+    if _open_phases:
+        _open_phases[-1][1] += seconds
+
+
+@contextmanager
+def measure_phase(phase):
+    """
+    Context manager measuring the wall time of a phase. Phases can be nested,
+    the time of a nested phase is only counted for the nested phase, so that
+    the times of all phases add up to the total time.
+
+    Parameters
+    ----------
+    phase : String
+        name of the phase, one of the keys of PHASE_COLUMNS
+
+    Returns
+    -------
+    -
+
+    """
+
+    _open_phases.append([phase, 0.0])
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_time = time.perf_counter() - start_time
+        _, nested_time = _open_phases.pop()
+        add_phase_time(phase, elapsed_time - nested_time)
+        if _open_phases:
+            _open_phases[-1][1] += nested_time
+
+
+def add_solver_timing(output):
+    """
+    Adds the times reported by pyomo for solve(report_timing=True) to the
+    phases model_write, solve and results_processing.
+
+    Parameters
+    ----------
+    output : String
+        output printed by pyomo while solving
+
+    Returns
+    -------
+    -
+
+    """
+
+    for pattern, phase in SOLVER_TIMING_PATTERNS:
+        for match in pattern.finditer(output):
+            add_phase_time(phase, float(match.group(1)))
+
+
+def reset_phase_times():
+    """
+    Discards all wall times measured in this process, e.g. before solving the
+    next scenario.
+    """
+
+    _phase_times.clear()
+
+
+def write_phase_times(scenario_status, i_scenario):
+    """
+    Writes the wall times measured since the last reset to the scenario status
+    and resets them. Phases, which did not occur (e.g. the construction of a
+    reused model template), are written as 0.
+
+    Parameters
+    ----------
+    scenario_status : pd.DataFrame
+        scenario status, has to contain the row i_scenario, is changed in place
+    i_scenario : String
+        name of the scenario
+
+    Returns
+    -------
+    -
+
+    """
+
+    for phase, column in PHASE_COLUMNS.items():
+        scenario_status.at[i_scenario, column] = _phase_times.get(phase, 0.0)
+
+    reset_phase_times()
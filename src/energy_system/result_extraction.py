@@ -0,0 +1,286 @@
+import numpy as np
+import pandas as pd
+
+# ways of extracting the results of a solved model, see process_solver_results:
+# oemof uses oemof.solph.processing.results and views.node, numpy reads the
+# values of the pyomo variables directly
+RESULT_EXTRACTIONS = ["oemof", "numpy"]
+
+# variables of the StorageBlock written to storage.csv, if defined by the
+# storage model
+STORAGE_VARIABLES = ["P_in", "P_in_stor", "P_out", "P_out_stor", "soc"]
+
+# values below are set to zero to account for numerical imprecision
+ZERO_TOLERANCE = 0.0000001
+
+
+def check_result_extraction(result_extraction):
+    """
+    Checks, if a way of extracting results is known.
+
+    Parameters
+    ----------
+    result_extraction : String
+        one of RESULT_EXTRACTIONS
+
+    Returns
+    -------
+    -
+
+    """
+
+    if result_extraction not in RESULT_EXTRACTIONS:
+        raise ValueError(
+            "Unknown result extraction '{0}'. Choose one of: {1}".format(
+                result_extraction, ", ".join(RESULT_EXTRACTIONS)
+            )
+        )
+
+
+def scenario_result_extraction(scenario_options, i_scenario):
+    """
+    Returns the way of extracting the results of a scenario, given by the
+    optional column result_extraction of the scenario description.
+
+    Parameters
+    ----------
+    scenario_options : pd.DataFrame
+        scenario description, has to contain the row i_scenario
+    i_scenario : String
+        name of the scenario
+
+    Returns
+    -------
+    result_extraction : String
+        one of RESULT_EXTRACTIONS, oemof if not given
+
+    """
+
+    if "result_extraction" not in scenario_options.columns:
+        return "oemof"
+
+    result_extraction = scenario_options.at[i_scenario, "result_extraction"]
+    if pd.isna(result_extraction):
+        return "oemof"
+
+    return result_extraction
+
+
+def flow_column(source, target):
+    """
+    Returns the flat column name of the flow from source to target.
+
+    Parameters
+    ----------
+    source : oemof.network.Node
+        node the flow leaves
+    target : oemof.network.Node
+        node the flow enters
+
+    Returns
+    -------
+    column : String
+        e.g. "bus_gen_to_storage"
+
+    """
+
+    return "{0}_to_{1}".format(source.label, target.label)
+
+
+def result_index(model):
+    """
+    Returns the index of the results, equal to the one of
+    oemof.solph.processing.results: the timeindex of the energy system incl.
+    the time point after the last timestep.
+
+    Parameters
+    ----------
+    model : solph.Model
+        solved model
+
+    Returns
+    -------
+    index : pd.Index
+        time points of the results
+
+    """
+
+    if model.es.timeindex is None:
+        return pd.RangeIndex(len(model.es.timeincrement) + 1)
+
+    return model.es.timeindex
+
+
+def variable_values(variable, index, timesteps, length):
+    """
+    Reads the values of an indexed pyomo variable for all timesteps into a
+    pre-allocated array. Time points without a timestep (the last one of the
+    results) remain NaN.
+
+    Parameters
+    ----------
+    variable : pyomo.core.Var
+        variable indexed by index and timestep
+    index : tuple
+        index of the variable without the timestep, e.g. (storage,)
+    timesteps : pyomo.core.Set
+        timesteps of the model
+    length : int
+        number of time points of the results
+
+    Returns
+    -------
+    values : np.array
+        values of the variable, None (unused variables) is read as NaN
+
+    """
+
+    values = np.full(length, np.nan)
+    values[: len(timesteps)] = [variable[index + (t,)].value for t in timesteps]
+
+    return values
+
+
+def extract_storage_results(model, storage_label="storage"):
+    """
+    Reads the flows into and out of the storage and the variables of the
+    StorageBlock (see STORAGE_VARIABLES) into a DataFrame with flat column
+    names. Values below ZERO_TOLERANCE are set to zero. If the storage model
+    distinguishes the power at the grid and the storage side, the
+    efficiencies eta_in and eta_out are calculated for every timestep, they
+    are NaN if the storage is not charged or discharged respectively.
+
+    Parameters
+    ----------
+    model : solph.Model
+        solved model
+    storage_label : String
+        label of the storage
+
+    Returns
+    -------
+    result_storage : pd.DataFrame
+        results of the storage for every time point
+
+    """
+
+    storage = model.es.groups[storage_label]
+    index = result_index(model)
+
+    columns = {}
+    for source, target in sorted(
+        model.FLOWS, key=lambda flow: (flow[0].label, flow[1].label)
+    ):
+        if storage in (source, target):
+            columns[flow_column(source, target)] = variable_values(
+                model.flow, (source, target), model.TIMESTEPS, len(index)
+            )
+
+    for name in STORAGE_VARIABLES:
+        if hasattr(model.StorageBlock, name):
+            columns[name] = variable_values(
+                getattr(model.StorageBlock, name),
+                (storage,),
+                model.TIMESTEPS,
+                len(index),
+            )
+
+    # round to zero to account for numerical imprecision
+    for values in columns.values():
+        values[values < ZERO_TOLERANCE] = 0
+
+    # calculate efficiency for every timestep
+    if "P_in_stor" in columns:
+        columns["eta_in"] = efficiency(columns["P_in_stor"], columns["P_in"])
+        columns["eta_out"] = efficiency(columns["P_out"], columns["P_out_stor"])
+
+    return pd.DataFrame(columns, index=index)
+
+
+def extract_bus_results(model, bus_label):
+    """
+    Reads all flows into and out of a bus into a DataFrame with flat column
+    names.
+
+    Parameters
+    ----------
+    model : solph.Model
+        solved model
+    bus_label : String
+        label of the bus, e.g. "bus_gen"
+
+    Returns
+    -------
+    result_bus : pd.DataFrame
+        flows of the bus for every time point
+
+    """
+
+    bus = model.es.groups[bus_label]
+    index = result_index(model)
+
+    columns = {}
+    for source, target in sorted(
+        model.FLOWS, key=lambda flow: (flow[0].label, flow[1].label)
+    ):
+        if bus in (source, target):
+            columns[flow_column(source, target)] = variable_values(
+                model.flow, (source, target), model.TIMESTEPS, len(index)
+            )
+
+    return pd.DataFrame(columns, index=index)
+
+
+def efficiency(output_power, input_power):
+    """
+    Divides two power arrays element-wise, where the input power is zero,
+    the efficiency is NaN.
+
+    Parameters
+    ----------
+    output_power : np.array
+        power leaving the conversion, e.g. P_in_stor
+    input_power : np.array
+        power entering the conversion, e.g. P_in
+
+    Returns
+    -------
+    eta : np.array
+        efficiency of every timestep
+
+    """
+
+    eta = np.full(len(output_power), np.nan)
+    np.divide(output_power, input_power, out=eta, where=input_power > 0)
+
+    return eta
+
+
+def extract_results(model):
+    """
+    Reads the results of the storage, the generation bus and the demand bus
+    without oemof.solph.processing.results, which creates a DataFrame of all
+    variables of the model first. The arrays of every column are allocated
+    once and filled from the pyomo variables.
+
+    Parameters
+    ----------
+    model : solph.Model
+        solved model
+
+    Returns
+    -------
+    result_storage : pd.DataFrame
+        see extract_storage_results
+    result_bus_gen : pd.DataFrame
+        flows of the generation bus, see extract_bus_results
+    result_bus_dem : pd.DataFrame
+        flows of the demand bus, see extract_bus_results
+
+    """
+
+    return (
+        extract_storage_results(model),
+        extract_bus_results(model, "bus_gen"),
+        extract_bus_results(model, "bus_dem"),
+    )
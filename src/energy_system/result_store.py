@@ -0,0 +1,485 @@
+import os
+import json
+import hashlib
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# formats of the result files written by process_solver_results: csv writes
+# storage.csv, bus_gen.csv and bus_dem.csv to the directory of the scenario,
+# parquet writes a partition of the result store (see write_result_partition)
+RESULT_FORMATS = ["csv", "parquet"]
+
+# name of the result store in the export directory
+RESULT_STORE_DIR = "result_store"
+
+# name of the directory in the result store containing the shared series
+SHARED_SERIES_DIR = "shared_series"
+
+# name of the file describing a partition, it is written last, so that
+# partitions of a running batch are only read once they are complete
+PARTITION_FILE = "partition.json"
+
+# columns, which are identical for all scenarios with the same timeseries and
+# scaling factors (fixed demand and generation flows), and stored only once
+SHARED_SERIES = {
+    "bus_gen": ["ee_gen_to_bus_gen"],
+    "bus_dem": ["bus_dem_to_dem"],
+}
+
+# maximum relative rounding error of values stored as float32
+FLOAT32_TOLERANCE = 0.000001
+
+
+def check_result_format(result_format):
+    """
+    Checks, if a format of the result files is known.
+
+    Parameters
+    ----------
+    result_format : String
+        one of RESULT_FORMATS
+
+    Returns
+    -------
+    -
+
+    """
+
+    if result_format not in RESULT_FORMATS:
+        raise ValueError(
+            "Unknown result format '{0}'. Choose one of: {1}".format(
+                result_format, ", ".join(RESULT_FORMATS)
+            )
+        )
+
+
+def scenario_result_format(scenario_options, i_scenario):
+    """
+    Returns the format of the result files of a scenario, given by the
+    optional column result_format of the scenario description.
+
+    Parameters
+    ----------
+    scenario_options : pd.DataFrame
+        scenario description, has to contain the row i_scenario
+    i_scenario : String
+        name of the scenario
+
+    Returns
+    -------
+    result_format : String
+        one of RESULT_FORMATS, csv if not given
+
+    """
+
+    if "result_format" not in scenario_options.columns:
+        return "csv"
+
+    result_format = scenario_options.at[i_scenario, "result_format"]
+    if pd.isna(result_format):
+        return "csv"
+
+    return result_format
+
+
+def flat_column_name(column):
+    """
+    Returns a flat column name for the tuple columns of oemof.solph.views, in
+    the form used by energy_system.result_extraction.
+
+    Parameters
+    ----------
+    column : tuple or String
+        column name, e.g. (("bus_gen", "storage"), "flow") or
+        (("storage", "None"), "soc")
+
+    Returns
+    -------
+    column : String
+        e.g. "bus_gen_to_storage" or "soc"
+
+    """
+
+    if not isinstance(column, tuple):
+        return str(column)
+
+    (source, target), variable = column
+    if variable == "flow":
+        return "{0}_to_{1}".format(source, target)
+    if target in ["None", None]:
+        return variable
+
+    return "{0}_{1}".format(variable, target)
+
+
+def compact_dtypes(result):
+    """
+    Converts all float64 columns to float32, whose values are represented
+    with a relative error of at most FLOAT32_TOLERANCE.
+
+    Parameters
+    ----------
+    result : pd.DataFrame
+        result of a scenario
+
+    Returns
+    -------
+    result : pd.DataFrame
+        copy of the result with compact columns
+
+    """
+
+    result = result.copy()
+    for column in result.columns:
+        values = result[column].to_numpy()
+        if values.dtype != np.float64:
+            continue
+        with np.errstate(over="ignore"):
+            values_32 = values.astype(np.float32)
+        if np.allclose(
+            values_32, values, rtol=FLOAT32_TOLERANCE, atol=0, equal_nan=True
+        ):
+            result[column] = values_32
+
+    return result
+
+
+def series_hash(series):
+    """
+    Returns the hash of the index and the values of a series, under which it
+    is stored in the shared series of the result store.
+
+    Parameters
+    ----------
+    series : pd.Series
+        series of a result
+
+    Returns
+    -------
+    key : String
+        hexadecimal sha256 hash
+
+    """
+
+    row_hashes = pd.util.hash_pandas_object(series, index=True).to_numpy()
+
+    return hashlib.sha256(row_hashes.tobytes()).hexdigest()
+
+
+def write_parquet(frame, path):
+    """
+    Writes a DataFrame to a parquet file. The file is written to a temporary
+    file in the same directory first and then renamed, so that readers never
+    see incomplete files, even while a batch is still running.
+
+    Parameters
+    ----------
+    frame : pd.DataFrame
+        data to be written
+    path : String
+        path of the parquet file
+
+    Returns
+    -------
+    -
+
+    """
+
+    handle, temporary_path = tempfile.mkstemp(
+        suffix=".parquet", dir=os.path.dirname(path)
+    )
+    os.close(handle)
+    try:
+        frame.to_parquet(temporary_path, index=True)
+        os.replace(temporary_path, path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+
+def write_result_csvs(export_dir, results):
+    """
+    Writes every result of a scenario to a csv file in its result directory.
+
+    Parameters
+    ----------
+    export_dir : String
+        result directory of the scenario
+    results : dict
+        results (pd.DataFrame) keyed by the name of the file without
+        extension, e.g. storage
+
+    Returns
+    -------
+    -
+
+    """
+
+    # create export directory if necessary
+    if not os.path.exists(export_dir):
+        os.makedirs(export_dir)
+
+    for name, result in results.items():
+        result.to_csv(
+            os.path.realpath(os.path.join(export_dir, name + ".csv")),
+            header=True,
+            index=True,
+            index_label="datetime",
+            sep=";",
+            date_format="%Y-%m-%d %H:%M:%S",
+        )
+
+
+def partition_dir(store_root, model_type, i_scenario):
+    """
+    Returns the directory of the partition of a scenario in the result store.
+
+    Parameters
+    ----------
+    store_root : String
+        path to the result store
+    model_type : String
+        model type of the scenario
+    i_scenario : String
+        name of the scenario
+
+    Returns
+    -------
+    partition_dir : String
+        path to the partition
+
+    """
+
+    return os.path.join(
+        store_root,
+        "model_type={0}".format(model_type),
+        "scenario={0}".format(i_scenario),
+    )
+
+
+def write_result_partition(store_root, model_type, i_scenario, results):
+    """
+    Writes the results of a scenario as partition model_type=<model_type>/
+    scenario=<scenario> of the result store, one parquet file per result.
+    Columns are named flat (see flat_column_name) and stored as float32 if
+    precise enough (see compact_dtypes). The columns of SHARED_SERIES are
+    stored once in the directory SHARED_SERIES_DIR under their hash and only
+    referenced by the partition. Partitions of different scenarios can be
+    written concurrently, e.g. by the workers of run_scenarios.
+
+    Parameters
+    ----------
+    store_root : String
+        path to the result store
+    model_type : String
+        model type of the scenario
+    i_scenario : String
+        name of the scenario
+    results : dict
+        results (pd.DataFrame) keyed by their name, e.g. storage
+
+    Returns
+    -------
+    -
+
+    """
+
+    export_dir = partition_dir(store_root, model_type, i_scenario)
+    shared_dir = os.path.join(store_root, SHARED_SERIES_DIR)
+    for directory in [export_dir, shared_dir]:
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    # an old partition of the scenario is incomplete while being replaced
+    partition_file = os.path.join(export_dir, PARTITION_FILE)
+    if os.path.exists(partition_file):
+        os.remove(partition_file)
+
+    partition = {"columns": {}, "shared_series": {}}
+    for name, result in results.items():
+        result = result.rename(columns=flat_column_name)
+        partition["columns"][name] = list(result.columns)
+
+        # store shared series once
+        shared_columns = [
+            column for column in SHARED_SERIES.get(name, []) if column in result
+        ]
+        partition["shared_series"][name] = {}
+        for column in shared_columns:
+            key = series_hash(result[column])
+            shared_file = os.path.join(shared_dir, key + ".parquet")
+            if not os.path.exists(shared_file):
+                write_parquet(compact_dtypes(result[[column]]), shared_file)
+            partition["shared_series"][name][column] = key
+
+        write_parquet(
+            compact_dtypes(result.drop(columns=shared_columns)),
+            os.path.join(export_dir, name + ".parquet"),
+        )
+
+    with open(partition_file, "w") as file:
+        json.dump(partition, file)
+
+
+def export_results(export_root, i_scenario, results, result_format, model_type):
+    """
+    Writes the results of a scenario in the given format, see RESULT_FORMATS.
+
+    Parameters
+    ----------
+    export_root : String
+        path to folder, where results are to be saved
+    i_scenario : String
+        name of the scenario
+    results : dict
+        results (pd.DataFrame) keyed by their name, e.g. storage
+    result_format : String
+        one of RESULT_FORMATS
+    model_type : String
+        model type of the scenario, the partition of the result store
+
+    Returns
+    -------
+    -
+
+    """
+
+    check_result_format(result_format)
+
+    if result_format == "parquet":
+        write_result_partition(
+            os.path.join(export_root, RESULT_STORE_DIR), model_type, i_scenario, results
+        )
+    else:
+        write_result_csvs(
+            os.path.realpath(os.path.join(export_root, i_scenario)), results
+        )
+
+
+def results_exist(export_root, i_scenario, result_format, model_type):
+    """
+    Checks, if the results of a scenario were written in the given format, see
+    export_results. Partitions of the result store only exist once complete.
+
+    Parameters
+    ----------
+    export_root : String
+        path to folder, where results are saved
+    i_scenario : String
+        name of the scenario
+    result_format : String
+        one of RESULT_FORMATS
+    model_type : String
+        model type of the scenario, the partition of the result store
+
+    Returns
+    -------
+    exist : bool
+        True if the results of the scenario exist
+
+    """
+
+    check_result_format(result_format)
+
+    if result_format == "parquet":
+        return os.path.exists(
+            os.path.join(
+                partition_dir(
+                    os.path.join(export_root, RESULT_STORE_DIR), model_type, i_scenario
+                ),
+                PARTITION_FILE,
+            )
+        )
+
+    return os.path.isdir(os.path.join(export_root, i_scenario))
+
+
+def read_result_partition(store_root, model_type, i_scenario, name):
+    """
+    Reads a result of a scenario from the result store incl. the shared
+    series, in the original order of the columns.
+
+    Parameters
+    ----------
+    store_root : String
+        path to the result store
+    model_type : String
+        model type of the scenario
+    i_scenario : String
+        name of the scenario
+    name : String
+        name of the result, e.g. storage
+
+    Returns
+    -------
+    result : pd.DataFrame
+        result of the scenario
+
+    """
+
+    export_dir = partition_dir(store_root, model_type, i_scenario)
+    with open(os.path.join(export_dir, PARTITION_FILE)) as file:
+        partition = json.load(file)
+
+    result = pd.read_parquet(os.path.join(export_dir, name + ".parquet"))
+    for column, key in partition["shared_series"][name].items():
+        shared = pd.read_parquet(
+            os.path.join(store_root, SHARED_SERIES_DIR, key + ".parquet")
+        )
+        result[column] = shared[column]
+
+    return result.loc[:, partition["columns"][name]]
+
+
+def read_result_store(store_root, name, model_types=None, scenarios=None):
+    """
+    Reads a result of all complete partitions of the result store, e.g. while
+    a batch is still running.
+
+    Parameters
+    ----------
+    store_root : String
+        path to the result store
+    name : String
+        name of the result, e.g. storage
+    model_types : list, optional
+        model types to be read, None to read all
+    scenarios : list, optional
+        scenarios to be read, None to read all
+
+    Returns
+    -------
+    results : pd.DataFrame
+        results of all scenarios, indexed by model type, scenario and time
+
+    """
+
+    results = {}
+    for model_type_dir in sorted(os.listdir(store_root)):
+        if not model_type_dir.startswith("model_type="):
+            continue
+        model_type = model_type_dir[len("model_type=") :]
+        if model_types is not None and model_type not in model_types:
+            continue
+
+        for scenario_dir in sorted(
+            os.listdir(os.path.join(store_root, model_type_dir))
+        ):
+            i_scenario = scenario_dir[len("scenario=") :]
+            if scenarios is not None and i_scenario not in scenarios:
+                continue
+            # skip partitions being written
+            if not os.path.exists(
+                os.path.join(store_root, model_type_dir, scenario_dir, PARTITION_FILE)
+            ):
+                continue
+            results[(model_type, i_scenario)] = read_result_partition(
+                store_root, model_type, i_scenario, name
+            )
+
+    if not results:
+        return pd.DataFrame()
+
+    return pd.concat(results, names=["model_type", "scenario"])
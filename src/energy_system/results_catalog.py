@@ -0,0 +1,518 @@
+import os
+import sqlite3
+import datetime
+
+import pandas as pd
+
+# name of the catalog in an export directory, to which its runs are added, and
+# in the folder containing the export directories, e.g. src/results, which the
+# comparison plots query (see index_results_folder)
+CATALOG_FILE_NAME = "results_catalog.sqlite"
+
+# beginning of the name of the scenario status files, e.g. written by
+# export_scenario_description or renamed by hand (scenario_status.csv), other
+# csv files of an export directory are not recorded
+STATUS_FILE_PREFIX = "scenario_status"
+
+# name of the file in the export directory, to which run_scenarios writes the
+# status of every finished scenario immediately, it is never recorded
+CHECKPOINT_FILE_NAME = "scenario_checkpoint.csv"
+
+# columns of the scenario status, which every catalog contains, all further
+# columns of a recorded scenario status are added to the catalog when recorded
+KPI_COLUMNS = [
+    "active",
+    "solved",
+    "solve_timeout",
+    "mip_gap",
+    "final_mip_gap",
+    "solution_time",
+    "objective",
+    "eta_in_mean",
+    "eta_out_mean",
+]
+
+# columns describing a scenario, see describe_scenarios
+DESCRIPTION_COLUMNS = [
+    "storage_type",
+    "efficiency",
+    "efficiency_method",
+    "method_detail",
+    "storage_losses",
+    "storage_losses_method",
+    "season",
+    "segments",
+]
+
+# efficiency implementation and storage losses of each model type
+MODEL_TYPE_DESCRIPTIONS = {
+    "linear": ("linear", "without"),
+    "linear_with_storage_losses": ("linear", "constant"),
+    "sos2": ("SOS2", "without"),
+    "sos2_with_constant_storage_efficiency": ("SOS2", "constant"),
+    "sos2_with_soc_dependent_efficiency": ("SOS2", "soc dependant"),
+    "big_m": ("BigM", "without"),
+}
+
+
+def catalog_file(export_root):
+    """
+    Returns the default path to the catalog, to which the runs exported to
+    export_root are added: CATALOG_FILE_NAME in export_root.
+
+    Parameters
+    ----------
+    export_root : String
+        path to folder, where results are saved
+
+    Returns
+    -------
+    catalog_file : String
+        path to the catalog
+
+    """
+
+    return os.path.join(export_root, CATALOG_FILE_NAME)
+
+
+def connect_catalog(catalog_file):
+    """
+    Opens the catalog and creates its tables if necessary: runs contains one
+    row per exported scenario status, scenarios one row per scenario of a run
+    with its description and KPIs.
+
+    Parameters
+    ----------
+    catalog_file : String
+        path to the catalog
+
+    Returns
+    -------
+    connection : sqlite3.Connection
+        connection to the catalog
+
+    """
+
+    connection = sqlite3.connect(catalog_file, timeout=60)
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS runs ("
+        "run_id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "folder TEXT, "
+        "status_file TEXT UNIQUE, "
+        "model_type TEXT, "
+        "finished TEXT)"
+    )
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS scenarios ("
+        "run_id INTEGER REFERENCES runs(run_id), "
+        "name TEXT, "
+        + "".join(
+            "{0} {1}, ".format(column, "INTEGER" if column == "segments" else "TEXT")
+            for column in DESCRIPTION_COLUMNS
+        )
+        + ", ".join("{0} REAL".format(column) for column in KPI_COLUMNS)
+        + ")"
+    )
+    connection.execute(
+        "CREATE INDEX IF NOT EXISTS scenarios_description "
+        "ON scenarios (storage_type, efficiency, season)"
+    )
+
+    return connection
+
+
+def describe_scenarios(folder, names, model_type=None):
+    """
+    Describes the scenarios of a run by the name of its export directory and
+    their own names, e.g. results_phs_sos2_calculations_with_constant_losses
+    and phs_sommer_3_segments_reg. If the model type is known, the efficiency
+    implementation and the storage losses are taken from it instead. The
+    names are parsed column-wise for all scenarios at once.
+
+    Parameters
+    ----------
+    folder : String
+        name of the export directory
+    names : list
+        names of the scenarios
+    model_type : String, optional
+        model type of the run, one of the keys of MODEL_TYPE_DESCRIPTIONS
+
+    Returns
+    -------
+    descriptions : pd.DataFrame
+        value of each of DESCRIPTION_COLUMNS for every scenario, None if it
+        can not be inferred
+
+    """
+
+    names = pd.Series([str(name) for name in names], dtype=object)
+    descriptions = pd.DataFrame(None, index=names.index, columns=DESCRIPTION_COLUMNS)
+
+    # storage type, efficiency implementation and storage losses are equal for
+    # all scenarios of a run
+    run_description = dict.fromkeys(DESCRIPTION_COLUMNS)
+
+    # storage type from folder name
+    for storage_type in ["phs", "caes"]:
+        if storage_type in folder:
+            run_description["storage_type"] = storage_type
+
+    # efficiency implementation and storage losses
+    if model_type in MODEL_TYPE_DESCRIPTIONS:
+        (
+            run_description["efficiency"],
+            run_description["storage_losses"],
+        ) = MODEL_TYPE_DESCRIPTIONS[model_type]
+    else:
+        if "sos2" in folder:
+            run_description["efficiency"] = "SOS2"
+        elif "bigm" in folder or "big_m" in folder:
+            run_description["efficiency"] = "BigM"
+        elif "linear" in folder:
+            run_description["efficiency"] = "linear"
+
+        if "with_" in folder:
+            if "constant" in folder:
+                run_description["storage_losses"] = "constant"
+            elif "soc_dep" in folder:
+                run_description["storage_losses"] = "soc dependant"
+        elif "without" in folder:
+            run_description["storage_losses"] = "without"
+
+    for column in ["storage_type", "efficiency", "storage_losses"]:
+        descriptions[column] = run_description[column]
+
+    if names.empty:
+        return descriptions
+
+    parts = names.str.split("_")
+
+    # method of storage losses from scenario name
+    if run_description["storage_losses"] == "constant":
+        descriptions["storage_losses_method"] = parts.str[-1]
+    elif run_description["storage_losses"] == "soc dependant":
+        descriptions["storage_losses_method"] = parts.str[-2:].str.join(" ")
+
+    # method of efficiency from scenario name
+    if run_description["efficiency"] in ["SOS2", "BigM"]:
+        descriptions["efficiency_method"] = parts.str[2:4].str.join(" ")
+    elif run_description["efficiency"] == "linear":
+        descriptions["efficiency_method"] = parts.str[-2:-1].str.join("")
+
+    # number of segments or kind of constant efficiency from scenario name,
+    # taken from the name starting four characters before the marker
+    for marker, is_marked in [
+        ("_se", names.str.contains("_se", regex=False)),
+        (
+            "_eff",
+            ~names.str.contains("_se", regex=False)
+            & names.str.contains("eff", regex=False),
+        ),
+    ]:
+        if not is_marked.any():
+            continue
+        details = pd.Series(
+            [name[name.find(marker) - 4 :] for name in names[is_marked]],
+            index=names.index[is_marked],
+            dtype=object,
+        )
+        if marker == "_se":
+            details = details.str.replace(r"\D", "", regex=True) + " segments"
+        else:
+            details = details.str.replace("_eff", "", regex=False).str.replace(
+                "_", "", regex=False
+            )
+        descriptions.loc[is_marked, "method_detail"] = details
+
+    segments = names.str.extract(r"(\d+)_segments", expand=False)
+    descriptions["segments"] = [
+        None if pd.isna(number) else int(number) for number in segments
+    ]
+
+    # season from scenario name
+    is_summer = names.str.contains("sommer|summer")
+    is_winter = ~is_summer & names.str.contains("winter", regex=False)
+    descriptions.loc[is_summer, "season"] = "summer"
+    descriptions.loc[is_winter, "season"] = "winter"
+
+    return descriptions.astype(object).where(descriptions.notna(), None)
+
+
+def describe_scenario(folder, name, model_type=None):
+    """
+    Describes a single scenario, see describe_scenarios.
+
+    Parameters
+    ----------
+    folder : String
+        name of the export directory
+    name : String
+        name of the scenario
+    model_type : String, optional
+        model type of the run, one of the keys of MODEL_TYPE_DESCRIPTIONS
+
+    Returns
+    -------
+    description : dict
+        value of each of DESCRIPTION_COLUMNS, None if it can not be inferred
+
+    """
+
+    return describe_scenarios(folder, [name], model_type).iloc[0].to_dict()
+
+
+def record_run(
+    catalog_file, status_file, scenario_status, model_type=None, finished=None
+):
+    """
+    Adds an exported scenario status to the catalog, a status file recorded
+    before is replaced.
+
+    Parameters
+    ----------
+    catalog_file : String
+        path to the catalog
+    status_file : String
+        path to the exported scenario status
+    scenario_status : pd.DataFrame
+        scenario status indexed by the name of the scenarios
+    model_type : String, optional
+        model type of the run, None if unknown
+    finished : String, optional
+        time the run finished as "%Y-%m-%d %H:%M:%S", now if None
+
+    Returns
+    -------
+    -
+
+    """
+
+    if finished is None:
+        finished = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    # paths relative to the catalog keep the catalog valid if the results are
+    # moved together with it
+    folder = os.path.basename(os.path.dirname(os.path.realpath(status_file)))
+    catalog_dir = os.path.dirname(os.path.realpath(catalog_file))
+    status_file = os.path.relpath(os.path.realpath(status_file), catalog_dir)
+
+    # KPIs missing in the scenario status, e.g. of older runs, or not numeric, e.g.
+    # of scenarios not solved or solved until the time limit, are recorded as NULL
+    status_columns = KPI_COLUMNS + [
+        column
+        for column in scenario_status.columns
+        if column not in KPI_COLUMNS + DESCRIPTION_COLUMNS + ["run_id", "name"]
+    ]
+    kpis = scenario_status.reindex(columns=status_columns)
+    kpis[KPI_COLUMNS] = kpis[KPI_COLUMNS].apply(pd.to_numeric, errors="coerce")
+    kpis = kpis.astype(object).where(kpis.notna(), None)
+
+    descriptions = describe_scenarios(folder, scenario_status.index, model_type)
+    rows = [
+        [str(name)] + description + scenario_kpis
+        for name, description, scenario_kpis in zip(
+            scenario_status.index,
+            descriptions.values.tolist(),
+            kpis.values.tolist(),
+        )
+    ]
+
+    columns = ["run_id", "name"] + DESCRIPTION_COLUMNS + status_columns
+    connection = connect_catalog(catalog_file)
+    with connection:
+        # add further columns of the scenario status
+        existing = [
+            row[1] for row in connection.execute("PRAGMA table_info(scenarios)")
+        ]
+        for column in status_columns:
+            if column not in existing:
+                connection.execute(
+                    'ALTER TABLE scenarios ADD COLUMN "{0}" {1}'.format(
+                        column,
+                        (
+                            "REAL"
+                            if pd.api.types.is_numeric_dtype(scenario_status[column])
+                            else "TEXT"
+                        ),
+                    )
+                )
+
+        previous = connection.execute(
+            "SELECT run_id FROM runs WHERE status_file = ?", (status_file,)
+        ).fetchone()
+        if previous is not None:
+            connection.execute("DELETE FROM scenarios WHERE run_id = ?", previous)
+            connection.execute("DELETE FROM runs WHERE run_id = ?", previous)
+
+        run_id = connection.execute(
+            "INSERT INTO runs (folder, status_file, model_type, finished) "
+            "VALUES (?, ?, ?, ?)",
+            (folder, status_file, model_type, finished),
+        ).lastrowid
+        connection.executemany(
+            "INSERT INTO scenarios ({0}) VALUES ({1})".format(
+                ", ".join('"{0}"'.format(column) for column in columns),
+                ", ".join("?" * len(columns)),
+            ),
+            [[run_id] + row for row in rows],
+        )
+    connection.close()
+
+
+def catalog_runs(catalog_file):
+    """
+    Returns the model type and the time finished of every run recorded in a
+    catalog.
+
+    Parameters
+    ----------
+    catalog_file : String
+        path to the catalog
+
+    Returns
+    -------
+    runs : dict
+        (model_type, finished) keyed by the path to the status file relative
+        to the directory of the catalog
+
+    """
+
+    connection = connect_catalog(catalog_file)
+    runs = {
+        status_file: (model_type, finished)
+        for status_file, model_type, finished in connection.execute(
+            "SELECT status_file, model_type, finished FROM runs"
+        )
+    }
+    connection.close()
+
+    return runs
+
+
+def index_results_folder(results_root, catalog_file=None):
+    """
+    Adds all scenario status files (see STATUS_FILE_PREFIX) in the export
+    directories of a folder to the catalog, which are not recorded in it yet,
+    e.g. of runs finished since the catalog was last indexed or before it
+    existed. Model type and time finished are taken from the catalog of the
+    export directory (see catalog_file) if it recorded the run, otherwise the
+    time finished is the modification time of the status file.
+
+    Parameters
+    ----------
+    results_root : String
+        path to folder containing the export directories, e.g. src/results
+    catalog_file : String, optional
+        path to the catalog, CATALOG_FILE_NAME in results_root if None
+
+    Returns
+    -------
+    catalog_file : String
+        path to the catalog
+
+    """
+
+    if catalog_file is None:
+        catalog_file = os.path.join(results_root, CATALOG_FILE_NAME)
+
+    recorded = catalog_runs(catalog_file)
+
+    catalog_dir = os.path.dirname(os.path.realpath(catalog_file))
+    for folder in sorted(os.listdir(results_root)):
+        export_root = os.path.join(results_root, folder)
+        if not os.path.isdir(export_root):
+            continue
+
+        # runs recorded by the export directory itself
+        export_catalog = os.path.join(export_root, CATALOG_FILE_NAME)
+        if os.path.exists(export_catalog):
+            export_runs = catalog_runs(export_catalog)
+        else:
+            export_runs = {}
+
+        for file_name in sorted(os.listdir(export_root)):
+            status_file = os.path.join(export_root, file_name)
+            if (
+                not file_name.startswith(STATUS_FILE_PREFIX)
+                or not file_name.endswith(".csv")
+                or file_name == CHECKPOINT_FILE_NAME
+                or not os.path.isfile(status_file)
+            ):
+                continue
+            if os.path.relpath(os.path.realpath(status_file), catalog_dir) in recorded:
+                continue
+
+            if file_name in export_runs:
+                model_type, finished = export_runs[file_name]
+            else:
+                model_type = None
+                finished = datetime.datetime.fromtimestamp(
+                    os.path.getmtime(status_file)
+                ).strftime("%Y-%m-%d %H:%M:%S")
+
+            scenario_status = pd.read_csv(status_file, sep=";", index_col=0)
+            record_run(catalog_file, status_file, scenario_status, model_type, finished)
+
+    return catalog_file
+
+
+def query_results(catalog_file, latest_only=True, active_only=True, **filters):
+    """
+    Returns the scenarios of the catalog matching the given filters, e.g.
+    query_results(catalog_file, storage_type="phs", season="winter").
+
+    Parameters
+    ----------
+    catalog_file : String
+        path to the catalog
+    latest_only : bool
+        specifies if only the most recent run of every export directory is
+        considered
+    active_only : bool
+        specifies if only active scenarios are returned
+    **filters
+        required value of any of DESCRIPTION_COLUMNS, model_type or folder
+
+    Returns
+    -------
+    results : pd.DataFrame
+        name, KPIs and description of every scenario, as well as the folder,
+        status file and model type of its run
+
+    """
+
+    conditions = []
+    parameters = []
+    for column, value in filters.items():
+        if column not in DESCRIPTION_COLUMNS + ["model_type", "folder"]:
+            raise ValueError(
+                "Unknown filter '{0}'. Choose one of: {1}".format(
+                    column, ", ".join(DESCRIPTION_COLUMNS + ["model_type", "folder"])
+                )
+            )
+        conditions.append("{0} = ?".format(column))
+        parameters.append(value)
+
+    if latest_only:
+        conditions.append(
+            "runs.run_id IN (SELECT run_id FROM runs AS latest WHERE "
+            "latest.finished = (SELECT MAX(finished) FROM runs AS other "
+            "WHERE other.folder = latest.folder))"
+        )
+    if active_only:
+        conditions.append("active > 0")
+
+    query = (
+        "SELECT scenarios.*, runs.folder, runs.status_file, runs.model_type "
+        "FROM scenarios JOIN runs ON scenarios.run_id = runs.run_id"
+    )
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY runs.folder, scenarios.rowid"
+
+    connection = connect_catalog(catalog_file)
+    results = pd.read_sql_query(query, connection, params=parameters)
+    connection.close()
+
+    return results.drop(columns="run_id")
@@ -0,0 +1,110 @@
+import os
+
+from energy_system.results_catalog import connect_catalog, query_results
+
+# comparison tables of the current session keyed by the catalog, the filters and
+# the status files of all recorded runs, see comparison_table
+COMPARISON_CACHE = {}
+
+
+def recorded_runs(catalog_file):
+    """
+    Returns the status files recorded in the catalog and the time their run
+    finished, which change with every run added to the catalog.
+
+    Parameters
+    ----------
+    catalog_file : String
+        path to the catalog
+
+    Returns
+    -------
+    runs : tuple
+        pairs of status file and time finished, ordered by the status file
+
+    """
+
+    connection = connect_catalog(catalog_file)
+    runs = tuple(
+        connection.execute(
+            "SELECT status_file, finished FROM runs ORDER BY status_file"
+        ).fetchall()
+    )
+    connection.close()
+
+    return runs
+
+
+def comparison_table(catalog_file, **filters):
+    """
+    Returns the scenarios of the catalog matching the given filters, see
+    query_results. Tables are cached for the session and queried again only
+    if the recorded status files have changed.
+
+    Parameters
+    ----------
+    catalog_file : String
+        path to the catalog
+    **filters
+        required value of any of DESCRIPTION_COLUMNS, model_type or folder
+
+    Returns
+    -------
+    results : pd.DataFrame
+        copy of the cached table, see query_results
+
+    """
+
+    key = (
+        os.path.realpath(catalog_file),
+        tuple(sorted(filters.items())),
+        recorded_runs(catalog_file),
+    )
+    if key not in COMPARISON_CACHE:
+        COMPARISON_CACHE[key] = query_results(catalog_file, **filters)
+
+    return COMPARISON_CACHE[key].copy()
+
+
+def relative_deviation(values, reference):
+    """
+    Calculates the relative deviation of all values of a table from the value
+    of a reference run at once.
+
+    Parameters
+    ----------
+    values : pd.DataFrame
+        KPIs of the compared runs, e.g. objectives pivoted by method
+    reference : float
+        KPI of the reference run
+
+    Returns
+    -------
+    deviation : pd.DataFrame
+        (values - reference) / reference, NaN where values are missing
+
+    """
+
+    return (values.astype(float) - reference) / reference
+
+
+def deviation_in_percent(values, reference):
+    """
+    Calculates the absolute deviation of all values of a table from the value
+    of a reference run in percent, see relative_deviation.
+
+    Parameters
+    ----------
+    values : pd.DataFrame
+        KPIs of the compared runs, e.g. objectives pivoted by method
+    reference : float
+        KPI of the reference run
+
+    Returns
+    -------
+    deviation : pd.DataFrame
+        |100 * (values - reference) / reference|
+
+    """
+
+    return (100 * relative_deviation(values, reference)).abs()
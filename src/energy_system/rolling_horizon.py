@@ -0,0 +1,450 @@
+import os
+import datetime
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from energy_system.scenario_runner import (
+    LINEAR_MODEL_TYPES,
+    MODEL_TYPES_WITH_SCENARIO_OPTIONS,
+    load_model_module,
+    get_solver_options,
+    merge_scenario_status,
+)
+from energy_system.model_template import (
+    initial_state_of_charge,
+    set_fixed_flows,
+    set_initial_state_of_charge,
+    set_terminal_state_of_charge,
+)
+from energy_system.result_extraction import scenario_result_extraction
+from energy_system.result_store import export_results, scenario_result_format
+
+# results written by process_solver_results, which are stitched together, the
+# windows are always written as csv files
+RESULT_FILES = ["storage", "bus_gen", "bus_dem"]
+
+
+def define_windows(timeseries_length, window_length, overlap):
+    """
+    Splits a horizon into consecutive windows. Each window is solved for its
+    own timesteps plus the overlap, but only its own timesteps are kept.
+
+    Parameters
+    ----------
+    timeseries_length : int
+        number of timesteps of the whole horizon
+    window_length : int
+        number of timesteps kept of each window
+    overlap : int
+        number of additional timesteps solved at the end of each window to
+        account for the future, not exceeding the horizon
+
+    Returns
+    -------
+    windows : list
+        tuples (first timestep, number of kept timesteps, number of solved
+        timesteps) of each window
+
+    """
+
+    if window_length < 1 or overlap < 0:
+        raise ValueError(
+            "The window length has to be positive and the overlap non-negative."
+        )
+
+    windows = []
+    for start in range(0, timeseries_length, window_length):
+        kept_length = min(window_length, timeseries_length - start)
+        solved_length = min(window_length + overlap, timeseries_length - start)
+        windows.append((start, kept_length, solved_length))
+
+    return windows
+
+
+def variable_costs(model, timesteps):
+    """
+    Returns the variable costs of a solved model for a subset of its timesteps,
+    i.e. the part of the objective belonging to these timesteps.
+
+    Parameters
+    ----------
+    model : solph.Model
+        solved model
+    timesteps : iterable
+        timesteps of the model
+
+    Returns
+    -------
+    costs : float
+        variable costs of all flows
+
+    """
+
+    costs = 0
+    for (source, target), flow in model.flows.items():
+        if flow.variable_costs[0] is None:
+            continue
+        for t in timesteps:
+            costs += (
+                flow.variable_costs[t]
+                * model.flow[source, target, t].value
+                * model.objective_weighting[t]
+            )
+
+    return costs
+
+
+def stitch_results(
+    window_dirs,
+    windows,
+    timeindex,
+    export_root,
+    i_scenario,
+    result_format="csv",
+    model_type=None,
+):
+    """
+    Combines the result files of all windows into one result each, which is
+    written in the given format (see result_store.export_results). Of every
+    window only the kept timesteps are used, the additional last row of the
+    results (last interval) is taken from the last window.
+
+    Parameters
+    ----------
+    window_dirs : list
+        result directory of each window
+    windows : list
+        windows as returned by define_windows
+    timeindex : pd.DatetimeIndex
+        timesteps of the whole horizon incl. the last interval
+    export_root : String
+        path to folder, where results are to be saved
+    i_scenario : String
+        name of the scenario
+    result_format : String
+        one of result_store.RESULT_FORMATS
+    model_type : String
+        model type of the scenario, the partition of the result store
+
+    Returns
+    -------
+    result_storage : pd.DataFrame
+        stitched storage results
+
+    """
+
+    stitched_results = {}
+    for result_file in RESULT_FILES:
+        pieces = []
+        for i_window, (window_dir, (start, kept_length, solved_length)) in enumerate(
+            zip(window_dirs, windows)
+        ):
+            result = pd.read_csv(
+                os.path.join(window_dir, result_file + ".csv"),
+                index_col=0,
+                sep=";",
+            )
+            if i_window < len(windows) - 1:
+                result = result.iloc[:kept_length]
+            else:
+                result = result.iloc[: kept_length + 1]
+            result.index = timeindex[start : start + len(result)]
+            pieces.append(result)
+
+        stitched_results[result_file] = pd.concat(pieces)
+
+    export_results(export_root, i_scenario, stitched_results, result_format, model_type)
+
+    return stitched_results["storage"]
+
+
+def solve_rolling_horizon(
+    model_type,
+    scenario_options,
+    scenario_status,
+    i_scenario,
+    export_root,
+    solver_name,
+    window_length,
+    overlap,
+):
+    """
+    Solves a scenario window by window. The state of charge at the end of the
+    kept timesteps of a window is the initial state of charge of the next
+    window. Only the last window has to end with at least the initial state of
+    charge of the scenario, the others may end at any state of charge. All
+    windows of the same length share one model, which is only updated (see
+    model_template). The results of all windows are stitched into storage.csv,
+    bus_gen.csv and bus_dem.csv of the scenario.
+
+    Parameters
+    ----------
+    model_type : String
+        model type, one of the keys of MODEL_TYPES
+    scenario_options : pd.DataFrame
+        scenario description, has to contain the row i_scenario
+    scenario_status : pd.DataFrame
+        scenario status, has to contain the row i_scenario
+    i_scenario : String
+        name of the scenario
+    export_root : String
+        path to folder, where results are to be saved
+    solver_name : String
+        name of the solver, e.g. cplex, gurobi, cbc, glpk, ...
+    window_length : int
+        number of timesteps kept of each window
+    overlap : int
+        number of additional timesteps solved at the end of each window
+
+    Returns
+    -------
+    scenario_status : pd.DataFrame
+        scenario status containing only the row of the solved scenario
+
+    """
+
+    module = load_model_module(model_type)
+
+    # work on copies, so that a worker only returns the row of its scenario
+    scenario_options = scenario_options.loc[[i_scenario]].copy()
+    scenario_status = scenario_status.loc[[i_scenario]].copy()
+
+    timeseries_length = int(scenario_options.at[i_scenario, "timeseries_length"])
+    windows = define_windows(timeseries_length, window_length, overlap)
+
+    # timesteps of the whole horizon incl. the last interval
+    timeindex = pd.date_range(
+        scenario_options.at[i_scenario, "start_date"],
+        periods=timeseries_length + 1,
+        freq=scenario_options.at[i_scenario, "frequency"],
+    )
+
+    # timeseries of the whole horizon, each window uses a part of it
+    demand, ee_generation = module.read_timeseries(
+        scenario_options,
+        i_scenario,
+        scenario_options.at[i_scenario, "sf_dem_[-]"],
+        scenario_options.at[i_scenario, "sf_res_[-]"],
+    )
+
+    # SOC_INI is given relative to SOC_MAX except for the linear models
+    SOC_INI = scenario_options.at[i_scenario, "SOC_INI_[-]"]
+    SOC_MAX = scenario_options.at[i_scenario, "SOC_MAX_[MWh]"]
+
+    result_extraction = scenario_result_extraction(scenario_options, i_scenario)
+
+    models = {}
+    window_dirs = []
+    objective = 0
+    solution_time = 0
+    final_mip_gap = 0
+
+    with tempfile.TemporaryDirectory() as window_root:
+        for i_window, (start, kept_length, solved_length) in enumerate(windows):
+            window_name = "{0:s}_window_{1:d}".format(i_scenario, i_window)
+
+            # models are built once for each window length
+            if solved_length not in models:
+                scenario_options.at[i_scenario, "timeseries_length"] = solved_length
+                models[solved_length] = module.set_up_energy_system_model(
+                    scenario_options, i_scenario
+                )
+            model = models[solved_length]
+
+            set_fixed_flows(
+                model,
+                demand.iloc[start : start + solved_length],
+                ee_generation.iloc[start : start + solved_length],
+            )
+            set_initial_state_of_charge(model, SOC_INI)
+
+            # the terminal state of charge of the scenario applies to the end of
+            # the horizon only
+            if i_window == 0:
+                soc_terminal = initial_state_of_charge(model)
+            if i_window == len(windows) - 1:
+                set_terminal_state_of_charge(model, soc_terminal)
+            else:
+                set_terminal_state_of_charge(model)
+
+            solver_results = model.solve(
+                solver=solver_name,
+                solve_kwargs={"tee": False},
+                cmdline_options=get_solver_options(scenario_options, i_scenario),
+            )
+
+            # process results of the window using a status of its own
+            window_status = scenario_status.rename(index={i_scenario: window_name})
+            if model_type in MODEL_TYPES_WITH_SCENARIO_OPTIONS:
+                module.process_solver_results(
+                    solver_results,
+                    model,
+                    window_status,
+                    window_name,
+                    window_root,
+                    scenario_options.rename(index={i_scenario: window_name}),
+                    result_extraction=result_extraction,
+                )
+            else:
+                module.process_solver_results(
+                    solver_results,
+                    model,
+                    window_status,
+                    window_name,
+                    window_root,
+                    result_extraction=result_extraction,
+                )
+
+            if window_status.at[window_name, "solved"] != 1:
+                raise RuntimeError(
+                    "Window {0:d} of scenario '{1:s}' was not solved.".format(
+                        i_window, i_scenario
+                    )
+                )
+
+            window_dirs.append(os.path.join(window_root, window_name))
+            objective += variable_costs(model, range(kept_length))
+            if window_status.at[window_name, "solution_time"] != "timelimit":
+                solution_time += float(window_status.at[window_name, "solution_time"])
+            if "final_mip_gap" in window_status.columns:
+                final_mip_gap = max(
+                    final_mip_gap, float(window_status.at[window_name, "final_mip_gap"])
+                )
+
+            # hand over the state of charge to the next window
+            storage = model.es.groups["storage"]
+            soc_end = model.StorageBlock.soc[storage, kept_length - 1].value
+            if model_type in LINEAR_MODEL_TYPES:
+                SOC_INI = soc_end
+            else:
+                SOC_INI = soc_end / SOC_MAX
+
+        result_storage = stitch_results(
+            window_dirs,
+            windows,
+            timeindex,
+            export_root,
+            i_scenario,
+            scenario_result_format(scenario_options, i_scenario),
+            model_type,
+        )
+
+    # set scenario status for current scenario
+    scenario_status.at[i_scenario, "objective"] = objective
+    scenario_status.at[i_scenario, "final_mip_gap"] = final_mip_gap
+    if "eta_in" in result_storage.columns:
+        scenario_status.at[i_scenario, "eta_in_mean"] = result_storage["eta_in"].mean()
+        scenario_status.at[i_scenario, "eta_out_mean"] = result_storage[
+            "eta_out"
+        ].mean()
+    scenario_status.at[i_scenario, "solved"] = 1
+    scenario_status.at[i_scenario, "solution_time"] = solution_time
+    scenario_status.at[i_scenario, "windows"] = len(windows)
+
+    # create log message
+    log_msg = "[{0:s}]\tScenario: '{1:s}' finished ({2:d} windows).\n".format(
+        datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        i_scenario,
+        len(windows),
+    )
+    # print log message
+    print(log_msg, end="")
+
+    return scenario_status
+
+
+def run_rolling_horizon(
+    scenario_file,
+    model_type,
+    export_root,
+    window_length,
+    overlap=0,
+    solver_name="cplex",
+    number_of_workers=None,
+):
+    """
+    Solves all active scenarios of a scenario file using a rolling horizon
+    (see solve_rolling_horizon). The windows of one scenario depend on each
+    other through the state of charge and are solved one after another, while
+    the scenarios are solved concurrently in worker processes.
+
+    Parameters
+    ----------
+    scenario_file : String
+        path to csv-file containing the scenario description, ";" should be used
+        as separator
+    model_type : String
+        model type, one of the keys of MODEL_TYPES
+    export_root : String
+        path to folder, where results are to be saved
+    window_length : int
+        number of timesteps kept of each window, e.g. 672 for four weeks at
+        hourly resolution
+    overlap : int
+        number of additional timesteps solved at the end of each window
+    solver_name : String
+        name of the solver, e.g. cplex, gurobi, cbc, glpk, ...
+    number_of_workers : int, optional
+        number of worker processes, defaults to the number of cpus
+
+    Returns
+    -------
+    scenario_status : pd.DataFrame
+        scenario status of all scenarios
+
+    """
+
+    module = load_model_module(model_type)
+
+    # create export directory if necessary
+    if not os.path.exists(export_root):
+        os.makedirs(export_root)
+
+    # read scenarios that are to be calculated
+    scenario_options, scenario_status = module.read_scenario_file(scenario_file)
+
+    # skip inactive scenarios
+    active_scenarios = [
+        i_scenario
+        for i_scenario in scenario_options.index
+        if scenario_options.at[i_scenario, "active"]
+    ]
+
+    if number_of_workers is None:
+        number_of_workers = os.cpu_count()
+
+    with ProcessPoolExecutor(
+        max_workers=max(1, min(number_of_workers, len(active_scenarios)))
+    ) as executor:
+        futures = {
+            executor.submit(
+                solve_rolling_horizon,
+                model_type,
+                scenario_options,
+                scenario_status,
+                i_scenario,
+                export_root,
+                solver_name,
+                window_length,
+                overlap,
+            ): i_scenario
+            for i_scenario in active_scenarios
+        }
+
+        for future in as_completed(futures):
+            try:
+                merge_scenario_status(scenario_status, future.result())
+            except Exception as error:
+                # a failing scenario must not stop the remaining scenarios
+                log_msg = "[{0:s}]\tScenario: '{1:s}' failed: {2}\n".format(
+                    datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    futures[future],
+                    error,
+                )
+                print(log_msg, end="")
+
+    module.export_scenario_description(export_root, scenario_status)
+
+    return scenario_status
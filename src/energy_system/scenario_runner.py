@@ -0,0 +1,1090 @@
+import io
+import os
+import sys
+import datetime
+import hashlib
+import importlib
+import inspect
+import math
+import multiprocessing
+import queue
+import tempfile
+import time
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import pandas as pd
+
+# make sure the package energy_system can be imported in the worker processes
+src_path = os.path.realpath(os.path.join(__file__, "..", ".."))
+if src_path not in sys.path:
+    sys.path.append(src_path)
+
+from energy_system.model_template import (
+    group_scenarios_by_template,
+    update_model_template,
+)
+from energy_system.mip_start import (
+    MIP_START_MODEL_TYPES,
+    read_schedule,
+    schedule_from_model,
+    set_mip_start,
+    parse_first_incumbent,
+)
+from energy_system.persistent_solver import (
+    PERSISTENT_SOLVER_MODEL_TYPES,
+    solve_persistent,
+)
+from energy_system.phase_timing import (
+    add_phase_time,
+    add_solver_timing,
+    measure_phase,
+    reset_phase_times,
+    write_phase_times,
+)
+from energy_system.result_extraction import scenario_result_extraction
+from energy_system.result_store import results_exist, scenario_result_format
+from energy_system.results_catalog import CHECKPOINT_FILE_NAME
+
+# model types and the modules implementing the corresponding energy system
+MODEL_TYPES = {
+    "linear": "calculate_energy_system_linear",
+    "linear_with_storage_losses": "calculate_energy_system_linear_with_storage_losses",
+    "sos2": "calculate_energy_system_sos2",
+    "sos2_with_constant_storage_efficiency": (
+        "calculate_energy_system_sos2_with_constant_storage_efficiency"
+    ),
+    "sos2_with_soc_dependent_efficiency": (
+        "calculate_energy_system_sos2_with_soc_dependent_efficiency"
+    ),
+    "big_m": "calculate_energy_system_big_m",
+}
+
+# model types, for which process_solver_results needs the scenario options
+# to set the (constant) efficiencies in the scenario status
+MODEL_TYPES_WITH_SCENARIO_OPTIONS = ["linear", "linear_with_storage_losses"]
+
+# model types, which result in a linear program (no binary variables)
+LINEAR_MODEL_TYPES = ["linear", "linear_with_storage_losses"]
+
+# number of timesteps times segments of the efficiency curves, that is
+# assigned to one solver thread when distributing a core budget
+SEGMENT_TIMESTEPS_PER_SOLVER_THREAD = 1000
+
+# modules of storage_models building the piecewise linear relations of the
+# storage models, which change the model without changing the storage model
+FORMULATION_MODULES = [
+    "sos2_builder.py",
+    "disjunctive_builder.py",
+    "envelope_builder.py",
+]
+
+# seconds between checks for scenarios finished by workers solving a model
+# template, whose status is written to the checkpoint (see solve_scenario_group)
+CHECKPOINT_INTERVAL = 1
+
+# hashes of files, the key is the tuple (path, modification time)
+_file_hash_cache = {}
+
+
+def load_model_module(model_type):
+    """
+    Imports the module implementing the energy system of the given model type.
+
+    Parameters
+    ----------
+    model_type : String
+        model type, one of the keys of MODEL_TYPES
+
+    Returns
+    -------
+    module : module
+        module containing read_scenario_file, set_up_energy_system_model,
+        process_solver_results and export_scenario_description
+
+    """
+
+    if model_type not in MODEL_TYPES:
+        raise ValueError(
+            "Unknown model type '{0}'. Choose one of: {1}".format(
+                model_type, ", ".join(MODEL_TYPES)
+            )
+        )
+
+    return importlib.import_module("energy_system." + MODEL_TYPES[model_type])
+
+
+def get_solver_options(scenario_options, i_scenario, solver_threads=None):
+    """
+    Returns the command line options passed to the solver for a scenario.
+
+    Parameters
+    ----------
+    scenario_options : pd.DataFrame
+        scenario description as read by read_scenario_file
+    i_scenario : String
+        name of the scenario
+    solver_threads : int, optional
+        number of threads the solver may use, if None the solver decides
+
+    Returns
+    -------
+    cmdline_options : dict
+        command line options of the solver
+
+    """
+
+    cmdline_options = {
+        "timelimit": scenario_options.at[i_scenario, "solve_timeout"],
+        "mipgap": scenario_options.at[i_scenario, "mip_gap"],
+    }
+
+    if solver_threads is not None:
+        cmdline_options["threads"] = solver_threads
+
+    return cmdline_options
+
+
+def estimate_solver_threads(scenario_options, i_scenario, model_type, core_budget):
+    """
+    Estimates the number of solver threads for a scenario. Linear programs are
+    solved using a single thread, while the number of threads for MILPs grows
+    with the number of timesteps times the number of segments of the
+    efficiency curves, i.e. with the number of binary/SOS2 variables.
+
+    Parameters
+    ----------
+    scenario_options : pd.DataFrame
+        scenario description as read by read_scenario_file
+    i_scenario : String
+        name of the scenario
+    model_type : String
+        model type, one of the keys of MODEL_TYPES
+    core_budget : int
+        number of cores available for all scenarios
+
+    Returns
+    -------
+    solver_threads : int
+        number of threads the solver may use, between 1 and core_budget
+
+    """
+
+    if model_type in LINEAR_MODEL_TYPES:
+        return 1
+
+    number_of_segments = max(
+        len(scenario_options.at[i_scenario, label].split(", ")) - 1
+        for label in ["p_in_breakpoints_[-]", "p_out_stor_breakpoints_[-]"]
+    )
+    problem_size = (
+        scenario_options.at[i_scenario, "timeseries_length"] * number_of_segments
+    )
+
+    solver_threads = math.ceil(problem_size / SEGMENT_TIMESTEPS_PER_SOLVER_THREAD)
+
+    return max(1, min(solver_threads, core_budget))
+
+
+def file_hash(file_path):
+    """
+    Returns the sha256 hash of the content of a file. The hash is calculated
+    only once per process as long as the modification time does not change.
+
+    Parameters
+    ----------
+    file_path : String
+        path to the file
+
+    Returns
+    -------
+    hash : String
+        hexadecimal sha256 hash of the file content
+
+    """
+
+    file_path = os.path.realpath(file_path)
+    cache_key = (file_path, os.path.getmtime(file_path))
+
+    if cache_key not in _file_hash_cache:
+        with open(file_path, "rb") as file:
+            _file_hash_cache[cache_key] = hashlib.sha256(file.read()).hexdigest()
+
+    return _file_hash_cache[cache_key]
+
+
+def scenario_hash(scenario_options, i_scenario, model_type):
+    """
+    Returns a hash identifying all inputs of a scenario: the model type, the
+    complete row of the scenario description, the timeseries data file and the
+    source code of the energy system and storage model incl. the modules
+    building its piecewise linear relations (FORMULATION_MODULES). If the hash
+    of a scenario is unchanged, solving it again yields the same results.
+
+    Parameters
+    ----------
+    scenario_options : pd.DataFrame
+        scenario description as read by read_scenario_file
+    i_scenario : String
+        name of the scenario
+    model_type : String
+        model type, one of the keys of MODEL_TYPES
+
+    Returns
+    -------
+    hash : String
+        hexadecimal sha256 hash of the scenario inputs
+
+    """
+
+    module = load_model_module(model_type)
+
+    # same path to timeseries data file as used in read_timeseries
+    data_path = os.path.realpath(
+        os.path.join("data", scenario_options.at[i_scenario, "input_data"])
+    )
+
+    storage_model_file = inspect.getsourcefile(module.Stor)
+    scenario_inputs = [
+        model_type,
+        scenario_options.loc[i_scenario].to_json(),
+        file_hash(data_path),
+        file_hash(module.__file__),
+        file_hash(storage_model_file),
+    ] + [
+        file_hash(os.path.join(os.path.dirname(storage_model_file), file_name))
+        for file_name in FORMULATION_MODULES
+    ]
+
+    return hashlib.sha256("\n".join(scenario_inputs).encode("utf-8")).hexdigest()
+
+
+def read_checkpoint(export_root):
+    """
+    Reads the status of all scenarios finished in previous runs.
+
+    Parameters
+    ----------
+    export_root : String
+        path to folder, where results are saved
+
+    Returns
+    -------
+    checkpoint : pd.DataFrame
+        scenario status incl. the column scenario_hash, empty if no checkpoint
+        exists
+
+    """
+
+    checkpoint_file = os.path.join(export_root, CHECKPOINT_FILE_NAME)
+
+    if not os.path.exists(checkpoint_file):
+        return pd.DataFrame()
+
+    return pd.read_csv(checkpoint_file, index_col=0, sep=";")
+
+
+def write_checkpoint(export_root, checkpoint):
+    """
+    Writes the status of all finished scenarios. The file is replaced
+    atomically, so that an interrupted run never leaves a broken checkpoint.
+
+    Parameters
+    ----------
+    export_root : String
+        path to folder, where results are saved
+    checkpoint : pd.DataFrame
+        scenario status incl. the column scenario_hash
+
+    Returns
+    -------
+    -
+
+    """
+
+    checkpoint_file = os.path.join(export_root, CHECKPOINT_FILE_NAME)
+
+    checkpoint.to_csv(checkpoint_file + ".tmp", index_label="name", sep=";")
+    os.replace(checkpoint_file + ".tmp", checkpoint_file)
+
+
+def is_solved_in_checkpoint(
+    checkpoint,
+    i_scenario,
+    hash_value,
+    export_root,
+    result_format="csv",
+    model_type=None,
+):
+    """
+    Checks, if a scenario with the given hash was solved successfully in a
+    previous run and its results still exist.
+
+    Parameters
+    ----------
+    checkpoint : pd.DataFrame
+        scenario status incl. the column scenario_hash
+    i_scenario : String
+        name of the scenario
+    hash_value : String
+        hash of the scenario inputs
+    export_root : String
+        path to folder, where results are saved
+    result_format : String
+        format of the results of the scenario, see result_store.RESULT_FORMATS
+    model_type : String, optional
+        model type of the scenario, the partition of the result store
+
+    Returns
+    -------
+    solved : bool
+        True if the scenario does not need to be solved again
+
+    """
+
+    if i_scenario not in checkpoint.index:
+        return False
+
+    return (
+        checkpoint.at[i_scenario, "scenario_hash"] == hash_value
+        and checkpoint.at[i_scenario, "solved"] == 1
+        and results_exist(export_root, i_scenario, result_format, model_type)
+    )
+
+
+def find_mip_start(model_type, i_scenario, mip_start_root):
+    """
+    Reads the schedule of a scenario with the same name solved before, e.g.
+    using the linear storage model, to be used as warm start.
+
+    Parameters
+    ----------
+    model_type : String
+        model type, one of the keys of MODEL_TYPES
+    i_scenario : String
+        name of the scenario
+    mip_start_root : String
+        path to folder containing the results of the scenarios solved before
+
+    Returns
+    -------
+    mip_start : pd.DataFrame
+        storage schedule, None if no schedule exists
+    mip_start_source : String
+        result directory of the schedule
+
+    """
+
+    if mip_start_root is None or model_type not in MIP_START_MODEL_TYPES:
+        return None, ""
+
+    export_dir = os.path.join(mip_start_root, i_scenario)
+    if not os.path.exists(os.path.join(export_dir, "storage.csv")):
+        return None, ""
+
+    return read_schedule(export_dir), export_dir
+
+
+def solve_model(
+    module,
+    model_type,
+    model,
+    scenario_options,
+    scenario_status,
+    i_scenario,
+    export_root,
+    solver_name,
+    solver_threads=None,
+    persistent_solver_name=None,
+    mip_start=None,
+    mip_start_source="",
+):
+    """
+    Solves the model of a scenario and processes the results. For MIPs solved
+    by a file based solver, the time to the first incumbent is read from the
+    solver log and written to the scenario status. The wall times of all
+    phases of the scenario (see phase_timing) are written to the scenario
+    status as well.
+
+    Parameters
+    ----------
+    module : module
+        module implementing the energy system of the model type
+    model_type : String
+        model type, one of the keys of MODEL_TYPES
+    model : solph.Model
+        model of the scenario
+    scenario_options : pd.DataFrame
+        scenario description, has to contain the row i_scenario
+    scenario_status : pd.DataFrame
+        scenario status, has to contain the row i_scenario, is changed in place
+    i_scenario : String
+        name of the scenario
+    export_root : String
+        path to folder, where results are to be saved
+    solver_name : String
+        name of the solver, e.g. cplex, gurobi, cbc, glpk, ...
+    solver_threads : int, optional
+        number of threads the solver may use, if None the solver decides
+    persistent_solver_name : String, optional
+        name of a persistent solver (see PERSISTENT_SOLVERS) used instead of
+        the file based solver solver_name
+    mip_start : pd.DataFrame, optional
+        storage schedule (see read_schedule) used as warm start, ignored for
+        model types not in MIP_START_MODEL_TYPES and for persistent solvers
+    mip_start_source : String
+        origin of the schedule written to the scenario status
+
+    Returns
+    -------
+    -
+
+    """
+
+    cmdline_options = get_solver_options(scenario_options, i_scenario, solver_threads)
+
+    # solve problem using solver
+    log_file = None
+    start_time = time.perf_counter()
+    if persistent_solver_name is None:
+        solve_kwargs = {"tee": False}
+
+        # pass start values of a schedule to the solver
+        if mip_start is not None and model_type in MIP_START_MODEL_TYPES:
+            set_mip_start(model, mip_start)
+            solve_kwargs["warmstart"] = True
+        else:
+            mip_start_source = ""
+
+        # keep the solver log to find the first incumbent
+        if model_type not in LINEAR_MODEL_TYPES:
+            log_handle, log_file = tempfile.mkstemp(suffix=".log")
+            os.close(log_handle)
+            solve_kwargs["logfile"] = log_file
+
+        # pyomo reports the time of writing the model, solving and reading the
+        # solution, if report_timing is set
+        solve_kwargs["report_timing"] = True
+        solver_output = io.StringIO()
+        with redirect_stdout(solver_output):
+            solver_results = model.solve(
+                solver=solver_name,
+                solve_kwargs=solve_kwargs,
+                cmdline_options=cmdline_options,
+            )
+        add_solver_timing(solver_output.getvalue())
+        solver_interface = solver_name
+    else:
+        solver_results = solve_persistent(
+            model, persistent_solver_name, cmdline_options
+        )
+        solver_interface = persistent_solver_name + " (persistent)"
+        mip_start_source = ""
+    solve_wall_time = time.perf_counter() - start_time
+
+    # the persistent solver is updated instead of writing the model, which is
+    # counted as part of the solve
+    if persistent_solver_name is not None:
+        add_phase_time("solve", solve_wall_time)
+
+    result_extraction = scenario_result_extraction(scenario_options, i_scenario)
+    result_format = scenario_result_format(scenario_options, i_scenario)
+    with measure_phase("results_processing"):
+        if model_type in MODEL_TYPES_WITH_SCENARIO_OPTIONS:
+            module.process_solver_results(
+                solver_results,
+                model,
+                scenario_status,
+                i_scenario,
+                export_root,
+                scenario_options,
+                result_extraction=result_extraction,
+                result_format=result_format,
+            )
+        else:
+            module.process_solver_results(
+                solver_results,
+                model,
+                scenario_status,
+                i_scenario,
+                export_root,
+                result_extraction=result_extraction,
+                result_format=result_format,
+            )
+
+    if solver_threads is not None:
+        scenario_status.at[i_scenario, "solver_threads"] = solver_threads
+
+    # representation of the piecewise linear relations, see
+    # benchmarks.piecewise_representation
+    if "pw_repn" in scenario_options.columns:
+        scenario_status.at[i_scenario, "pw_repn"] = scenario_options.at[
+            i_scenario, "pw_repn"
+        ]
+
+    # extraction of the results, see energy_system.result_extraction
+    scenario_status.at[i_scenario, "result_extraction"] = result_extraction
+
+    # format of the result files, see energy_system.result_store
+    scenario_status.at[i_scenario, "result_format"] = result_format
+
+    # formulation of the piecewise linear relations of the big-M model, see
+    # storage_models.disjunctive_builder
+    if "formulation" in scenario_options.columns:
+        scenario_status.at[i_scenario, "formulation"] = scenario_options.at[
+            i_scenario, "formulation"
+        ]
+
+    # wall time of the solve incl. writing and reading files or updating the
+    # persistent solver
+    scenario_status.at[i_scenario, "solver_interface"] = solver_interface
+    scenario_status.at[i_scenario, "solve_wall_time"] = solve_wall_time
+
+    # effect of the warm start on the time to the first incumbent
+    if log_file is not None:
+        time_to_first_incumbent, first_incumbent_objective = parse_first_incumbent(
+            log_file, solver_name
+        )
+        os.remove(log_file)
+        scenario_status.at[i_scenario, "mip_start"] = mip_start_source
+        scenario_status.at[i_scenario, "time_to_first_incumbent"] = (
+            time_to_first_incumbent
+        )
+        scenario_status.at[i_scenario, "first_incumbent_objective"] = (
+            first_incumbent_objective
+        )
+
+    write_phase_times(scenario_status, i_scenario)
+
+
+def solve_scenario(
+    model_type,
+    scenario_options,
+    scenario_status,
+    i_scenario,
+    export_root,
+    solver_name,
+    solver_threads=None,
+    persistent_solver_name=None,
+    mip_start_root=None,
+):
+    """
+    Sets up, solves and processes a single scenario. The function is used as
+    worker in run_scenarios, but can also be called directly.
+
+    Parameters
+    ----------
+    model_type : String
+        model type, one of the keys of MODEL_TYPES
+    scenario_options : pd.DataFrame
+        scenario description, has to contain the row i_scenario
+    scenario_status : pd.DataFrame
+        scenario status, has to contain the row i_scenario
+    i_scenario : String
+        name of the scenario
+    export_root : String
+        path to folder, where results are to be saved
+    solver_name : String
+        name of the solver, e.g. cplex, gurobi, cbc, glpk, ...
+    solver_threads : int, optional
+        number of threads the solver may use, if None the solver decides
+    persistent_solver_name : String, optional
+        name of a persistent solver (see PERSISTENT_SOLVERS) used instead of
+        the file based solver solver_name
+    mip_start_root : String, optional
+        path to folder containing results of the same scenario solved before
+        (e.g. using the linear model), used as warm start (see find_mip_start)
+
+    Returns
+    -------
+    scenario_status : pd.DataFrame
+        scenario status containing only the row of the solved scenario
+
+    """
+
+    module = load_model_module(model_type)
+
+    # work on copies, so that a worker only returns the row of its scenario
+    scenario_options = scenario_options.loc[[i_scenario]].copy()
+    scenario_status = scenario_status.loc[[i_scenario]].copy()
+
+    reset_phase_times()
+    model = module.set_up_energy_system_model(scenario_options, i_scenario)
+
+    mip_start, mip_start_source = find_mip_start(model_type, i_scenario, mip_start_root)
+
+    solve_model(
+        module,
+        model_type,
+        model,
+        scenario_options,
+        scenario_status,
+        i_scenario,
+        export_root,
+        solver_name,
+        solver_threads,
+        persistent_solver_name,
+        mip_start,
+        mip_start_source,
+    )
+
+    return scenario_status
+
+
+def solve_scenario_group(
+    model_type,
+    scenario_options,
+    scenario_status,
+    scenarios,
+    export_root,
+    solver_name,
+    solver_threads=None,
+    persistent_solver_name=None,
+    mip_start_root=None,
+    mip_start_from_previous=False,
+    status_queue=None,
+):
+    """
+    Solves scenarios sharing one model template (see
+    group_scenarios_by_template). The model is set up only for the first
+    scenario, for all following scenarios the template parameters are updated
+    in the existing model before solving it again. The status of every solved
+    scenario is put into status_queue as soon as it is solved, so that
+    run_scenarios can write it to the checkpoint before the group is finished.
+
+    Parameters
+    ----------
+    model_type : String
+        model type, one of the keys of MODEL_TYPES
+    scenario_options : pd.DataFrame
+        scenario description, has to contain the rows of all scenarios
+    scenario_status : pd.DataFrame
+        scenario status, has to contain the rows of all scenarios
+    scenarios : list
+        names of the scenarios sharing one model template
+    export_root : String
+        path to folder, where results are to be saved
+    solver_name : String
+        name of the solver, e.g. cplex, gurobi, cbc, glpk, ...
+    solver_threads : int, optional
+        number of threads the solver may use, if None the solver decides
+    persistent_solver_name : String, optional
+        name of a persistent solver (see PERSISTENT_SOLVERS) used instead of
+        the file based solver solver_name
+    mip_start_root : String, optional
+        path to folder containing results of the same scenarios solved before
+        (e.g. using the linear model), used as warm start (see find_mip_start)
+    mip_start_from_previous : bool
+        specifies if the schedule of the previous scenario of the group is used
+        as warm start, if no schedule in mip_start_root exists
+    status_queue : multiprocessing.Queue, optional
+        queue receiving the scenario status of every solved scenario (one row)
+
+    Returns
+    -------
+    scenario_status : pd.DataFrame
+        scenario status containing only the rows of the solved scenarios
+
+    """
+
+    module = load_model_module(model_type)
+
+    # work on copies, so that a worker only returns the rows of its scenarios
+    scenario_options = scenario_options.loc[scenarios].copy()
+    scenario_status = scenario_status.loc[scenarios].copy()
+
+    model = None
+    solved_scenarios = []
+    previous_schedule = None
+    for i_scenario in scenarios:
+        try:
+            reset_phase_times()
+            if model is None:
+                model = module.set_up_energy_system_model(scenario_options, i_scenario)
+            else:
+                update_model_template(model, module, scenario_options, i_scenario)
+
+            mip_start, mip_start_source = find_mip_start(
+                model_type, i_scenario, mip_start_root
+            )
+            if mip_start is None and mip_start_from_previous and solved_scenarios:
+                mip_start = previous_schedule
+                mip_start_source = solved_scenarios[-1]
+
+            solve_model(
+                module,
+                model_type,
+                model,
+                scenario_options,
+                scenario_status,
+                i_scenario,
+                export_root,
+                solver_name,
+                solver_threads,
+                persistent_solver_name,
+                mip_start,
+                mip_start_source,
+            )
+            solved_scenarios.append(i_scenario)
+            if status_queue is not None:
+                status_queue.put(scenario_status.loc[[i_scenario]])
+
+            # keep the schedule, the model is changed by the next scenario
+            if mip_start_from_previous:
+                previous_schedule = schedule_from_model(model)
+        except Exception as error:
+            # a failing scenario must not stop the remaining scenarios
+            log_msg = "[{0:s}]\tScenario: '{1:s}' failed: {2}\n".format(
+                datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                i_scenario,
+                error,
+            )
+            print(log_msg, end="")
+
+    return scenario_status.loc[solved_scenarios]
+
+
+def merge_scenario_status(scenario_status, scenario_status_row):
+    """
+    Writes the row(s) of a solved scenario back into the scenario status of
+    all scenarios. Columns, which are only created while processing the
+    results (e.g. objective), are added if necessary.
+
+    Parameters
+    ----------
+    scenario_status : pd.DataFrame
+        scenario status of all scenarios, is changed in place
+    scenario_status_row : pd.DataFrame
+        scenario status of the solved scenario(s)
+
+    Returns
+    -------
+    -
+
+    """
+
+    for column in scenario_status_row.columns:
+        if column not in scenario_status.columns:
+            scenario_status[column] = pd.Series(dtype=scenario_status_row[column].dtype)
+
+        for i_scenario in scenario_status_row.index:
+            scenario_status.at[i_scenario, column] = scenario_status_row.at[
+                i_scenario, column
+            ]
+
+
+def checkpoint_scenarios(
+    export_root, checkpoint, scenario_status, scenario_status_rows
+):
+    """
+    Merges the status of finished scenarios into the scenario status of all
+    scenarios and writes it to the checkpoint.
+
+    Parameters
+    ----------
+    export_root : String
+        path to folder, where results are saved
+    checkpoint : pd.DataFrame
+        scenario status incl. the column scenario_hash of all finished
+        scenarios
+    scenario_status : pd.DataFrame
+        scenario status of all scenarios, is changed in place
+    scenario_status_rows : pd.DataFrame
+        scenario status of the finished scenario(s)
+
+    Returns
+    -------
+    checkpoint : pd.DataFrame
+        checkpoint incl. the finished scenario(s)
+
+    """
+
+    merge_scenario_status(scenario_status, scenario_status_rows)
+
+    checkpoint = pd.concat(
+        [
+            checkpoint.drop(index=scenario_status_rows.index, errors="ignore"),
+            scenario_status_rows,
+        ]
+    )
+    write_checkpoint(export_root, checkpoint)
+
+    return checkpoint
+
+
+def run_scenarios(
+    scenario_file,
+    model_type,
+    export_root,
+    solver_name="cplex",
+    number_of_workers=None,
+    core_budget=None,
+    resume=False,
+    use_model_template=False,
+    persistent_solver_name=None,
+    mip_start_root=None,
+    mip_start_from_previous=False,
+):
+    """
+    Solves all active scenarios of a scenario file concurrently in worker
+    processes. The status of each scenario is merged back into one scenario
+    status, which is exported using export_scenario_description.
+
+    If a core budget is given, each scenario gets a number of solver threads
+    (see estimate_solver_threads) and scenarios are only started as long as the
+    sum of the threads of all running scenarios fits into the core budget.
+    Larger scenarios are started first, smaller ones fill the remaining cores.
+
+    The status of every finished scenario is written immediately to a
+    checkpoint in export_root together with a hash of its inputs (see
+    scenario_hash), also of scenarios sharing a model template, whose
+    remaining scenarios are still solved. If resume is True, scenarios solved
+    successfully in a previous run with the same hash are not solved again.
+
+    If use_model_template is True, scenarios differing only in sf_dem, sf_res
+    and SOC_INI (and the solver options) share one model template: the model is
+    built once and only updated before solving each of these scenarios (see
+    solve_scenario_group). Scenarios with different breakpoints result in
+    different model templates.
+
+    If a persistent solver is given, the models are solved in memory. Together
+    with use_model_template the solver instance keeps the model between the
+    solves of one model template. The wall time of every solve is written to
+    the scenario status (solve_wall_time).
+
+    MIPs can be started from the schedule of a previous solution (see
+    set_mip_start): of the same scenario in mip_start_root or of the previous
+    scenario of a model template. The time to the first incumbent is written
+    to the scenario status (time_to_first_incumbent).
+
+    Parameters
+    ----------
+    scenario_file : String
+        path to csv-file containing the scenario description, ";" should be used
+        as separator
+    model_type : String
+        model type, one of the keys of MODEL_TYPES
+    export_root : String
+        path to folder, where results are to be saved
+    solver_name : String
+        name of the solver, e.g. cplex, gurobi, cbc, glpk, ...
+    number_of_workers : int, optional
+        number of worker processes, defaults to the number of cpus, ignored if
+        core_budget is given
+    core_budget : int, optional
+        number of cores shared by the solvers of all running scenarios
+    resume : bool
+        specifies if scenarios solved in a previous run are to be skipped
+    use_model_template : bool
+        specifies if scenarios sharing one model template are solved by updating
+        the same model instead of rebuilding it
+    persistent_solver_name : String, optional
+        name of a persistent solver (see PERSISTENT_SOLVERS), which solves the
+        models in memory instead of using the file based solver solver_name,
+        only supported for PERSISTENT_SOLVER_MODEL_TYPES
+    mip_start_root : String, optional
+        path to folder containing results of scenarios with the same names
+        solved before, e.g. using the linear model, which are used as warm
+        start for the MIP model types (see MIP_START_MODEL_TYPES)
+    mip_start_from_previous : bool
+        specifies if the previous scenario of a model template is used as warm
+        start, only used together with use_model_template
+
+    Returns
+    -------
+    scenario_status : pd.DataFrame
+        scenario status of all scenarios
+
+    """
+
+    module = load_model_module(model_type)
+
+    if (
+        persistent_solver_name is not None
+        and model_type not in PERSISTENT_SOLVER_MODEL_TYPES
+    ):
+        raise ValueError(
+            "Model type '{0}' cannot be solved by a persistent solver. Choose one "
+            "of: {1}".format(model_type, ", ".join(PERSISTENT_SOLVER_MODEL_TYPES))
+        )
+
+    # create export directory if necessary
+    if not os.path.exists(export_root):
+        os.makedirs(export_root)
+
+    # read scenarios that are to be calculated
+    scenario_options, scenario_status = module.read_scenario_file(scenario_file)
+
+    # skip inactive scenarios
+    active_scenarios = [
+        i_scenario
+        for i_scenario in scenario_options.index
+        if scenario_options.at[i_scenario, "active"]
+    ]
+
+    # identify the inputs of each scenario
+    for i_scenario in active_scenarios:
+        scenario_status.at[i_scenario, "scenario_hash"] = scenario_hash(
+            scenario_options, i_scenario, model_type
+        )
+
+    # skip scenarios already solved in a previous run
+    checkpoint = read_checkpoint(export_root)
+    if resume:
+        solved_scenarios = [
+            i_scenario
+            for i_scenario in active_scenarios
+            if is_solved_in_checkpoint(
+                checkpoint,
+                i_scenario,
+                scenario_status.at[i_scenario, "scenario_hash"],
+                export_root,
+                scenario_result_format(scenario_options, i_scenario),
+                model_type,
+            )
+        ]
+
+        if solved_scenarios:
+            merge_scenario_status(scenario_status, checkpoint.loc[solved_scenarios])
+
+            # create log message
+            log_msg = "[{0:s}]\tSkipping {1:d} scenario(s) solved before.\n".format(
+                datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                len(solved_scenarios),
+            )
+            print(log_msg, end="")
+
+        active_scenarios = [
+            i_scenario
+            for i_scenario in active_scenarios
+            if i_scenario not in solved_scenarios
+        ]
+
+    # scenarios solved together in one worker, either each scenario on its own
+    # or all scenarios sharing one model template
+    if use_model_template:
+        scenario_groups = group_scenarios_by_template(
+            scenario_options, active_scenarios
+        )
+    else:
+        scenario_groups = [[i_scenario] for i_scenario in active_scenarios]
+    jobs = {tuple(scenarios): scenarios for scenarios in scenario_groups}
+
+    # number of cores occupied by each job, scenarios sharing one model template
+    # have the same number of solver threads
+    if core_budget is None:
+        if number_of_workers is None:
+            number_of_workers = os.cpu_count()
+        budget = max(1, number_of_workers)
+        solver_threads = {job: None for job in jobs}
+        job_cores = {job: 1 for job in jobs}
+    else:
+        budget = max(1, core_budget)
+        solver_threads = {
+            job: estimate_solver_threads(scenario_options, job[0], model_type, budget)
+            for job in jobs
+        }
+        job_cores = solver_threads
+
+    # start largest jobs first
+    pending_jobs = sorted(jobs, key=lambda job: job_cores[job], reverse=True)
+    running_jobs = {}
+    free_cores = budget
+    checkpointed_scenarios = set()
+
+    # workers solving a model template report every solved scenario, so that
+    # the checkpoint is written before the whole template is solved
+    if use_model_template:
+        manager = multiprocessing.Manager()
+        status_queue = manager.Queue()
+        wait_timeout = CHECKPOINT_INTERVAL
+    else:
+        manager = None
+        status_queue = None
+        wait_timeout = None
+
+    with ProcessPoolExecutor(max_workers=max(1, min(budget, len(jobs)))) as executor:
+        while pending_jobs or running_jobs:
+            # start all pending jobs fitting into the free cores
+            for job in list(pending_jobs):
+                if job_cores[job] > free_cores:
+                    continue
+
+                if use_model_template:
+                    future = executor.submit(
+                        solve_scenario_group,
+                        model_type,
+                        scenario_options,
+                        scenario_status,
+                        jobs[job],
+                        export_root,
+                        solver_name,
+                        solver_threads[job],
+                        persistent_solver_name,
+                        mip_start_root,
+                        mip_start_from_previous,
+                        status_queue,
+                    )
+                else:
+                    future = executor.submit(
+                        solve_scenario,
+                        model_type,
+                        scenario_options,
+                        scenario_status,
+                        job[0],
+                        export_root,
+                        solver_name,
+                        solver_threads[job],
+                        persistent_solver_name,
+                        mip_start_root,
+                    )
+                running_jobs[future] = job
+                free_cores -= job_cores[job]
+                pending_jobs.remove(job)
+
+            finished, _ = wait(
+                running_jobs, timeout=wait_timeout, return_when=FIRST_COMPLETED
+            )
+
+            # checkpoint the scenarios solved so far by the model templates,
+            # they are kept even if a later scenario of the template fails
+            while status_queue is not None:
+                try:
+                    scenario_status_row = status_queue.get_nowait()
+                except queue.Empty:
+                    break
+                checkpoint = checkpoint_scenarios(
+                    export_root, checkpoint, scenario_status, scenario_status_row
+                )
+                checkpointed_scenarios.update(scenario_status_row.index)
+
+            for future in finished:
+                job = running_jobs.pop(future)
+                free_cores += job_cores[job]
+                try:
+                    scenario_status_rows = future.result()
+
+                    # checkpoint the status of the finished scenario(s)
+                    checkpoint = checkpoint_scenarios(
+                        export_root, checkpoint, scenario_status, scenario_status_rows
+                    )
+                except Exception as error:
+                    # a failing scenario must not stop the remaining scenarios,
+                    # scenarios of a model template solved before are kept
+                    log_msg = "[{0:s}]\tScenario: '{1:s}' failed: {2}\n".format(
+                        datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                        "', '".join(
+                            i_scenario
+                            for i_scenario in job
+                            if i_scenario not in checkpointed_scenarios
+                        ),
+                        error,
+                    )
+                    print(log_msg, end="")
+
+    if manager is not None:
+        manager.shutdown()
+
+    module.export_scenario_description(export_root, scenario_status)
+
+    return scenario_status
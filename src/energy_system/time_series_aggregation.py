@@ -0,0 +1,682 @@
+import os
+import datetime
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+
+from pyomo.environ import Constraint, Objective, Reals, Var, minimize
+
+from energy_system.scenario_runner import (
+    MODEL_TYPES_WITH_SCENARIO_OPTIONS,
+    load_model_module,
+    get_solver_options,
+    merge_scenario_status,
+)
+from energy_system.model_template import (
+    set_fixed_flows,
+    set_initial_state_of_charge,
+)
+from energy_system.result_extraction import ZERO_TOLERANCE, scenario_result_extraction
+from energy_system.result_store import export_results, scenario_result_format
+from energy_system.rolling_horizon import RESULT_FILES
+
+# model types, whose storage balance has no losses, so that the state of
+# charge of a period can be split into an inter-period and an intra-period part
+AGGREGATION_MODEL_TYPES = ["linear", "sos2", "big_m"]
+
+
+def cluster_periods(demand, ee_generation, period_length, number_of_periods):
+    """
+    Clusters the periods (e.g. days) of the demand and the renewable generation
+    into typical periods using k-means. Each typical period is represented by
+    the original period closest to the center of its cluster (medoid), so that
+    the typical periods are consistent profiles of the data.
+
+    Parameters
+    ----------
+    demand : pd.Series
+        scaled demand of the whole horizon
+    ee_generation : pd.Series
+        scaled renewable generation of the whole horizon
+    period_length : int
+        number of timesteps of a period, e.g. 24 for days at hourly resolution
+    number_of_periods : int
+        number of typical periods
+
+    Returns
+    -------
+    typical_periods : list
+        index of the original period representing each typical period
+    period_order : list
+        index of the typical period of each original period
+
+    """
+
+    if len(demand) % period_length != 0:
+        raise ValueError(
+            "The horizon of {0:d} timesteps cannot be divided into periods of "
+            "{1:d} timesteps.".format(len(demand), period_length)
+        )
+
+    # one row per period, each profile normalised to its maximum
+    features = np.hstack(
+        [
+            np.asarray(timeseries, dtype=float).reshape(-1, period_length)
+            / max(np.abs(np.asarray(timeseries, dtype=float)).max(), 1e-12)
+            for timeseries in [demand, ee_generation]
+        ]
+    )
+
+    number_of_periods = min(number_of_periods, len(features))
+    kmeans = KMeans(n_clusters=number_of_periods, n_init=10, random_state=0)
+    labels = kmeans.fit_predict(features)
+
+    typical_periods = []
+    for cluster in range(number_of_periods):
+        members = np.flatnonzero(labels == cluster)
+        distances = np.linalg.norm(
+            features[members] - kmeans.cluster_centers_[cluster], axis=1
+        )
+        typical_periods.append(int(members[np.argmin(distances)]))
+
+    return typical_periods, [int(label) for label in labels]
+
+
+def typical_timeseries(timeseries, typical_periods, period_length):
+    """
+    Returns the concatenated typical periods of a timeseries.
+
+    Parameters
+    ----------
+    timeseries : pd.Series
+        timeseries of the whole horizon
+    typical_periods : list
+        index of the original period representing each typical period
+    period_length : int
+        number of timesteps of a period
+
+    Returns
+    -------
+    timeseries : pd.Series
+        timeseries of the typical periods, the index is the position
+    """
+
+    return pd.Series(
+        np.concatenate(
+            [
+                np.asarray(timeseries, dtype=float)[
+                    period * period_length : (period + 1) * period_length
+                ]
+                for period in typical_periods
+            ]
+        )
+    )
+
+
+def soc_change(model, n, t):
+    """
+    Returns the change of the state of charge of a storage within a timestep
+    as expression of its power variables, like the storage balance of the
+    storage models in AGGREGATION_MODEL_TYPES: with the efficiencies ETA_IN and
+    ETA_OUT of the linear model or with the power P_in_stor and P_out_stor
+    inside the storage of the models with efficiency curves.
+
+    Parameters
+    ----------
+    model : solph.Model
+        model of the concatenated typical periods
+    n : Storage
+        storage node of the energy system
+    t : int
+        timestep
+
+    Returns
+    -------
+    soc_change : pyomo expression
+        charged minus discharged energy inside the storage
+
+    """
+
+    block = model.StorageBlock
+
+    if hasattr(block, "P_in_stor"):
+        return (block.P_in_stor[n, t] - block.P_out_stor[n, t]) * model.timeincrement[t]
+
+    return (
+        n.ETA_IN * block.P_in[n, t] - (1 / n.ETA_OUT) * block.P_out[n, t]
+    ) * model.timeincrement[t]
+
+
+def add_inter_period_soc(model, period_length, period_order):
+    """
+    Turns the state of charge of the StorageBlock into an intra-period state
+    of charge starting at zero in every typical period and adds the
+    inter-period state of charge linking the original periods:
+
+    soc_inter[p + 1] = soc_inter[p] + soc[end of the typical period of p]
+
+    The state of charge within a period (soc_inter plus the minimal or maximal
+    intra-period state of charge of its typical period) has to respect the
+    limits of the storage, the initial and end state of charge are applied to
+    soc_inter.
+
+    Parameters
+    ----------
+    model : solph.Model
+        model of the concatenated typical periods, is changed in place
+    period_length : int
+        number of timesteps of a period
+    period_order : list
+        index of the typical period of each original period
+
+    Returns
+    -------
+    -
+
+    """
+
+    block = model.StorageBlock
+    number_of_typical_periods = len(model.TIMESTEPS) // period_length
+    typical_periods = range(number_of_typical_periods)
+    periods = range(len(period_order))
+    period_bounds = range(len(period_order) + 1)
+
+    # the intra-period state of charge may be negative
+    for n in block.STORAGES:
+        for t in model.TIMESTEPS:
+            block.soc[n, t].domain = Reals
+            block.soc[n, t].setlb(None)
+            block.soc[n, t].setub(None)
+    for name in ["soc_max", "soc_min", "soc_end"]:
+        getattr(block, name).deactivate()
+
+    # first timestep of every typical period starts at an empty storage and
+    # replaces the storage balance linking it to the previous timestep
+    for n in block.STORAGES:
+        for k in typical_periods:
+            block.soc_balance[n, k * period_length].deactivate()
+
+    def _intra_period_start_rule(block, n, k):
+        t = k * period_length
+        return block.soc[n, t] == soc_change(model, n, t)
+
+    block.intra_period_start = Constraint(
+        block.STORAGES, typical_periods, rule=_intra_period_start_rule
+    )
+
+    # extreme values of the intra-period state of charge of each typical period
+    block.soc_intra_max = Var(block.STORAGES, typical_periods, within=Reals)
+    block.soc_intra_min = Var(block.STORAGES, typical_periods, within=Reals)
+
+    def _soc_intra_max_rule(block, n, t):
+        return block.soc[n, t] <= block.soc_intra_max[n, t // period_length]
+
+    block.soc_intra_max_constraint = Constraint(
+        block.STORAGES, model.TIMESTEPS, rule=_soc_intra_max_rule
+    )
+
+    def _soc_intra_min_rule(block, n, t):
+        return block.soc[n, t] >= block.soc_intra_min[n, t // period_length]
+
+    block.soc_intra_min_constraint = Constraint(
+        block.STORAGES, model.TIMESTEPS, rule=_soc_intra_min_rule
+    )
+
+    def _soc_intra_zero_rule(block, n, k):
+        return block.soc_intra_min[n, k] <= 0
+
+    block.soc_intra_zero_min = Constraint(
+        block.STORAGES, typical_periods, rule=_soc_intra_zero_rule
+    )
+
+    def _soc_intra_zero_max_rule(block, n, k):
+        return block.soc_intra_max[n, k] >= 0
+
+    block.soc_intra_zero_max = Constraint(
+        block.STORAGES, typical_periods, rule=_soc_intra_zero_max_rule
+    )
+
+    # inter-period state of charge at the beginning of each original period
+    block.soc_inter = Var(block.STORAGES, period_bounds, within=Reals)
+
+    def _soc_inter_balance_rule(block, n, p):
+        last_timestep = (period_order[p] + 1) * period_length - 1
+        return block.soc_inter[n, p + 1] == (
+            block.soc_inter[n, p] + block.soc[n, last_timestep]
+        )
+
+    block.soc_inter_balance = Constraint(
+        block.STORAGES, periods, rule=_soc_inter_balance_rule
+    )
+
+    def _soc_inter_max_rule(block, n, p):
+        return (
+            block.soc_inter[n, p] + block.soc_intra_max[n, period_order[p]] <= n.SOC_MAX
+        )
+
+    block.soc_inter_max = Constraint(block.STORAGES, periods, rule=_soc_inter_max_rule)
+
+    def _soc_inter_min_rule(block, n, p):
+        return (
+            block.soc_inter[n, p] + block.soc_intra_min[n, period_order[p]] >= n.SOC_MIN
+        )
+
+    block.soc_inter_min = Constraint(block.STORAGES, periods, rule=_soc_inter_min_rule)
+
+    def _soc_inter_ini_rule(block, n):
+        return block.soc_inter[n, 0] == block.SOC_INI[n]
+
+    block.soc_inter_ini = Constraint(block.STORAGES, rule=_soc_inter_ini_rule)
+
+    # rule for end state of charge (same as initial state of charge)
+    def _soc_inter_end_rule(block, n):
+        return block.soc_inter[n, len(period_order)] >= block.SOC_INI[n]
+
+    block.soc_inter_end = Constraint(block.STORAGES, rule=_soc_inter_end_rule)
+
+
+def weight_objective(model, period_length, period_order):
+    """
+    Replaces the objective of a model of typical periods by the variable costs
+    weighted with the number of original periods each typical period
+    represents.
+
+    Parameters
+    ----------
+    model : solph.Model
+        model of the concatenated typical periods, is changed in place
+    period_length : int
+        number of timesteps of a period
+    period_order : list
+        index of the typical period of each original period
+
+    Returns
+    -------
+    -
+
+    """
+
+    occurrences = np.bincount(period_order)
+
+    expr = 0
+    for (source, target), flow in model.flows.items():
+        if flow.variable_costs[0] is None:
+            continue
+        for t in model.TIMESTEPS:
+            expr += (
+                occurrences[t // period_length]
+                * flow.variable_costs[t]
+                * model.objective_weighting[t]
+                * model.flow[source, target, t]
+            )
+
+    model.del_component(model.objective)
+    model.objective = Objective(sense=minimize, expr=expr)
+
+
+def expand_typical_results(
+    model,
+    typical_dir,
+    timeindex,
+    period_length,
+    period_order,
+    export_root,
+    i_scenario,
+    result_format="csv",
+    model_type=None,
+):
+    """
+    Combines the result files of the typical periods into results of the whole
+    horizon, which are written in the given format (see
+    result_store.export_results). Every original period takes the results of
+    its typical period, the state of charge is the absolute one: the
+    inter-period state of charge at the beginning of the original period plus
+    the intra-period state of charge of its typical period (see
+    add_inter_period_soc).
+
+    Parameters
+    ----------
+    model : solph.Model
+        solved model of the concatenated typical periods
+    typical_dir : String
+        result directory of the typical periods, written as csv files by
+        process_solver_results
+    timeindex : pd.DatetimeIndex
+        timesteps of the whole horizon incl. the last interval
+    period_length : int
+        number of timesteps of a period
+    period_order : list
+        index of the typical period of each original period
+    export_root : String
+        path to folder, where results are to be saved
+    i_scenario : String
+        name of the scenario
+    result_format : String
+        one of result_store.RESULT_FORMATS
+    model_type : String
+        model type of the scenario, the partition of the result store
+
+    Returns
+    -------
+    result_storage : pd.DataFrame
+        storage results of the whole horizon
+
+    """
+
+    block = model.StorageBlock
+    n = model.es.groups["storage"]
+
+    # the exported state of charge is clipped at zero, the intra-period state
+    # of charge is read from the model, as it may be negative
+    soc_intra = np.array([block.soc[n, t].value for t in model.TIMESTEPS])
+    soc = np.concatenate(
+        [
+            block.soc_inter[n, p].value
+            + soc_intra[k * period_length : (k + 1) * period_length]
+            for p, k in enumerate(period_order)
+        ]
+    )
+    soc[soc < ZERO_TOLERANCE] = 0
+
+    expanded_results = {}
+    for result_file in RESULT_FILES:
+        result = pd.read_csv(
+            os.path.join(typical_dir, result_file + ".csv"), index_col=0, sep=";"
+        )
+        # additional last row of the results (last interval)
+        pieces = [
+            result.iloc[k * period_length : (k + 1) * period_length]
+            for k in period_order
+        ] + [result.iloc[[-1]]]
+        expanded_results[result_file] = pd.concat(pieces)
+        expanded_results[result_file].index = timeindex
+
+    expanded_results["storage"]["soc"] = np.append(soc, np.nan)
+
+    export_results(export_root, i_scenario, expanded_results, result_format, model_type)
+
+    return expanded_results["storage"]
+
+
+def solve_aggregated(
+    model_type,
+    scenario_options,
+    scenario_status,
+    i_scenario,
+    export_root,
+    solver_name,
+    period_length,
+    number_of_periods,
+    compare_full_resolution=True,
+):
+    """
+    Solves a scenario using typical periods instead of the full horizon (see
+    cluster_periods and add_inter_period_soc). If compare_full_resolution is
+    True, the scenario is also solved at full resolution and the deviation of
+    the objective is written to the scenario status.
+
+    Parameters
+    ----------
+    model_type : String
+        model type, one of AGGREGATION_MODEL_TYPES
+    scenario_options : pd.DataFrame
+        scenario description, has to contain the row i_scenario
+    scenario_status : pd.DataFrame
+        scenario status, has to contain the row i_scenario
+    i_scenario : String
+        name of the scenario
+    export_root : String
+        path to folder, where results are to be saved, the results of the
+        typical periods are expanded to the whole horizon (see
+        expand_typical_results), the typical period of every original period
+        and its inter-period state of charge are saved to period_order.csv in
+        the directory of the scenario
+    solver_name : String
+        name of the solver, e.g. cplex, gurobi, cbc, glpk, ...
+    period_length : int
+        number of timesteps of a period, e.g. 24 for days at hourly resolution
+    number_of_periods : int
+        number of typical periods
+    compare_full_resolution : bool
+        specifies if the full resolution model is solved for comparison
+
+    Returns
+    -------
+    scenario_status : pd.DataFrame
+        scenario status containing only the row of the solved scenario
+
+    """
+
+    if model_type not in AGGREGATION_MODEL_TYPES:
+        raise ValueError(
+            "Model type '{0}' cannot be aggregated. Choose one of: {1}".format(
+                model_type, ", ".join(AGGREGATION_MODEL_TYPES)
+            )
+        )
+
+    module = load_model_module(model_type)
+
+    # work on copies, so that a worker only returns the row of its scenario
+    scenario_options = scenario_options.loc[[i_scenario]].copy()
+    scenario_status = scenario_status.loc[[i_scenario]].copy()
+
+    timeseries_length = int(scenario_options.at[i_scenario, "timeseries_length"])
+
+    # timeseries of the whole horizon
+    demand, ee_generation = module.read_timeseries(
+        scenario_options,
+        i_scenario,
+        scenario_options.at[i_scenario, "sf_dem_[-]"],
+        scenario_options.at[i_scenario, "sf_res_[-]"],
+    )
+    demand = demand.iloc[:timeseries_length]
+    ee_generation = ee_generation.iloc[:timeseries_length]
+
+    typical_periods, period_order = cluster_periods(
+        demand, ee_generation, period_length, number_of_periods
+    )
+
+    # model of the concatenated typical periods
+    aggregated_options = scenario_options.copy()
+    aggregated_options.at[i_scenario, "timeseries_length"] = (
+        len(typical_periods) * period_length
+    )
+    model = module.set_up_energy_system_model(aggregated_options, i_scenario)
+    set_fixed_flows(
+        model,
+        typical_timeseries(demand, typical_periods, period_length),
+        typical_timeseries(ee_generation, typical_periods, period_length),
+    )
+    set_initial_state_of_charge(model, scenario_options.at[i_scenario, "SOC_INI_[-]"])
+    add_inter_period_soc(model, period_length, period_order)
+    weight_objective(model, period_length, period_order)
+
+    solver_results = model.solve(
+        solver=solver_name,
+        solve_kwargs={"tee": False},
+        cmdline_options=get_solver_options(scenario_options, i_scenario),
+    )
+
+    result_extraction = scenario_result_extraction(scenario_options, i_scenario)
+
+    # timesteps of the whole horizon incl. the last interval
+    timeindex = pd.date_range(
+        scenario_options.at[i_scenario, "start_date"],
+        periods=len(period_order) * period_length + 1,
+        freq=scenario_options.at[i_scenario, "frequency"],
+    )
+
+    # the results of the typical periods are processed like a window of a
+    # rolling horizon and exported for the whole horizon
+    with tempfile.TemporaryDirectory() as typical_root:
+        if model_type in MODEL_TYPES_WITH_SCENARIO_OPTIONS:
+            module.process_solver_results(
+                solver_results,
+                model,
+                scenario_status,
+                i_scenario,
+                typical_root,
+                scenario_options,
+                result_extraction=result_extraction,
+            )
+        else:
+            module.process_solver_results(
+                solver_results,
+                model,
+                scenario_status,
+                i_scenario,
+                typical_root,
+                result_extraction=result_extraction,
+            )
+
+        if scenario_status.at[i_scenario, "solved"] == 1:
+            expand_typical_results(
+                model,
+                os.path.join(typical_root, i_scenario),
+                timeindex,
+                period_length,
+                period_order,
+                export_root,
+                i_scenario,
+                scenario_result_format(scenario_options, i_scenario),
+                model_type,
+            )
+
+    scenario_status.at[i_scenario, "typical_periods"] = len(typical_periods)
+    scenario_status.at[i_scenario, "timesteps_aggregated"] = len(model.TIMESTEPS)
+    scenario_status.at[i_scenario, "timesteps_full"] = timeseries_length
+
+    # export the typical period of every original period
+    export_dir = os.path.realpath(os.path.join(export_root, i_scenario))
+    if not os.path.exists(export_dir):
+        os.makedirs(export_dir)
+    storage = model.es.groups["storage"]
+    pd.DataFrame(
+        {
+            "typical_period": period_order,
+            "represented_by": [typical_periods[k] for k in period_order],
+            "soc_inter": [
+                model.StorageBlock.soc_inter[storage, p].value
+                for p in range(len(period_order))
+            ],
+        }
+    ).to_csv(
+        os.path.join(export_dir, "period_order.csv"), index_label="period", sep=";"
+    )
+
+    if compare_full_resolution:
+        full_model = module.set_up_energy_system_model(scenario_options, i_scenario)
+        full_model.solve(
+            solver=solver_name,
+            solve_kwargs={"tee": False},
+            cmdline_options=get_solver_options(scenario_options, i_scenario),
+        )
+        objective_full = full_model.objective()
+        scenario_status.at[i_scenario, "objective_full"] = objective_full
+        scenario_status.at[i_scenario, "objective_error_[%]"] = (
+            100
+            * (scenario_status.at[i_scenario, "objective"] - objective_full)
+            / objective_full
+        )
+
+    return scenario_status
+
+
+def run_aggregated(
+    scenario_file,
+    model_type,
+    export_root,
+    period_length,
+    number_of_periods,
+    solver_name="cplex",
+    number_of_workers=None,
+    compare_full_resolution=True,
+):
+    """
+    Solves all active scenarios of a scenario file using typical periods (see
+    solve_aggregated). The scenarios are solved concurrently in worker
+    processes.
+
+    Parameters
+    ----------
+    scenario_file : String
+        path to csv-file containing the scenario description, ";" should be used
+        as separator
+    model_type : String
+        model type, one of AGGREGATION_MODEL_TYPES
+    export_root : String
+        path to folder, where results are to be saved
+    period_length : int
+        number of timesteps of a period, e.g. 24 for days at hourly resolution
+    number_of_periods : int
+        number of typical periods
+    solver_name : String
+        name of the solver, e.g. cplex, gurobi, cbc, glpk, ...
+    number_of_workers : int, optional
+        number of worker processes, defaults to the number of cpus
+    compare_full_resolution : bool
+        specifies if the full resolution models are solved for comparison
+
+    Returns
+    -------
+    scenario_status : pd.DataFrame
+        scenario status of all scenarios
+
+    """
+
+    module = load_model_module(model_type)
+
+    # create export directory if necessary
+    if not os.path.exists(export_root):
+        os.makedirs(export_root)
+
+    # read scenarios that are to be calculated
+    scenario_options, scenario_status = module.read_scenario_file(scenario_file)
+
+    # skip inactive scenarios
+    active_scenarios = [
+        i_scenario
+        for i_scenario in scenario_options.index
+        if scenario_options.at[i_scenario, "active"]
+    ]
+
+    if number_of_workers is None:
+        number_of_workers = os.cpu_count()
+
+    with ProcessPoolExecutor(
+        max_workers=max(1, min(number_of_workers, len(active_scenarios)))
+    ) as executor:
+        futures = {
+            executor.submit(
+                solve_aggregated,
+                model_type,
+                scenario_options,
+                scenario_status,
+                i_scenario,
+                export_root,
+                solver_name,
+                period_length,
+                number_of_periods,
+                compare_full_resolution,
+            ): i_scenario
+            for i_scenario in active_scenarios
+        }
+
+        for future in as_completed(futures):
+            try:
+                merge_scenario_status(scenario_status, future.result())
+            except Exception as error:
+                # a failing scenario must not stop the remaining scenarios
+                log_msg = "[{0:s}]\tScenario: '{1:s}' failed: {2}\n".format(
+                    datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    futures[future],
+                    error,
+                )
+                print(log_msg, end="")
+
+    module.export_scenario_description(export_root, scenario_status)
+
+    return scenario_status
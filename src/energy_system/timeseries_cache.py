@@ -0,0 +1,115 @@
+import os
+import datetime
+
+import pandas as pd
+
+# date formats used in the timeseries data files, the first format matching
+# the first timestamp of a file is used to parse all timestamps of the file
+DATE_FORMATS = ["%d.%m.%Y %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M"]
+
+# parsed timeseries data files, the key is the tuple (path, modification time)
+_timeseries_cache = {}
+
+
+def find_date_format(timestamp):
+    """
+    Returns the first format of DATE_FORMATS matching the given timestamp.
+
+    Parameters
+    ----------
+    timestamp : String
+        timestamp as written in the timeseries data file
+
+    Returns
+    -------
+    date_format : String
+        format of the timestamp
+
+    """
+
+    for date_format in DATE_FORMATS:
+        try:
+            datetime.datetime.strptime(timestamp, date_format)
+        except ValueError:
+            continue
+        return date_format
+
+    raise ValueError(
+        "The timestamp '{0}' does not match any of the date formats: {1}".format(
+            timestamp, ", ".join(DATE_FORMATS)
+        )
+    )
+
+
+def read_timeseries_data(data_path):
+    """
+    Reads a timeseries data file. Each file is parsed only once per process,
+    following calls return the cached data as long as the modification time of
+    the file does not change. The returned data is shared between all callers
+    and must not be changed.
+
+    Parameters
+    ----------
+    data_path : String
+        path to csv-file containing the timeseries data, ";" has to be used as
+        separator and the first column has to contain the timestamps
+
+    Returns
+    -------
+    timeseries_data : pd.DataFrame
+        timeseries data with a DatetimeIndex
+
+    """
+
+    data_path = os.path.realpath(data_path)
+    cache_key = (data_path, os.path.getmtime(data_path))
+
+    if cache_key not in _timeseries_cache:
+        # remove outdated versions of the same file from the cache
+        for key in [key for key in _timeseries_cache if key[0] == data_path]:
+            del _timeseries_cache[key]
+
+        timeseries_data = pd.read_csv(data_path, index_col=0, sep=";")
+
+        # parse timestamps using an explicit date format instead of inferring it
+        date_format = find_date_format(str(timeseries_data.index[0]))
+        timeseries_data.index = pd.to_datetime(
+            timeseries_data.index, format=date_format
+        )
+
+        _timeseries_cache[cache_key] = timeseries_data
+
+    return _timeseries_cache[cache_key]
+
+
+def read_scaled_timeseries(data_path, label, scaling_factor):
+    """
+    Returns a column of a timeseries data file multiplied by a scaling factor.
+    The data file is read using read_timeseries_data, therefore only the scaled
+    Series is newly created, the cached data is neither copied nor changed.
+
+    Parameters
+    ----------
+    data_path : String
+        path to csv-file containing the timeseries data
+    label : String
+        name of the column, e.g. "demand_[MW]"
+    scaling_factor : scalar
+        factor the column is multiplied with, e.g. sf_dem
+
+    Returns
+    -------
+    timeseries : pd.Series
+        scaled timeseries
+
+    """
+
+    return scaling_factor * read_timeseries_data(data_path).loc[:, label]
+
+
+def clear_timeseries_cache():
+    """
+    Removes all parsed timeseries data files from the cache.
+    """
+
+    _timeseries_cache.clear()
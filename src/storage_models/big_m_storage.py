@@ -1,8 +1,13 @@
+import time
+
 from oemof.solph.components import Transformer
 
 from pyomo.core.base.block import ScalarBlock
 from pyomo.environ import BuildAction
-from pyomo.environ import Constraint, Binary, NonNegativeReals, Var, Set
+from pyomo.environ import Constraint, Binary, NonNegativeReals, Var, Set, Param
+
+from disjunctive_builder import add_disjunctive_relation, common_formulation
+from envelope_builder import add_envelope_relation, group_is_lp_exact, is_lp_exact
 
 
 # ---------------------------------------------------------------------
@@ -36,6 +41,8 @@ class Storage(Transformer):
         p_in_stor_breakpoints,
         p_out_stor_breakpoints,
         p_out_breakpoints,
+        formulation="big_m",
+        lp_envelope=True,
         *args,
         **kwargs
     ):
@@ -59,7 +66,7 @@ class Storage(Transformer):
         self.SOC_MAX = SOC_MAX
 
         # add initial state of charge
-        self.SOC_INI = SOC_INI * SOC_MAX
+        self.set_initial_state_of_charge(SOC_INI)
 
         # add breakpoints for linearization of storage efficiency
         self.p_in_breakpoints = [i * P_MAX_IN for i in p_in_breakpoints]
@@ -68,6 +75,20 @@ class Storage(Transformer):
         self.p_out_stor_breakpoints = [i * P_MAX_OUT for i in p_out_stor_breakpoints]
         self.p_out_breakpoints = [i * P_MAX_OUT for i in p_out_breakpoints]
 
+        # formulation of the piecewise linear efficiency curves, see
+        # disjunctive_builder.DISJUNCTIVE_FORMULATIONS
+        self.formulation = formulation
+
+        # relations, which can be written as linear inequalities without
+        # binary segment variables, unless disabled by lp_envelope (see
+        # envelope_builder)
+        self.lp_exact = {
+            "pwlf_p_in": lp_envelope
+            and is_lp_exact(self.p_in_breakpoints, self.p_in_stor_breakpoints, "max"),
+            "pwlf_p_out": lp_envelope
+            and is_lp_exact(self.p_out_stor_breakpoints, self.p_out_breakpoints, "max"),
+        }
+
         # ---------------------------------------------------------------------
         # calculation of parameters a (slope) and b (intercept) for each segment
         # of the piecewise linearization of the storage efficiency
@@ -234,6 +255,12 @@ class Storage(Transformer):
         # map specific output flow to standard API
         self.outputs.update(self.el_outputs)
 
+    def set_initial_state_of_charge(self, SOC_INI):
+        """
+        Sets the initial state of charge (relative to SOC_MAX)
+        """
+        self.SOC_INI = SOC_INI * self.SOC_MAX
+
     def constraint_group(self):
         """
         Returns Block containing constraints for this class
@@ -256,12 +283,21 @@ class StorageBlock(ScalarBlock):
         if group is None:
             return None
 
+        # wall time of creating the block, see energy_system.phase_timing
+        start_time = time.perf_counter()
+
         # reference to energy system
         m = self.parent_block()
 
         # set containing all instances of class LinearStorage
         self.STORAGES = Set(initialize=[n for n in group])
 
+        # initial state of charge, mutable so that it can be changed without
+        # rebuilding the model
+        self.SOC_INI = Param(
+            self.STORAGES, initialize={n: n.SOC_INI for n in group}, mutable=True
+        )
+
         # set all parameters necessary for implementation of piecwise
         # linear function of efficiency curves using P_in/P_out and
         # P_in_stor/P_out_stor
@@ -439,7 +475,7 @@ class StorageBlock(ScalarBlock):
             else:
                 lhs = block.soc[n, t]
                 rhs = (
-                    n.SOC_INI
+                    block.SOC_INI[n]
                     + block.P_in_stor[n, t] * m.timeincrement[t]
                     - block.P_out_stor[n, t] * m.timeincrement[t]
                 )
@@ -449,142 +485,194 @@ class StorageBlock(ScalarBlock):
             self.STORAGES, m.TIMESTEPS, rule=_SOC_balance_rule
         )
 
+        # formulation of the piecewise linear relations, the big-M
+        # inequalities below or a locally ideal formulation of
+        # disjunctive_builder
+        formulation = common_formulation(group)
+
+        if formulation == "big_m":
+            # initialize pyomo set with all segments of the efficiency curves,
+            # like the other formulations
+            S = [i for i in range(min(len(n.AS) for n in group))]
+            self.s = Set(initialize=S)
+
         # ---------------------------------------------------------------
-        # rule for relation between P_in and P_in_stor
-        # for each segment four equations are needed:
+        # rule for relation between P_in and P_in_stor, as linear
+        # inequalities if the curve allows for it, otherwise for each
+        # segment of the big-M formulation four equations are needed:
         # 0: y>=, 1: y<=, 2: x>=, 3: x<=
         # ---------------------------------------------------------------
-
-        # initialize pyomo set with number of segments
-        S = [i for i in range(len(self.as_in) - 1)]
-        self.s = Set(initialize=S)
-
-        # initialize binary variable for each segment
-        self.delta = Var(self.STORAGES, self.s, m.TIMESTEPS, within=Binary)
-
-        # equation 0: y >=
-        def rule_0(block, n, s, t):
-            lhs = self.P_in_stor[n, t]
-            rhs = (
-                self.as_in[n, s] * self.P_in[n, t]
-                + self.bs_in[n, s]
-                - self.big_m_in[n, (0, s)] * (1 - self.delta[n, s, t])
+        if group_is_lp_exact(group, "pwlf_p_in"):
+            add_envelope_relation(
+                self,
+                "pwlf_p_in",
+                self.P_in_stor,
+                self.P_in,
+                {n: n.p_in_breakpoints for n in group},
+                {n: n.p_in_stor_breakpoints for n in group},
+                m.TIMESTEPS,
+                "max",
             )
-            return lhs >= rhs
+        elif formulation == "big_m":
+            # initialize binary variable for each segment
+            self.delta = Var(self.STORAGES, self.s, m.TIMESTEPS, within=Binary)
 
-        self.constr_0 = Constraint(self.STORAGES, self.s, m.TIMESTEPS, rule=rule_0)
-
-        # equation 1: y <=
-        def rule_1(block, n, s, t):
-            lhs = self.P_in_stor[n, t]
-            rhs = (
-                self.as_in[n, s] * self.P_in[n, t]
-                + self.bs_in[n, s]
-                + self.big_m_in[n, (1, s)] * (1 - self.delta[n, s, t])
-            )
-            return lhs <= rhs
+            # equation 0: y >=
+            def rule_0(block, n, s, t):
+                lhs = self.P_in_stor[n, t]
+                rhs = (
+                    self.as_in[n, s] * self.P_in[n, t]
+                    + self.bs_in[n, s]
+                    - self.big_m_in[n, (0, s)] * (1 - self.delta[n, s, t])
+                )
+                return lhs >= rhs
 
-        self.constr_1 = Constraint(self.STORAGES, self.s, m.TIMESTEPS, rule=rule_1)
+            self.constr_0 = Constraint(self.STORAGES, self.s, m.TIMESTEPS, rule=rule_0)
 
-        # equation 2: x >=
-        def rule_2(block, n, s, t):
-            lhs = self.P_in[n, t]
-            rhs = self.x_in_data[n, s] - self.big_m_in[n, (2, s)] * (
-                1 - self.delta[n, s, t]
-            )
-            return lhs >= rhs
+            # equation 1: y <=
+            def rule_1(block, n, s, t):
+                lhs = self.P_in_stor[n, t]
+                rhs = (
+                    self.as_in[n, s] * self.P_in[n, t]
+                    + self.bs_in[n, s]
+                    + self.big_m_in[n, (1, s)] * (1 - self.delta[n, s, t])
+                )
+                return lhs <= rhs
 
-        self.constr_2 = Constraint(self.STORAGES, self.s, m.TIMESTEPS, rule=rule_2)
+            self.constr_1 = Constraint(self.STORAGES, self.s, m.TIMESTEPS, rule=rule_1)
 
-        # equation 3: x <=
-        def rule_3(block, n, s, t):
-            lhs = self.P_in[n, t]
-            rhs = self.x_in_data[n, s + 1] + self.big_m_in[n, (3, s)] * (
-                1 - self.delta[n, s, t]
-            )
-            return lhs <= rhs
+            # equation 2: x >=
+            def rule_2(block, n, s, t):
+                lhs = self.P_in[n, t]
+                rhs = self.x_in_data[n, s] - self.big_m_in[n, (2, s)] * (
+                    1 - self.delta[n, s, t]
+                )
+                return lhs >= rhs
 
-        self.constr_3 = Constraint(self.STORAGES, self.s, m.TIMESTEPS, rule=rule_3)
+            self.constr_2 = Constraint(self.STORAGES, self.s, m.TIMESTEPS, rule=rule_2)
 
-        # equation for binary variables: only ever one binary variable can be different from zero
-        def bin_sum_rule(block, n, t):
-            lhs = sum(self.delta[n, s, t] for s in self.s)
-            rhs = 1
-            return lhs == rhs
-
-        self.constr_delta = Constraint(self.STORAGES, m.TIMESTEPS, rule=bin_sum_rule)
+            # equation 3: x <=
+            def rule_3(block, n, s, t):
+                lhs = self.P_in[n, t]
+                rhs = self.x_in_data[n, s + 1] + self.big_m_in[n, (3, s)] * (
+                    1 - self.delta[n, s, t]
+                )
+                return lhs <= rhs
+
+            self.constr_3 = Constraint(self.STORAGES, self.s, m.TIMESTEPS, rule=rule_3)
+
+            # equation for binary variables: only ever one binary variable can be different from zero
+            def bin_sum_rule(block, n, t):
+                lhs = sum(self.delta[n, s, t] for s in self.s)
+                rhs = 1
+                return lhs == rhs
+
+            self.constr_delta = Constraint(self.STORAGES, m.TIMESTEPS, rule=bin_sum_rule)
+        else:
+            add_disjunctive_relation(
+                self,
+                "pwlf_p_in",
+                self.P_in_stor,
+                self.P_in,
+                {n: n.p_in_breakpoints for n in group},
+                {n: n.p_in_stor_breakpoints for n in group},
+                m.TIMESTEPS,
+                formulation,
+            )
 
-        
         # ---------------------------------------------------------------
-        # rule for relation between P-out and P_out_stor
-        # for each segment four equations are needed:
+        # rule for relation between P_out and P_out_stor, as linear
+        # inequalities if the curve allows for it, otherwise for each
+        # segment of the big-M formulation four equations are needed:
         # 0: y>=, 1: y<=, 2: x>=, 3: x<=
         # ---------------------------------------------------------------
+        if group_is_lp_exact(group, "pwlf_p_out"):
+            add_envelope_relation(
+                self,
+                "pwlf_p_out",
+                self.P_out,
+                self.P_out_stor,
+                {n: n.p_out_stor_breakpoints for n in group},
+                {n: n.p_out_breakpoints for n in group},
+                m.TIMESTEPS,
+                "max",
+            )
+        elif formulation == "big_m":
+            # initialize binary variable for each segment
+            self.delta_out = Var(self.STORAGES, self.s, m.TIMESTEPS, within=Binary)
 
-        # initialize binary variable for each segment
-        self.delta_out = Var(self.STORAGES, self.s, m.TIMESTEPS, within=Binary)
+            # equation 0: y >=
+            def rule_0_out(block, n, s, t):
+                lhs = self.P_out[n, t]
+                rhs = (
+                    self.as_out[n, s] * self.P_out_stor[n, t]
+                    + self.bs_out[n, s]
+                    - self.big_m_out[n, (0, s)] * (1 - self.delta_out[n, s, t])
+                )
+                return lhs >= rhs
 
-        # equation 0: y >=
-        def rule_0_out(block, n, s, t):
-            lhs = self.P_out[n, t]
-            rhs = (
-                self.as_out[n, s] * self.P_out_stor[n, t]
-                + self.bs_out[n, s]
-                - self.big_m_out[n, (0, s)] * (1 - self.delta_out[n, s, t])
+            self.constr_0_out = Constraint(
+                self.STORAGES, self.s, m.TIMESTEPS, rule=rule_0_out
             )
-            return lhs >= rhs
 
-        self.constr_0_out = Constraint(
-            self.STORAGES, self.s, m.TIMESTEPS, rule=rule_0_out
-        )
+            # equation 1: y <=
+            def rule_1_out(block, n, s, t):
+                lhs = self.P_out[n, t]
+                rhs = (
+                    self.as_out[n, s] * self.P_out_stor[n, t]
+                    + self.bs_out[n, s]
+                    + self.big_m_out[n, (1, s)] * (1 - self.delta_out[n, s, t])
+                )
+                return lhs <= rhs
 
-        # equation 1: y <=
-        def rule_1_out(block, n, s, t):
-            lhs = self.P_out[n, t]
-            rhs = (
-                self.as_out[n, s] * self.P_out_stor[n, t]
-                + self.bs_out[n, s]
-                + self.big_m_out[n, (1, s)] * (1 - self.delta_out[n, s, t])
+            self.constr_1_out = Constraint(
+                self.STORAGES, self.s, m.TIMESTEPS, rule=rule_1_out
             )
-            return lhs <= rhs
 
-        self.constr_1_out = Constraint(
-            self.STORAGES, self.s, m.TIMESTEPS, rule=rule_1_out
-        )
+            # equation 2: x >=
+            def rule_2_out(block, n, s, t):
+                lhs = self.P_out_stor[n, t]
+                rhs = self.x_out_data[n, s] - self.big_m_out[n, (2, s)] * (
+                    1 - self.delta_out[n, s, t]
+                )
+                return lhs >= rhs
 
-        # equation 2: x >=
-        def rule_2_out(block, n, s, t):
-            lhs = self.P_out_stor[n, t]
-            rhs = self.x_out_data[n, s] - self.big_m_out[n, (2, s)] * (
-                1 - self.delta_out[n, s, t]
+            self.constr_2_out = Constraint(
+                self.STORAGES, self.s, m.TIMESTEPS, rule=rule_2_out
             )
-            return lhs >= rhs
 
-        self.constr_2_out = Constraint(
-            self.STORAGES, self.s, m.TIMESTEPS, rule=rule_2_out
-        )
+            # equation 3: x <=
+            def rule_3_out(block, n, s, t):
+                lhs = self.P_out_stor[n, t]
+                rhs = self.x_out_data[n, s + 1] + self.big_m_out[n, (3, s)] * (
+                    1 - self.delta_out[n, s, t]
+                )
+                return lhs <= rhs
 
-        # equation 3: x <=
-        def rule_3_out(block, n, s, t):
-            lhs = self.P_out_stor[n, t]
-            rhs = self.x_out_data[n, s + 1] + self.big_m_out[n, (3, s)] * (
-                1 - self.delta_out[n, s, t]
+            self.constr_3_out = Constraint(
+                self.STORAGES, self.s, m.TIMESTEPS, rule=rule_3_out
             )
-            return lhs <= rhs
 
-        self.constr_3_out = Constraint(
-            self.STORAGES, self.s, m.TIMESTEPS, rule=rule_3_out
-        )
+            # equation for binary variables: only ever one binary variable can be different from zero
+            def bin_sum_rule_out(block, n, t):
+                lhs = sum(self.delta_out[n, s, t] for s in self.s)
+                rhs = 1
+                return lhs == rhs
 
-        # equation for binary variables: only ever one binary variable can be different from zero
-        def bin_sum_rule_out(block, n, t):
-            lhs = sum(self.delta_out[n, s, t] for s in self.s)
-            rhs = 1
-            return lhs == rhs
-
-        self.constr_delta_out = Constraint(
-            self.STORAGES, m.TIMESTEPS, rule=bin_sum_rule_out
-        )
+            self.constr_delta_out = Constraint(
+                self.STORAGES, m.TIMESTEPS, rule=bin_sum_rule_out
+            )
+        else:
+            add_disjunctive_relation(
+                self,
+                "pwlf_p_out",
+                self.P_out,
+                self.P_out_stor,
+                {n: n.p_out_stor_breakpoints for n in group},
+                {n: n.p_out_breakpoints for n in group},
+                m.TIMESTEPS,
+                formulation,
+            )
 
         # -----------------------------------------------------------------------------
 
@@ -607,7 +695,9 @@ class StorageBlock(ScalarBlock):
         # # rule for end state of charge
         def _soc_end_rule(block, n):
             lhs = block.soc[n, m.TIMESTEPS.last()]
-            rhs = n.SOC_INI
+            rhs = block.SOC_INI[n]
             return lhs >= rhs
 
         self.soc_end = Constraint(self.STORAGES, rule=_soc_end_rule)
+
+        self.create_time = time.perf_counter() - start_time
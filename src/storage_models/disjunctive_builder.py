@@ -0,0 +1,273 @@
+from pyomo.environ import Binary, Constraint, NonNegativeReals, Set, Var
+
+# formulations of the piecewise linear relations of the big-M storage model,
+# big_m is built by the StorageBlock itself, all others by
+# add_disjunctive_relation
+DISJUNCTIVE_FORMULATIONS = ["big_m", "incremental", "multiple_choice", "convex_hull"]
+
+
+def common_formulation(group):
+    """
+    Returns the formulation of the piecewise linear relations shared by all
+    storages of a StorageBlock.
+
+    Parameters
+    ----------
+    group : list
+        storages of the StorageBlock, each having the attribute formulation
+
+    Returns
+    -------
+    formulation : String
+        one of DISJUNCTIVE_FORMULATIONS
+
+    """
+
+    formulations = {n.formulation for n in group}
+    if len(formulations) > 1:
+        raise ValueError(
+            "All storages of a StorageBlock have to use the same formulation, "
+            "got: {0}".format(", ".join(sorted(formulations)))
+        )
+
+    formulation = formulations.pop()
+    if formulation not in DISJUNCTIVE_FORMULATIONS:
+        raise ValueError(
+            "Unknown formulation '{0}'. Choose one of: {1}".format(
+                formulation, ", ".join(DISJUNCTIVE_FORMULATIONS)
+            )
+        )
+
+    return formulation
+
+
+def add_disjunctive_relation(
+    block, name, y, x, x_breakpoints, y_breakpoints, timesteps, formulation
+):
+    """
+    Adds a piecewise linear relation y = f(x) for every storage and timestep
+    of a StorageBlock, selecting the active segment by binary variables. In
+    contrast to the big-M inequalities, the formulations are locally ideal,
+    i.e. the vertices of their LP relaxation have integral segment variables:
+
+    - incremental: the segments are filled one after another, <name>_fill is
+      the filled share of each segment, <name>_z[n, s, t] = 1 if segment s is
+      completely filled
+    - multiple_choice: <name>_z selects one segment, <name>_x_segment is the
+      share of x in each segment
+    - convex_hull: <name>_z selects one segment, x and y are convex
+      combinations of its two breakpoints weighted by <name>_weights
+
+    The breakpoints and variables of each relation are kept in
+    block.disjunctive_relations, e.g. to derive start values of the segment
+    variables (see energy_system.mip_start).
+
+    Parameters
+    ----------
+    block : StorageBlock
+        block the components are added to, block.STORAGES has to be defined
+    name : String
+        prefix of the names of the components, e.g. "pwlf_p_in"
+    y : pyomo.core.Var
+        variable indexed by storage and timestep, function value of x
+    x : pyomo.core.Var
+        variable indexed by storage and timestep, argument of the function
+    x_breakpoints : dict
+        ascending arguments of the breakpoints of each storage
+    y_breakpoints : dict
+        function values at the breakpoints of each storage
+    timesteps : pyomo.core.Set
+        timesteps of the model
+    formulation : String
+        one of DISJUNCTIVE_FORMULATIONS except big_m
+
+    Returns
+    -------
+    -
+
+    """
+
+    # segment s lies between the breakpoints s and s + 1
+    segments = Set(
+        dimen=2,
+        ordered=True,
+        initialize=[
+            (n, s) for n in block.STORAGES for s in range(len(x_breakpoints[n]) - 1)
+        ],
+    )
+    block.add_component(name + "_SEGMENTS", segments)
+
+    def _slope(n, s):
+        return (y_breakpoints[n][s + 1] - y_breakpoints[n][s]) / (
+            x_breakpoints[n][s + 1] - x_breakpoints[n][s]
+        )
+
+    def _number_of_segments(n):
+        return len(x_breakpoints[n]) - 1
+
+    variables = {}
+
+    if formulation == "incremental":
+        fill = Var(segments, timesteps, within=NonNegativeReals, bounds=(0, 1))
+        block.add_component(name + "_fill", fill)
+
+        # segments, after which a further segment follows
+        links = Set(
+            dimen=2,
+            ordered=True,
+            initialize=[
+                (n, s) for n in block.STORAGES for s in range(len(x_breakpoints[n]) - 2)
+            ],
+        )
+        block.add_component(name + "_LINKS", links)
+
+        z = Var(links, timesteps, within=Binary)
+        block.add_component(name + "_z", z)
+
+        def _x_rule(block, n, t):
+            rhs = x_breakpoints[n][0] + sum(
+                (x_breakpoints[n][s + 1] - x_breakpoints[n][s]) * fill[n, s, t]
+                for s in range(_number_of_segments(n))
+            )
+            return x[n, t] == rhs
+
+        def _y_rule(block, n, t):
+            rhs = y_breakpoints[n][0] + sum(
+                (y_breakpoints[n][s + 1] - y_breakpoints[n][s]) * fill[n, s, t]
+                for s in range(_number_of_segments(n))
+            )
+            return y[n, t] == rhs
+
+        # a segment is only filled, if the previous one is completely filled
+        def _fill_next_rule(block, n, s, t):
+            return fill[n, s + 1, t] <= z[n, s, t]
+
+        def _fill_previous_rule(block, n, s, t):
+            return z[n, s, t] <= fill[n, s, t]
+
+        block.add_component(
+            name + "_fill_next",
+            Constraint(links, timesteps, rule=_fill_next_rule),
+        )
+        block.add_component(
+            name + "_fill_previous",
+            Constraint(links, timesteps, rule=_fill_previous_rule),
+        )
+
+        variables = {"fill": fill, "z": z}
+
+    elif formulation == "multiple_choice":
+        z = Var(segments, timesteps, within=Binary)
+        block.add_component(name + "_z", z)
+
+        x_segment = Var(segments, timesteps, within=NonNegativeReals)
+        block.add_component(name + "_x_segment", x_segment)
+
+        # x_segment is zero for all segments not selected
+        def _lower_rule(block, n, s, t):
+            return x_segment[n, s, t] >= x_breakpoints[n][s] * z[n, s, t]
+
+        def _upper_rule(block, n, s, t):
+            return x_segment[n, s, t] <= x_breakpoints[n][s + 1] * z[n, s, t]
+
+        block.add_component(
+            name + "_lower", Constraint(segments, timesteps, rule=_lower_rule)
+        )
+        block.add_component(
+            name + "_upper", Constraint(segments, timesteps, rule=_upper_rule)
+        )
+
+        def _x_rule(block, n, t):
+            rhs = sum(x_segment[n, s, t] for s in range(_number_of_segments(n)))
+            return x[n, t] == rhs
+
+        def _y_rule(block, n, t):
+            rhs = sum(
+                _slope(n, s) * x_segment[n, s, t]
+                + (y_breakpoints[n][s] - _slope(n, s) * x_breakpoints[n][s])
+                * z[n, s, t]
+                for s in range(_number_of_segments(n))
+            )
+            return y[n, t] == rhs
+
+        variables = {"z": z, "x_segment": x_segment}
+
+    elif formulation == "convex_hull":
+        z = Var(segments, timesteps, within=Binary)
+        block.add_component(name + "_z", z)
+
+        # weight of the left (2 * s) and right (2 * s + 1) breakpoint of each
+        # segment s, a single index keeps the variable readable by
+        # oemof.solph.views
+        ends = Set(
+            dimen=2,
+            ordered=True,
+            initialize=[(n, 2 * s + e) for n, s in segments for e in (0, 1)],
+        )
+        block.add_component(name + "_ENDS", ends)
+
+        weights = Var(ends, timesteps, within=NonNegativeReals, bounds=(0, 1))
+        block.add_component(name + "_weights", weights)
+
+        # the weights of the selected segment sum up to 1, all others are 0
+        def _convexity_rule(block, n, s, t):
+            return weights[n, 2 * s, t] + weights[n, 2 * s + 1, t] == z[n, s, t]
+
+        block.add_component(
+            name + "_convexity",
+            Constraint(segments, timesteps, rule=_convexity_rule),
+        )
+
+        def _x_rule(block, n, t):
+            rhs = sum(
+                x_breakpoints[n][s] * weights[n, 2 * s, t]
+                + x_breakpoints[n][s + 1] * weights[n, 2 * s + 1, t]
+                for s in range(_number_of_segments(n))
+            )
+            return x[n, t] == rhs
+
+        def _y_rule(block, n, t):
+            rhs = sum(
+                y_breakpoints[n][s] * weights[n, 2 * s, t]
+                + y_breakpoints[n][s + 1] * weights[n, 2 * s + 1, t]
+                for s in range(_number_of_segments(n))
+            )
+            return y[n, t] == rhs
+
+        variables = {"z": z, "weights": weights}
+
+    else:
+        raise ValueError(
+            "Unknown formulation '{0}'. Choose one of: {1}".format(
+                formulation, ", ".join(DISJUNCTIVE_FORMULATIONS[1:])
+            )
+        )
+
+    # exactly one segment is selected
+    if formulation in ["multiple_choice", "convex_hull"]:
+
+        def _choice_rule(block, n, t):
+            return sum(z[n, s, t] for s in range(_number_of_segments(n))) == 1
+
+        block.add_component(
+            name + "_choice",
+            Constraint(block.STORAGES, timesteps, rule=_choice_rule),
+        )
+
+    block.add_component(
+        name + "_x", Constraint(block.STORAGES, timesteps, rule=_x_rule)
+    )
+    block.add_component(
+        name + "_y", Constraint(block.STORAGES, timesteps, rule=_y_rule)
+    )
+
+    if not hasattr(block, "disjunctive_relations"):
+        block.disjunctive_relations = {}
+    block.disjunctive_relations[name] = {
+        "formulation": formulation,
+        "x": x,
+        "y": y,
+        "x_breakpoints": x_breakpoints,
+        "y_breakpoints": y_breakpoints,
+        **variables,
+    }
@@ -0,0 +1,182 @@
+from pyomo.environ import Constraint, Set
+
+# tolerance of the slopes, below which two adjacent segments are regarded as
+# collinear
+SLOPE_TOLERANCE = 1e-9
+
+
+def curve_shape(x_breakpoints, y_breakpoints):
+    """
+    Returns the shape of the piecewise linear function through the
+    breakpoints, derived from the slopes of its segments.
+
+    Parameters
+    ----------
+    x_breakpoints : list
+        ascending arguments of the breakpoints
+    y_breakpoints : list
+        function values at the breakpoints
+
+    Returns
+    -------
+    shape : String
+        "linear", if all segments are collinear, "concave", if the slopes
+        decrease, "convex", if they increase, otherwise None
+
+    """
+
+    slopes = [
+        (y_breakpoints[k + 1] - y_breakpoints[k])
+        / (x_breakpoints[k + 1] - x_breakpoints[k])
+        for k in range(len(x_breakpoints) - 1)
+    ]
+    changes = [slopes[s + 1] - slopes[s] for s in range(len(slopes) - 1)]
+
+    if all(abs(change) <= SLOPE_TOLERANCE for change in changes):
+        return "linear"
+    if all(change <= SLOPE_TOLERANCE for change in changes):
+        return "concave"
+    if all(change >= -SLOPE_TOLERANCE for change in changes):
+        return "convex"
+
+    return None
+
+
+def is_lp_exact(x_breakpoints, y_breakpoints, sense):
+    """
+    Checks, if a piecewise linear relation y = f(x) can be written as linear
+    inequalities without changing the optimal objective. This holds, if the
+    optimisation favours large values of y (e.g. the power stored while
+    charging) and f is concave, or if it favours small values of y (e.g. the
+    storage losses) and f is convex. Linear functions are always LP-exact.
+
+    Parameters
+    ----------
+    x_breakpoints : list
+        ascending arguments of the breakpoints
+    y_breakpoints : list
+        function values at the breakpoints
+    sense : String
+        "max", if large values of y are favoured, "min" otherwise
+
+    Returns
+    -------
+    lp_exact : bool
+        True, if the relation can be built by add_envelope_relation
+
+    """
+
+    shape = curve_shape(x_breakpoints, y_breakpoints)
+
+    return shape == "linear" or shape == {"max": "concave", "min": "convex"}[sense]
+
+
+def group_is_lp_exact(group, name):
+    """
+    Checks, if a piecewise linear relation is LP-exact for all storages of a
+    StorageBlock, as determined in Storage.__init__.
+
+    Parameters
+    ----------
+    group : list
+        storages of the StorageBlock, each having the attribute lp_exact
+    name : String
+        name of the relation, e.g. "pwlf_p_in"
+
+    Returns
+    -------
+    lp_exact : bool
+        True, if the relation can be built by add_envelope_relation
+
+    """
+
+    return all(n.lp_exact[name] for n in group)
+
+
+def add_envelope_relation(
+    block, name, y, x, x_breakpoints, y_breakpoints, timesteps, sense
+):
+    """
+    Adds a piecewise linear relation y = f(x) for every storage and timestep
+    of a StorageBlock as linear inequalities, i.e. without SOS2 weights or
+    binary segment variables: for a concave f and sense "max", y lies below
+    the line of every segment, for a convex f and sense "min" above. Linear
+    functions are added as a single equation. x is limited to the range of
+    the breakpoints. The optimal objective equals the one of the MILP, but
+    if y is not penalised in some timesteps (e.g. while surplus generation
+    is curtailed anyway), y may deviate from f(x) there.
+
+    - <name>_SEGMENTS: set of (storage, segment) pairs
+    - <name>_envelope: y compared to the line of each segment
+    - <name>_x_min, <name>_x_max: range of x
+
+    Parameters
+    ----------
+    block : StorageBlock
+        block the components are added to, block.STORAGES has to be defined
+    name : String
+        prefix of the names of the components, e.g. "pwlf_p_in"
+    y : pyomo.core.Var
+        variable indexed by storage and timestep, function value of x
+    x : pyomo.core.Var
+        variable indexed by storage and timestep, argument of the function
+    x_breakpoints : dict
+        ascending arguments of the breakpoints of each storage
+    y_breakpoints : dict
+        function values at the breakpoints of each storage
+    timesteps : pyomo.core.Set
+        timesteps of the model
+    sense : String
+        "max", if large values of y are favoured, "min" otherwise, see
+        is_lp_exact
+
+    Returns
+    -------
+    -
+
+    """
+
+    # segment s lies between the breakpoints s and s + 1
+    segments = Set(
+        dimen=2,
+        ordered=True,
+        initialize=[
+            (n, s) for n in block.STORAGES for s in range(len(x_breakpoints[n]) - 1)
+        ],
+    )
+    block.add_component(name + "_SEGMENTS", segments)
+
+    shapes = {
+        n: curve_shape(x_breakpoints[n], y_breakpoints[n]) for n in block.STORAGES
+    }
+
+    def _envelope_rule(block, n, s, t):
+        slope = (y_breakpoints[n][s + 1] - y_breakpoints[n][s]) / (
+            x_breakpoints[n][s + 1] - x_breakpoints[n][s]
+        )
+        rhs = y_breakpoints[n][s] + slope * (x[n, t] - x_breakpoints[n][s])
+        if shapes[n] == "linear":
+            # one equation suffices for collinear segments
+            if s > 0:
+                return Constraint.Skip
+            return y[n, t] == rhs
+        if sense == "max":
+            return y[n, t] <= rhs
+        return y[n, t] >= rhs
+
+    block.add_component(
+        name + "_envelope", Constraint(segments, timesteps, rule=_envelope_rule)
+    )
+
+    def _x_min_rule(block, n, t):
+        return x[n, t] >= x_breakpoints[n][0]
+
+    def _x_max_rule(block, n, t):
+        return x[n, t] <= x_breakpoints[n][-1]
+
+    block.add_component(
+        name + "_x_min", Constraint(block.STORAGES, timesteps, rule=_x_min_rule)
+    )
+    block.add_component(
+        name + "_x_max", Constraint(block.STORAGES, timesteps, rule=_x_max_rule)
+    )
@@ -1,3 +1,5 @@
+import time
+
 from oemof.solph.components import Transformer
 
 from pyomo.core.base.block import ScalarBlock
@@ -42,7 +44,7 @@ class Storage(Transformer):
         self.SOC_MAX = SOC_MAX
 
         # add initial state of charge
-        self.SOC_INI = SOC_INI
+        self.set_initial_state_of_charge(SOC_INI)
 
         # add charging and discharging efficiency
         self.ETA_IN = ETA_IN
@@ -60,6 +62,12 @@ class Storage(Transformer):
         # map specific output flow to standard API
         self.outputs.update(self.el_outputs)
 
+    def set_initial_state_of_charge(self, SOC_INI):
+        """
+        Sets the initial state of charge
+        """
+        self.SOC_INI = SOC_INI
+
     def constraint_group(self):
         """
         Returns Block containing constraints for this class
@@ -81,12 +89,21 @@ class StorageBlock(ScalarBlock):
         if group is None:
             return None
 
+        # wall time of creating the block, see energy_system.phase_timing
+        start_time = time.perf_counter()
+
         # reference to energy system
         m = self.parent_block()
 
         # set containing all instances of class LinearStorage
         self.STORAGES = Set(initialize=[n for n in group])
 
+        # initial state of charge, mutable so that it can be changed without
+        # rebuilding the model
+        self.SOC_INI = Param(
+            self.STORAGES, initialize={n: n.SOC_INI for n in group}, mutable=True
+        )
+
         # defining optimization variables
 
         # charging power, only allow positive values and zero
@@ -152,7 +169,7 @@ class StorageBlock(ScalarBlock):
             else:
                 lhs = block.soc[n, t]
                 rhs = (
-                    n.SOC_INI
+                    block.SOC_INI[n]
                     + n.ETA_IN * block.P_in[n, t] * m.timeincrement[t]
                     - (1 / n.ETA_OUT) * block.P_out[n, t] * m.timeincrement[t]
                 )
@@ -181,8 +198,9 @@ class StorageBlock(ScalarBlock):
         # # rule for end state of charge
         def _soc_end_rule(block, n):
             lhs = block.soc[n, m.TIMESTEPS.last()]
-            rhs = n.SOC_INI
+            rhs = block.SOC_INI[n]
             return lhs >= rhs
 
         self.soc_end = Constraint(self.STORAGES, rule=_soc_end_rule)
 
+        self.create_time = time.perf_counter() - start_time
@@ -0,0 +1,219 @@
+from pyomo.core import Piecewise
+from pyomo.environ import Constraint, NonNegativeReals, Set, SOSConstraint, Var
+
+# representations of piecewise linear relations, SOS2 is built by
+# add_sos2_relation, all others by pyomo.core.Piecewise
+PIECEWISE_REPRESENTATIONS = [
+    "SOS2",
+    "BIGM_SOS1",
+    "BIGM_BIN",
+    "CC",
+    "DCC",
+    "DLOG",
+    "LOG",
+    "MC",
+    "INC",
+]
+
+
+def common_pw_repn(group):
+    """
+    Returns the representation of the piecewise linear relations shared by all
+    storages of a StorageBlock.
+
+    Parameters
+    ----------
+    group : list
+        storages of the StorageBlock, each having the attribute pw_repn
+
+    Returns
+    -------
+    pw_repn : String
+        one of PIECEWISE_REPRESENTATIONS
+
+    """
+
+    pw_repns = {n.pw_repn for n in group}
+    if len(pw_repns) > 1:
+        raise ValueError(
+            "All storages of a StorageBlock have to use the same piecewise "
+            "representation, got: {0}".format(", ".join(sorted(pw_repns)))
+        )
+
+    pw_repn = pw_repns.pop()
+    if pw_repn not in PIECEWISE_REPRESENTATIONS:
+        raise ValueError(
+            "Unknown piecewise representation '{0}'. Choose one of: {1}".format(
+                pw_repn, ", ".join(PIECEWISE_REPRESENTATIONS)
+            )
+        )
+
+    return pw_repn
+
+
+def add_piecewise_relation(
+    block, name, y, x, x_breakpoints, y_breakpoints, timesteps, pw_repn="SOS2"
+):
+    """
+    Adds a piecewise linear relation y = f(x) for every storage and timestep
+    of a StorageBlock in the given representation. SOS2 uses the compact
+    formulation of add_sos2_relation, the other representations (e.g. the
+    logarithmic LOG and DLOG needing fewer binary variables for many
+    segments) are built by pyomo.core.Piecewise as component <name>. LOG and
+    DLOG require the number of segments to be a power of two.
+
+    Parameters
+    ----------
+    block : StorageBlock
+        block the components are added to, block.STORAGES has to be defined
+    name : String
+        name of the relation, e.g. "pwlf_p_in"
+    y : pyomo.core.Var
+        variable indexed by storage and timestep, function value of x
+    x : pyomo.core.Var
+        variable indexed by storage and timestep, argument of the function,
+        has to be bounded by the first and last breakpoint
+    x_breakpoints : dict
+        ascending arguments of the breakpoints of each storage
+    y_breakpoints : dict
+        function values at the breakpoints of each storage
+    timesteps : pyomo.core.Set
+        timesteps of the model
+    pw_repn : String
+        one of PIECEWISE_REPRESENTATIONS
+
+    Returns
+    -------
+    -
+
+    """
+
+    if pw_repn == "SOS2":
+        add_sos2_relation(block, name, y, x, x_breakpoints, y_breakpoints, timesteps)
+        return
+
+    # Piecewise expects the breakpoints of every index
+    pw_pts = {(n, t): list(x_breakpoints[n]) for n in block.STORAGES for t in timesteps}
+    function_values = {
+        n: dict(zip(x_breakpoints[n], y_breakpoints[n])) for n in block.STORAGES
+    }
+
+    def _f_rule(block, n, t, x_value):
+        return function_values[n][x_value]
+
+    block.add_component(
+        name,
+        Piecewise(
+            block.STORAGES,
+            timesteps,
+            y,
+            x,
+            pw_pts=pw_pts,
+            pw_constr_type="EQ",
+            f_rule=_f_rule,
+            pw_repn=pw_repn,
+        ),
+    )
+
+
+def add_sos2_relation(block, name, y, x, x_breakpoints, y_breakpoints, timesteps):
+    """
+    Adds a piecewise linear relation y = f(x) for every storage and timestep
+    of a StorageBlock using the convex combination (lambda) formulation with
+    SOS2 constraints. In contrast to pyomo.core.Piecewise, the breakpoints
+    are stored only once per storage and all timesteps share indexed
+    components instead of one sub-block per timestep:
+
+    - <name>_POINTS: set of (storage, breakpoint) pairs
+    - <name>_weights: weights of the breakpoints, indexed by storage,
+      breakpoint and timestep
+    - <name>_convexity: the weights of each timestep sum up to 1
+    - <name>_x, <name>_y: x and y are the weighted sums of the breakpoints
+    - <name>_sos2: at most two adjacent weights of each timestep are non-zero
+
+    The breakpoints of each relation are kept in block.sos2_relations, e.g.
+    to derive start values of the weights (see energy_system.mip_start).
+
+    Parameters
+    ----------
+    block : StorageBlock
+        block the components are added to, block.STORAGES has to be defined
+    name : String
+        prefix of the names of the components, e.g. "pwlf_p_in"
+    y : pyomo.core.Var
+        variable indexed by storage and timestep, function value of x
+    x : pyomo.core.Var
+        variable indexed by storage and timestep, argument of the function
+    x_breakpoints : dict
+        ascending arguments of the breakpoints of each storage
+    y_breakpoints : dict
+        function values at the breakpoints of each storage
+    timesteps : pyomo.core.Set
+        timesteps of the model
+
+    Returns
+    -------
+    -
+
+    """
+
+    points = Set(
+        dimen=2,
+        ordered=True,
+        initialize=[
+            (n, k) for n in block.STORAGES for k in range(len(x_breakpoints[n]))
+        ],
+    )
+    block.add_component(name + "_POINTS", points)
+
+    weights = Var(points, timesteps, within=NonNegativeReals, bounds=(0, 1))
+    block.add_component(name + "_weights", weights)
+
+    def _convexity_rule(block, n, t):
+        return sum(weights[n, k, t] for k in range(len(x_breakpoints[n]))) == 1
+
+    block.add_component(
+        name + "_convexity",
+        Constraint(block.STORAGES, timesteps, rule=_convexity_rule),
+    )
+
+    def _x_rule(block, n, t):
+        rhs = sum(
+            x_breakpoints[n][k] * weights[n, k, t] for k in range(len(x_breakpoints[n]))
+        )
+        return x[n, t] == rhs
+
+    block.add_component(
+        name + "_x", Constraint(block.STORAGES, timesteps, rule=_x_rule)
+    )
+
+    def _y_rule(block, n, t):
+        rhs = sum(
+            y_breakpoints[n][k] * weights[n, k, t] for k in range(len(y_breakpoints[n]))
+        )
+        return y[n, t] == rhs
+
+    block.add_component(
+        name + "_y", Constraint(block.STORAGES, timesteps, rule=_y_rule)
+    )
+
+    # two breakpoints form a single segment, which needs no SOS2 constraint
+    def _sos2_rule(block, n, t):
+        if len(x_breakpoints[n]) < 3:
+            return SOSConstraint.Skip
+        return [weights[n, k, t] for k in range(len(x_breakpoints[n]))]
+
+    block.add_component(
+        name + "_sos2",
+        SOSConstraint(block.STORAGES, timesteps, rule=_sos2_rule, sos=2),
+    )
+
+    if not hasattr(block, "sos2_relations"):
+        block.sos2_relations = {}
+    block.sos2_relations[name] = {
+        "x": x,
+        "y": y,
+        "weights": weights,
+        "x_breakpoints": x_breakpoints,
+        "y_breakpoints": y_breakpoints,
+    }
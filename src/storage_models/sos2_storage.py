@@ -1,9 +1,12 @@
+import time
+
 from oemof.solph.components import Transformer
 
 from pyomo.core.base.block import ScalarBlock
-from pyomo.environ import BuildAction
-from pyomo.core import Piecewise
-from pyomo.environ import Constraint, Binary, NonNegativeReals, Var, Set
+from pyomo.environ import Constraint, Binary, NonNegativeReals, Var, Set, Param
+
+from sos2_builder import add_piecewise_relation, common_pw_repn
+from envelope_builder import add_envelope_relation, group_is_lp_exact, is_lp_exact
 
 class Storage(Transformer):
     r"""
@@ -25,6 +28,8 @@ class Storage(Transformer):
         p_in_stor_breakpoints,
         p_out_stor_breakpoints,
         p_out_breakpoints,
+        pw_repn="SOS2",
+        lp_envelope=True,
         *args,
         **kwargs
     ):
@@ -48,7 +53,7 @@ class Storage(Transformer):
         self.SOC_MAX = SOC_MAX
 
         # add initial state of charge
-        self.SOC_INI = SOC_INI * SOC_MAX
+        self.set_initial_state_of_charge(SOC_INI)
 
         # add breakpoints for linearization of storage efficiency
         self.p_in_breakpoints = [i * P_MAX_IN for i in p_in_breakpoints]
@@ -57,6 +62,19 @@ class Storage(Transformer):
         self.p_out_stor_breakpoints = [i * P_MAX_OUT for i in p_out_stor_breakpoints]
         self.p_out_breakpoints = [i * P_MAX_OUT for i in p_out_breakpoints]
 
+        # representation of the piecewise linear efficiency curves, see
+        # sos2_builder.PIECEWISE_REPRESENTATIONS
+        self.pw_repn = pw_repn
+
+        # relations, which can be written as linear inequalities without
+        # SOS2 weights, unless disabled by lp_envelope (see envelope_builder)
+        self.lp_exact = {
+            "pwlf_p_in": lp_envelope
+            and is_lp_exact(self.p_in_breakpoints, self.p_in_stor_breakpoints, "max"),
+            "pwlf_p_out": lp_envelope
+            and is_lp_exact(self.p_out_stor_breakpoints, self.p_out_breakpoints, "max"),
+        }
+
         # map specific input flow to standard API using output nodes
         # predecessor (flow from bus)
         input_nodes = list(self.el_inputs.keys())
@@ -69,6 +87,12 @@ class Storage(Transformer):
         # map specific output flow to standard API
         self.outputs.update(self.el_outputs)
 
+    def set_initial_state_of_charge(self, SOC_INI):
+        """
+        Sets the initial state of charge (relative to SOC_MAX)
+        """
+        self.SOC_INI = SOC_INI * self.SOC_MAX
+
     def constraint_group(self):
         """
         Returns Block containing constraints for this class
@@ -91,59 +115,21 @@ class StorageBlock(ScalarBlock):
         if group is None:
             return None
 
+        # wall time of creating the block, see energy_system.phase_timing
+        start_time = time.perf_counter()
+
         # reference to energy system
         m = self.parent_block()
 
         # set containing all instances of class Storage
         self.STORAGES = Set(initialize=[n for n in group])
 
-        # set all parameters necessary for implementation of piecwise
-        # linear function of efficiency curves using P_in/P_out and
-        # P_in_stor/P_out_stor
-
-        # initialize dictionary for breakpoints 
-        # stores list (or dict etc.) of breakpoints for each STORAGE
-        # breakpoints are the same for each timestep
-
-        self.breakpoints_p_in = {}
-        self.func_value_p_in_stor = {}
-
-        self.func_value_p_out = {}
-        self.breakpoints_p_out_stor = {}
-
-        def build_breakpoints_p_in(block, n):
-            for t in m.TIMESTEPS:
-                self.breakpoints_p_in[(n, t)] = n.p_in_breakpoints
-
-        self.p_in_breakpoint_build = BuildAction(
-            self.STORAGES, rule=build_breakpoints_p_in
+        # initial state of charge, mutable so that it can be changed without
+        # rebuilding the model
+        self.SOC_INI = Param(
+            self.STORAGES, initialize={n: n.SOC_INI for n in group}, mutable=True
         )
 
-        def build_breakpoints_p_out(block, n):
-            for t in m.TIMESTEPS:
-                self.breakpoints_p_out_stor[(n, t)] = n.p_out_stor_breakpoints
-
-        self.p_out_breakpoint_build = BuildAction(
-            self.STORAGES, rule=build_breakpoints_p_out
-        )
-      
-        def build_breakpoints_p_in_stor(block, n):
-            for t in m.TIMESTEPS:
-                self.func_value_p_in_stor[(n, t)] = n.p_in_stor_breakpoints
-
-        self.p_in_stor_breakpoint_build = BuildAction(
-            self.STORAGES, rule=build_breakpoints_p_in_stor
-        )
-
-        def build_breakpoints_p_out_stor(block, n):
-            for t in m.TIMESTEPS:
-                self.func_value_p_out[(n, t)] = n.p_out_breakpoints
-
-        self.p_out_stor_breakpoint_build = BuildAction(
-            self.STORAGES, rule=build_breakpoints_p_out_stor
-        )
-
-
         # define bounds of P_in, P_in_stor and P_out, P_out_stor
 
         # bounds are equal to maximum charging/discharging power
@@ -275,7 +261,7 @@ class StorageBlock(ScalarBlock):
             else:
                 lhs = block.soc[n, t]
                 rhs = (
-                    n.SOC_INI
+                    block.SOC_INI[n]
                     + block.P_in_stor[n, t] * m.timeincrement[t]
                     - block.P_out_stor[n, t] * m.timeincrement[t]
                 )
@@ -285,29 +271,58 @@ class StorageBlock(ScalarBlock):
             self.STORAGES, m.TIMESTEPS, rule=_SOC_balance_rule
         )
 
-        # rule for relation between P_in and P_in_stor
-        self.pwlf_p_in = Piecewise(
-            self.STORAGES,
-            m.TIMESTEPS,
-            self.P_in_stor,
-            self.P_in,
-            pw_pts=self.breakpoints_p_in,
-            pw_constr_type="EQ",
-            f_rule=self.func_value_p_in_stor,
-            pw_repn="SOS2",
-        )
-
-        # rule for relation between P_out and P_out_stor
-        self.pwlf_p_out = Piecewise(
-            self.STORAGES,
-            m.TIMESTEPS,
-            self.P_out,
-            self.P_out_stor,
-            pw_pts=self.breakpoints_p_out_stor,
-            pw_constr_type="EQ",
-            f_rule=self.func_value_p_out,
-            pw_repn="SOS2",
-        )
+        # representation of the piecewise linear relations
+        pw_repn = common_pw_repn(group)
+
+        # rule for relation between P_in and P_in_stor, as linear
+        # inequalities if the curve allows for it
+        if group_is_lp_exact(group, "pwlf_p_in"):
+            add_envelope_relation(
+                self,
+                "pwlf_p_in",
+                self.P_in_stor,
+                self.P_in,
+                {n: n.p_in_breakpoints for n in group},
+                {n: n.p_in_stor_breakpoints for n in group},
+                m.TIMESTEPS,
+                "max",
+            )
+        else:
+            add_piecewise_relation(
+                self,
+                "pwlf_p_in",
+                self.P_in_stor,
+                self.P_in,
+                {n: n.p_in_breakpoints for n in group},
+                {n: n.p_in_stor_breakpoints for n in group},
+                m.TIMESTEPS,
+                pw_repn,
+            )
+
+        # rule for relation between P_out and P_out_stor, as linear
+        # inequalities if the curve allows for it
+        if group_is_lp_exact(group, "pwlf_p_out"):
+            add_envelope_relation(
+                self,
+                "pwlf_p_out",
+                self.P_out,
+                self.P_out_stor,
+                {n: n.p_out_stor_breakpoints for n in group},
+                {n: n.p_out_breakpoints for n in group},
+                m.TIMESTEPS,
+                "max",
+            )
+        else:
+            add_piecewise_relation(
+                self,
+                "pwlf_p_out",
+                self.P_out,
+                self.P_out_stor,
+                {n: n.p_out_stor_breakpoints for n in group},
+                {n: n.p_out_breakpoints for n in group},
+                m.TIMESTEPS,
+                pw_repn,
+            )
 
         # rule for max state of charge
         def _soc_max_rule(block, n, t):
@@ -328,8 +343,9 @@ class StorageBlock(ScalarBlock):
         # rule for end state of charge (same as initial state of charge)
         def _soc_end_rule(block, n):
             lhs = block.soc[n, m.TIMESTEPS.last()]
-            rhs = n.SOC_INI
+            rhs = block.SOC_INI[n]
             return lhs >= rhs
 
         self.soc_end = Constraint(self.STORAGES, rule=_soc_end_rule)
 
+        self.create_time = time.perf_counter() - start_time
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# the modules of the toolchain are imported relative to src, as in the scripts
+sys.path.insert(
+    0, os.path.realpath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from efficiency_calculation_script import (
+    MIN_SEGMENT_WIDTH,
+    fit_breakpoints_dp,
+    loop_breakpoint_calculation,
+)
+
+DESIGN_PLAN_ROOT = os.path.realpath(
+    os.path.join(os.path.dirname(__file__), "..", "design_plan_simulation_results")
+)
+
+
+def two_slope_curve(noise=0.0):
+    # continuous curve with a single kink at 0.35
+    x = np.linspace(0.1, 1, 400)
+    y = np.where(x < 0.35, 0.9 * x, 0.9 * 0.35 + 0.7 * (x - 0.35))
+    y = y + np.random.default_rng(1).normal(0, noise, len(x))
+    return x, y
+
+
+def test_dp_fit_of_continuous_data_has_no_narrow_segments():
+    for noise in [0.0, 0.002]:
+        x, y = two_slope_curve(noise)
+        min_width = MIN_SEGMENT_WIDTH * (x[-1] - x[0])
+        for x_breakpoints, _ in fit_breakpoints_dp(x, y, 8).values():
+            assert np.diff(x_breakpoints).min() >= min_width
+            # breakpoints remain distinct when rounded to two decimals
+            assert len(np.unique(np.round(x_breakpoints, 2))) == len(x_breakpoints)
+
+
+def test_dp_fit_follows_jump():
+    x = np.linspace(0.1, 1, 400)
+    y = np.where(x < 0.5, 0.8 * x, 0.8 * x + 0.1)
+
+    x_breakpoints, y_breakpoints = fit_breakpoints_dp(x, y, 4)[4]
+
+    assert np.allclose(np.interp(x, x_breakpoints, y_breakpoints), y, atol=1e-6)
+
+
+@pytest.mark.parametrize(
+    "data_file, x_value_label, y_value_label",
+    [
+        ("phs_charging_efficiency_data.csv", "P_in_rel", "P_in_stor"),
+        ("phs_discharging_efficiency_data.csv", "P_out_stor", "P_out_rel"),
+    ],
+)
+def test_dp_breakpoints_of_phs_design_plan_remain_distinct_when_saved(
+    tmp_path, data_file, x_value_label, y_value_label
+):
+    # the PHS data jumps where further units start, the segments enclosing
+    # these jumps must not vanish with the decimals of the notebook
+    res_decimals = 4
+    loop_breakpoint_calculation(
+        os.path.join(DESIGN_PLAN_ROOT, data_file),
+        str(tmp_path),
+        x_value_label,
+        y_value_label,
+        2,
+        6,
+        0.1,
+        1,
+        res_decimals,
+        False,
+        fit_method="dp",
+    )
+
+    saved_files = sorted(tmp_path.glob("*_breakpoints_as_string.csv"))
+    assert len(saved_files) == 5
+    for saved_file in saved_files:
+        saved = pd.read_csv(saved_file, sep=";", index_col=0)
+        x_breakpoints = [float(x) for x in saved.at[0, "x_breakpoints"].split(", ")]
+        assert np.all(np.diff(x_breakpoints) >= 10**-res_decimals)
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from energy_system.mip_start import INCUMBENT_LOG_PATTERNS, parse_first_incumbent
+
+# log excerpts of the solvers, the first incumbent has the objective 100908.43
+SOLVER_LOGS = {
+    "cbc": (
+        "Cbc0038I Initial state - 12 integers unsatisfied sum - 3.5\n"
+        "Cbc0012I Integer solution of 100908.43 found by DiveCoefficient after "
+        "0 iterations and 0 nodes (0.05 seconds)\n"
+        "Cbc0012I Integer solution of 50000 found by feasibility pump after "
+        "12 iterations and 0 nodes (0.80 seconds)\n",
+        0.05,
+    ),
+    "gurobi": (
+        "    Nodes    |    Current Node    |     Objective Bounds      |     Work\n"
+        " Expl Unexpl |  Obj  Depth IntInf | Incumbent    BestBd   Gap | It/Node Time\n"
+        "\n"
+        "H    0     0                    100908.43273  0.00000   100%     -    3s\n"
+        "*    0     0               0    50000.00000 47614.0219  4.77%     -    5s\n",
+        3.0,
+    ),
+    "cplex": (
+        "Tried aggregator 1 time.\n"
+        "Found incumbent of value 100908.432700 after 0.05 sec. (1.23 ticks)\n"
+        "*     0+    0                        50000.0000    47614.0219"
+        "             4.77%\n",
+        0.05,
+    ),
+    "highs": (
+        "        Nodes      |    B&B Tree     |            Objective Bounds"
+        "              |  Dynamic Constraints |       Work      \n"
+        "     Proc. InQueue |  Leaves   Expl. | BestBound       BestSol"
+        "              Gap |   Cuts   InLp Confl. | LpIters     Time\n"
+        "\n"
+        "         0       0         0   0.00%   -inf            inf"
+        "                  inf        0      0      0         0     0.0s\n"
+        " H       0       0         0   0.00%   -inf            100908.43273"
+        "      Large        0      0      0        15     0.1s\n"
+        " T       0       0         0   0.00%   47614.021       50000"
+        "              4.77%        0      0      0        98     0.4s\n",
+        0.1,
+    ),
+}
+
+
+@pytest.mark.parametrize("solver_name", sorted(INCUMBENT_LOG_PATTERNS))
+def test_first_incumbent_is_parsed(tmp_path, solver_name):
+    log, time_to_first_incumbent = SOLVER_LOGS[solver_name]
+    log_file = tmp_path / "solver.log"
+    log_file.write_text(log)
+
+    assert parse_first_incumbent(str(log_file), solver_name) == pytest.approx(
+        (time_to_first_incumbent, 100908.43)
+    )
+
+
+def test_accepted_mip_start_of_cplex(tmp_path):
+    log_file = tmp_path / "solver.log"
+    log_file.write_text(
+        "1 of 1 MIP starts provided solutions.\n"
+        "MIP start 'm1' defined initial solution with objective 100908.4327.\n"
+        "Found incumbent of value 50000.000000 after 0.30 sec. (7.89 ticks)\n"
+    )
+
+    assert parse_first_incumbent(str(log_file), "cplex") == (0.0, 100908.4327)
+
+
+def test_unknown_solver(tmp_path):
+    log_file = tmp_path / "solver.log"
+    log_file.write_text(SOLVER_LOGS["cbc"][0])
+
+    assert all(np.isnan(parse_first_incumbent(str(log_file), "glpk")))
@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow", exc_type=ImportError)
+
+from energy_system.result_store import (
+    PARTITION_FILE,
+    RESULT_STORE_DIR,
+    SHARED_SERIES_DIR,
+    export_results,
+    read_result_partition,
+    read_result_store,
+    results_exist,
+)
+
+
+def oemof_columns(frame):
+    # oemof.solph.views names the columns by tuples
+    frame.columns = pd.Index(list(frame.columns), tupleize_cols=False)
+    return frame
+
+
+def scenario_results(scale):
+    index = pd.date_range("2021-01-18", periods=5, freq="h")
+    storage = pd.DataFrame(
+        np.column_stack([np.arange(5.0) * scale, np.linspace(0, 1, 5) * scale]),
+        index=index,
+    )
+    storage.columns = [(("bus_gen", "storage"), "flow"), (("storage", "None"), "soc")]
+    bus_gen = pd.DataFrame(
+        np.column_stack([np.arange(5.0), np.arange(5.0) * scale]), index=index
+    )
+    bus_gen.columns = [
+        (("ee_gen", "bus_gen"), "flow"),
+        (("bus_gen", "storage"), "flow"),
+    ]
+    return {"storage": oemof_columns(storage), "bus_gen": oemof_columns(bus_gen)}
+
+
+def test_partition_is_written_and_read(tmp_path):
+    export_root = str(tmp_path)
+    for i_scenario, scale in [("scenario_1", 1.0), ("scenario_2", 2.0)]:
+        assert not results_exist(export_root, i_scenario, "parquet", "sos2")
+        export_results(
+            export_root, i_scenario, scenario_results(scale), "parquet", "sos2"
+        )
+        assert results_exist(export_root, i_scenario, "parquet", "sos2")
+
+    store_root = os.path.join(export_root, RESULT_STORE_DIR)
+
+    # the generation of both scenarios is stored once
+    assert len(os.listdir(os.path.join(store_root, SHARED_SERIES_DIR))) == 1
+
+    bus_gen = read_result_partition(store_root, "sos2", "scenario_2", "bus_gen")
+    assert list(bus_gen.columns) == ["ee_gen_to_bus_gen", "bus_gen_to_storage"]
+    assert np.allclose(bus_gen["ee_gen_to_bus_gen"], np.arange(5.0))
+    assert np.allclose(bus_gen["bus_gen_to_storage"], np.arange(5.0) * 2)
+
+    storage = read_result_store(store_root, "storage")
+    assert len(storage) == 10
+    assert np.allclose(storage.loc[("sos2", "scenario_2"), "soc"], np.linspace(0, 2, 5))
+
+    # partitions being written are skipped
+    os.remove(
+        os.path.join(
+            store_root, "model_type=sos2", "scenario=scenario_1", PARTITION_FILE
+        )
+    )
+    assert not results_exist(export_root, "scenario_1", "parquet", "sos2")
+    assert len(read_result_store(store_root, "storage")) == 5
@@ -0,0 +1,61 @@
+import os
+
+import pandas as pd
+import pytest
+
+from energy_system.results_catalog import (
+    CHECKPOINT_FILE_NAME,
+    index_results_folder,
+    query_results,
+)
+
+RESULTS_ROOT = os.path.realpath(
+    os.path.join(os.path.dirname(__file__), "..", "src", "results")
+)
+
+
+def scanned_scenarios(storage_type):
+    # active scenarios of the most recent file of every export directory, as
+    # read by the comparison plots before the catalog existed
+    rows = 0
+    for folder in os.listdir(RESULTS_ROOT):
+        data_path = os.path.join(RESULTS_ROOT, folder)
+        if storage_type not in folder or not os.path.isdir(data_path):
+            continue
+        csv_files = [
+            os.path.join(data_path, f)
+            for f in os.listdir(data_path)
+            if os.path.isfile(os.path.join(data_path, f))
+        ]
+        data = pd.read_csv(max(csv_files, key=os.path.getmtime), sep=";")
+        rows += int((data["active"] > 0).sum())
+    return rows
+
+
+@pytest.mark.parametrize("storage_type", ["phs", "caes"])
+def test_committed_results_are_indexed(tmp_path, storage_type):
+    catalog = index_results_folder(RESULTS_ROOT, str(tmp_path / "catalog.sqlite"))
+
+    results = query_results(catalog, storage_type=storage_type)
+
+    assert len(results) == scanned_scenarios(storage_type)
+    assert len(results) > 0
+
+
+def test_checkpoint_is_not_indexed(tmp_path):
+    export_root = tmp_path / "results_phs_sos2_test"
+    export_root.mkdir()
+    status = pd.DataFrame(
+        {"active": [1, 1], "solved": [1, 1], "objective": [1.0, 2.0]},
+        index=pd.Index(["phs_sommer_2_segments", "phs_winter_2_segments"], name="name"),
+    )
+    status.to_csv(export_root / "scenario_status.csv", sep=";")
+    status.to_csv(export_root / CHECKPOINT_FILE_NAME, sep=";")
+
+    catalog = index_results_folder(str(tmp_path))
+    # indexing again does not add the runs a second time
+    index_results_folder(str(tmp_path))
+
+    results = query_results(catalog, latest_only=False)
+    assert sorted(results["name"]) == sorted(status.index)
+    assert set(results["status_file"].map(os.path.basename)) == {"scenario_status.csv"}